@@ -1,7 +1,9 @@
-from flask import Flask
+from flask import Flask, jsonify, session
 from config.config import Config
-from modules.webapp.models.models import db
+from modules.webapp.models.models import db, User
+from flask_login import LoginManager
 from flask_migrate import Migrate
+from modules.webapp.service.registry import init_services
 
 def create_app():
     app = Flask(__name__)
@@ -10,6 +12,23 @@ def create_app():
     # Initialize extensions
     db.init_app(app)
     Migrate(app, db)
+    init_services(app)
+
+    # The API's flask_login views share the dashboard's session login
+    login_manager = LoginManager(app)
+
+    @login_manager.user_loader
+    def load_user(user_id):
+        return db.session.get(User, user_id)
+
+    @login_manager.request_loader
+    def load_user_from_session(request):
+        user_id = session.get('user_id')
+        return db.session.get(User, user_id) if user_id else None
+
+    @login_manager.unauthorized_handler
+    def unauthorized():
+        return jsonify({'error': 'Authentication required'}), 401
 
     # Register blueprints
     from modules.webapp.views.auth import auth_bp, create_google_blueprint
@@ -22,6 +41,10 @@ def create_app():
     
     app.register_blueprint(dashboard_bp)
     app.register_blueprint(api_bp)
+
+    # CLI commands
+    from modules.webapp.commands import scraper_cli
+    app.cli.add_command(scraper_cli)
     
     return app
 
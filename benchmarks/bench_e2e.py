@@ -0,0 +1,305 @@
+"""End-to-end API latency and throughput against local stand-ins for the web and the LLM.
+
+Run from the repository root:
+
+    python -m benchmarks.bench_e2e [--requests 200] [--concurrency 8] [--llm-latency 0.2]
+        [--scenarios scrape analyze list] [--database-url URL] [--baseline earlier.json]
+
+The app runs in-process behind a threaded WSGI server, with the fake LLM
+backend (``LLM_BACKEND=fake``) and a fresh SQLite file unless
+``--database-url`` points at a scratch database (local Postgres, say).
+``benchmarks.fixture_site`` serves the pages to scrape; ``client`` pages
+need Chrome, so they are only included when asked for with ``--kinds``.
+
+Each scenario sends ``--requests`` requests from ``--concurrency`` client
+threads, after ``--warmup`` uncounted ones, and reports throughput and
+p50/p95/p99 latency. Results are written as JSON tagged with the git
+commit (``benchmarks/results/`` by default); ``--baseline`` prints the
+change against an earlier results file.
+"""
+import argparse
+import contextlib
+import json
+import logging
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+import httpx
+from sqlalchemy import event
+from werkzeug.serving import WSGIRequestHandler, make_server
+
+from benchmarks.fixture_site import KINDS, FixtureSite, build_corpus
+
+RESULTS_DIR = os.path.join(os.path.dirname(__file__), 'results')
+BENCH_USER_ID = 'bench-user'
+
+
+def _scrape(ctx, i):
+    return 'POST', '/api/scraped-data', {'url': ctx['urls'][i % len(ctx['urls'])], 'refresh': True}
+
+
+def _analyze(ctx, i):
+    entity = ctx['entities'][i % len(ctx['entities'])]
+    return 'POST', '/api/prompts', {
+        # Unique per request, so every call reaches the model
+        'prompt': f"Summarize {entity['name']} and suggest follow-ups ({ctx['run_id']}-{i})",
+        'context': entity['about'],
+        'refresh': True
+    }
+
+
+def _analyze_cached(ctx, i):
+    entity = ctx['entities'][i % 10]
+    return 'POST', '/api/prompts', {
+        'prompt': f"Summarize {entity['name']} and suggest follow-ups",
+        'context': entity['about']
+    }
+
+
+SCENARIOS = {
+    'scrape': _scrape,
+    'analyze': _analyze,
+    'analyze-cached': _analyze_cached,
+    'list': lambda ctx, i: ('GET', '/api/scraped-data', None),
+    'list-prompts': lambda ctx, i: ('GET', '/api/prompts', None),
+}
+
+
+class _QuietHandler(WSGIRequestHandler):
+    def log_request(self, *args, **kwargs):
+        pass
+
+
+def git_commit():
+    def git(*args):
+        return subprocess.run(['git', *args], capture_output=True, text=True).stdout.strip()
+    commit = git('rev-parse', '--short', 'HEAD') or 'unknown'
+    dirty = bool(git('status', '--porcelain', '--untracked-files=no'))
+    return commit, dirty
+
+
+def configure_environment(args, snapshot_dir):
+    # Read by config.Config on import, so set before the app is imported
+    os.environ.update({
+        'DATABASE_URL': args.database_url,
+        'LLM_BACKEND': 'fake',
+        'LLM_FAKE_LATENCY': str(args.llm_latency),
+        'LLM_DAILY_TOKEN_BUDGET': '0',
+        'SNAPSHOT_DIR': snapshot_dir,
+    })
+
+
+def serialize_sqlite_writes(engine):
+    """Take SQLite's write lock when each transaction begins.
+
+    pysqlite begins transactions lazily, so two requests that read and then
+    write can each hold a read lock the other needs to write, and one fails
+    with "database is locked" instead of waiting. This queues every
+    transaction behind the one writing, which shows in the tail latencies;
+    use ``--database-url`` with Postgres to measure contention.
+    """
+    @event.listens_for(engine, 'connect')
+    def connect(dbapi_connection, connection_record):
+        dbapi_connection.isolation_level = None
+        dbapi_connection.execute('PRAGMA journal_mode=WAL')
+        dbapi_connection.execute('PRAGMA busy_timeout=30000')
+
+    @event.listens_for(engine, 'begin')
+    def begin(connection):
+        connection.exec_driver_sql('BEGIN IMMEDIATE')
+
+
+def create_bench_app(seed_rows, corpus_entities):
+    from app import create_app
+    from modules.webapp.models.models import db, User, ScrapedData, PromptLog
+
+    app = create_app()
+    with app.app_context():
+        if db.engine.dialect.name == 'sqlite':
+            serialize_sqlite_writes(db.engine)
+        db.create_all()
+        db.session.merge(User(
+            id=BENCH_USER_ID, name='Benchmark', email='bench@localhost.test', social_login_provider='bench'
+        ))
+        for number in range(seed_rows):
+            entity = corpus_entities[number % len(corpus_entities)]
+            db.session.add(ScrapedData(
+                url=f'https://seed.test/{number}', content=entity, page_metadata={'meta_title': entity['name']},
+                created_by_user_id=BENCH_USER_ID
+            ))
+            db.session.add(PromptLog(
+                prompt_text=f"Analyze scraped data from: https://seed.test/{number}",
+                generated_output=entity['about'], tokens_used=0, created_by_user_id=BENCH_USER_ID
+            ))
+        db.session.commit()
+    return app
+
+
+def session_cookie(app):
+    """A signed session cookie logging the client in as the benchmark user."""
+    serializer = app.session_interface.get_signing_serializer(app)
+    return {app.config['SESSION_COOKIE_NAME']: serializer.dumps({'user_id': BENCH_USER_ID})}
+
+
+def percentiles(samples):
+    cuts = statistics.quantiles(samples, n=100, method='inclusive') if len(samples) > 1 else samples * 99
+    return {
+        'mean': round(statistics.fmean(samples), 2),
+        'p50': round(cuts[49], 2),
+        'p95': round(cuts[94], 2),
+        'p99': round(cuts[98], 2),
+        'max': round(max(samples), 2)
+    }
+
+
+def run_scenario(client, build, ctx, requests, concurrency, warmup):
+    def send(i):
+        method, path, body = build(ctx, i)
+        start = time.perf_counter()
+        response = client.request(method, path, json=body)
+        elapsed_ms = (time.perf_counter() - start) * 1000
+        return response.status_code, elapsed_ms, response.text[:200] if response.status_code >= 400 else None
+
+    for i in range(warmup):
+        send(i)
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as callers:
+        results = list(callers.map(send, range(warmup, warmup + requests)))
+    duration = time.perf_counter() - start
+
+    statuses = {}
+    for status, _, _ in results:
+        statuses[str(status)] = statuses.get(str(status), 0) + 1
+    ok = [elapsed for status, elapsed, _ in results if status < 400]
+    return {
+        'requests': requests,
+        'errors': requests - len(ok),
+        'statuses': statuses,
+        'sample_errors': [error for _, _, error in results if error][:3],
+        'duration_s': round(duration, 3),
+        'throughput_rps': round(len(ok) / duration, 2),
+        'latency_ms': percentiles(ok) if ok else None
+    }
+
+
+def compare(results, baseline_path):
+    with open(baseline_path) as f:
+        baseline = json.load(f)
+    print(f"\nAgainst {baseline_path} (commit {baseline.get('commit')}):")
+
+    def change(new, old):
+        return f'{(new - old) / old * 100:+7.1f}%' if old else '      -'
+
+    for name, result in results['scenarios'].items():
+        before = baseline.get('scenarios', {}).get(name)
+        if not before or not result['latency_ms'] or not before.get('latency_ms'):
+            continue
+        line = f"  {name:<16}rps {change(result['throughput_rps'], before['throughput_rps'])}"
+        for key in ('p50', 'p95', 'p99'):
+            line += f"  {key} {change(result['latency_ms'][key], before['latency_ms'][key])}"
+        print(line)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--scenarios', nargs='+', choices=list(SCENARIOS), default=list(SCENARIOS))
+    parser.add_argument('--requests', type=int, default=200)
+    parser.add_argument('--concurrency', type=int, default=8)
+    parser.add_argument('--warmup', type=int, default=10)
+    parser.add_argument('--llm-latency', type=float, default=0.2, help='seconds per fake LLM call')
+    parser.add_argument('--fixture-latency', type=float, default=0.0, help='seconds per fixture page')
+    parser.add_argument('--pages', type=int, default=50, help='pages per kind')
+    parser.add_argument('--sections', type=int, default=40, help='content sections per page')
+    parser.add_argument('--kinds', nargs='+', choices=KINDS, default=['static', 'hydrated'])
+    parser.add_argument('--rows', type=int, default=200, help='rows seeded for the list scenarios')
+    parser.add_argument('--database-url', help='scratch database; default a new SQLite file')
+    parser.add_argument('--output', help='results file; default benchmarks/results/e2e-<commit>-<time>.json')
+    parser.add_argument('--baseline', help='earlier results file to compare against')
+    parser.add_argument('--verbose', action='store_true', help="keep the app's own output")
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix='bench-e2e-')
+    args.database_url = args.database_url or f"sqlite:///{os.path.join(workdir, 'bench.db')}"
+    configure_environment(args, os.path.join(workdir, 'snapshots'))
+
+    corpus = build_corpus(args.pages, kinds=args.kinds, sections=args.sections)
+    entities = [entity for pages in corpus.values() for entity, _ in pages.values()]
+    commit, dirty = git_commit()
+    started_at = datetime.now().astimezone()
+
+    with contextlib.ExitStack() as stack:
+        sites = [stack.enter_context(FixtureSite(pages, latency=args.fixture_latency)) for pages in corpus.values()]
+        if not args.verbose:
+            # The views print; keep that out of the report
+            stack.enter_context(contextlib.redirect_stdout(open(os.devnull, 'w')))
+
+        app = create_bench_app(args.rows, entities)
+        if not args.verbose:
+            logging.getLogger().setLevel(logging.ERROR)
+        server = make_server('127.0.0.1', 0, app, threaded=True, request_handler=_QuietHandler)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        stack.callback(server.shutdown)
+
+        client = stack.enter_context(httpx.Client(
+            base_url=f'http://127.0.0.1:{server.server_port}',
+            cookies=session_cookie(app),
+            limits=httpx.Limits(max_connections=args.concurrency),
+            timeout=120
+        ))
+        ctx = {
+            'urls': [url for site in sites for url in site.urls()],
+            'entities': entities,
+            'run_id': started_at.strftime('%H%M%S')
+        }
+        scenarios = {}
+        for name in args.scenarios:
+            scenarios[name] = run_scenario(
+                client, SCENARIOS[name], ctx, args.requests, args.concurrency, args.warmup
+            )
+            result = scenarios[name]
+            latency = result['latency_ms'] or dict.fromkeys(('p50', 'p95', 'p99'), float('nan'))
+            print(
+                f"{name:<16}{result['throughput_rps']:8.1f} req/s  p50 {latency['p50']:8.1f} ms  "
+                f"p95 {latency['p95']:8.1f} ms  p99 {latency['p99']:8.1f} ms  {result['errors']} errors",
+                file=sys.__stdout__
+            )
+
+    results = {
+        'benchmark': 'e2e',
+        'commit': commit,
+        'dirty': dirty,
+        'started_at': started_at.isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'cpus': os.cpu_count(),
+        'database': args.database_url.split(':', 1)[0],
+        'settings': {
+            key: value for key, value in vars(args).items()
+            if key not in ('database_url', 'output', 'baseline', 'verbose')
+        },
+        'scenarios': scenarios
+    }
+
+    output = args.output or os.path.join(
+        RESULTS_DIR, f"e2e-{commit}-{started_at.strftime('%Y%m%dT%H%M%S')}.json"
+    )
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, 'w') as f:
+        json.dump(results, f, indent=2)
+    print(f'\nWrote {output}')
+
+    if args.baseline:
+        compare(results, args.baseline)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,152 @@
+"""Per-page parse+extract time: legacy multi-scan extraction vs DocumentExtractor.
+
+Run from the repository root:
+
+    python -m benchmarks.bench_extract [--sections 2000] [--repeat 5] [file.html ...]
+
+Without files, a synthetic company page is generated at the requested size.
+"""
+import argparse
+import statistics
+import time
+from urllib.parse import urlparse
+
+from bs4 import BeautifulSoup
+
+from modules.webapp.service.extractor import DocumentExtractor, default_parser
+
+
+def legacy_extract(html, url):
+    """The extraction path as it was before the single-pass extractor."""
+    soup = BeautifulSoup(html, 'html.parser')
+
+    def select_first(selectors):
+        for selector in selectors:
+            element = soup.select_one(selector)
+            if element:
+                return element.text.strip()
+        return None
+
+    needs_js = (
+        len(soup.find_all('script', {'src': True})) > 5 or
+        'react' in str(soup).lower() or
+        'angular' in str(soup).lower() or
+        'vue' in str(soup).lower()
+    )
+
+    contact_info = {}
+    phone_elements = soup.find_all(text=lambda text: text and any(char.isdigit() for char in text))
+    if phone_elements:
+        contact_info['phone'] = phone_elements[0].strip()
+    address_element = soup.find('address')
+    if address_element:
+        contact_info['address'] = address_element.text.strip()
+
+    email_elements = soup.select('a[href^="mailto:"]')
+    meta_desc = soup.find('meta', {'name': 'description'})
+    if soup.find('article'):
+        page_type = 'Article'
+    elif soup.find(['form', 'input']):
+        page_type = 'Form/Contact'
+    elif soup.find('table'):
+        page_type = 'Data'
+    else:
+        page_type = 'General'
+
+    domain = urlparse(url).netloc
+    content = {
+        'title': soup.title.string if soup.title else None,
+        'description': meta_desc['content'] if meta_desc else None,
+        'name': select_first(['h1', '.profile-name', '.name', '[itemprop="name"]']),
+        'about': select_first(['.about', '#about', '[itemprop="description"]', '.bio', '.description']),
+        'source': 'LinkedIn' if 'linkedin' in domain else 'Website',
+        'industry': select_first(['.industry', '[itemprop="industry"]', '.business-category']),
+        'contact_info': contact_info,
+        'email': email_elements[0]['href'].replace('mailto:', '') if email_elements else None,
+        'page_type': page_type
+    }
+    metadata = {
+        'meta_title': soup.title.string if soup.title else None,
+        'meta_description': soup.find('meta', {'name': 'description'})['content'] if soup.find('meta', {'name': 'description'}) else None,
+        'og_data': {
+            tag['property'][3:]: tag['content']
+            for tag in soup.find_all('meta', property=True)
+            if tag['property'].startswith('og:')
+        }
+    }
+    return {'content': content, 'metadata': metadata, 'needs_js': needs_js}
+
+
+def synthetic_page(sections):
+    blocks = []
+    for i in range(sections):
+        blocks.append(
+            f'<section class="block-{i}"><h2>Section {i}</h2>'
+            f'<p>Lorem ipsum dolor sit amet, consectetur adipiscing elit. Item {i}.</p>'
+            f'<ul><li><a href="/page/{i}">Link {i}</a></li><li>Entry</li></ul></section>'
+        )
+    return (
+        '<html><head><title>Acme Corp</title>'
+        '<meta name="description" content="Acme builds things">'
+        '<meta property="og:title" content="Acme"><meta property="og:type" content="website">'
+        '</head><body><header><nav>Home About Contact</nav></header>'
+        + ''.join(blocks) +
+        '<div class="about">Acme is a company that makes everything.</div>'
+        '<h1>Acme Corp</h1><span class="industry">Manufacturing</span>'
+        '<address>1 Main St, Springfield</address>'
+        '<a href="mailto:hello@acme.test">Email us</a>'
+        '<footer>Call 555-0100</footer></body></html>'
+    )
+
+
+def _without_contacts(content):
+    return {key: value for key, value in content.items() if key != 'contact_info'}
+
+
+def time_it(fn, html, url, repeat):
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn(html, url)
+        samples.append(time.perf_counter() - start)
+    return statistics.median(samples)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('files', nargs='*')
+    parser.add_argument('--sections', type=int, default=2000)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    if args.files:
+        pages = [(path, open(path, encoding='utf-8', errors='replace').read()) for path in args.files]
+    else:
+        pages = [(f'synthetic ({args.sections} sections)', synthetic_page(args.sections))]
+
+    url = 'https://www.example.com/about'
+    extractors = [('single-pass html.parser', DocumentExtractor(parser='html.parser'))]
+    if default_parser() == 'lxml':
+        extractors.append(('single-pass lxml', DocumentExtractor(parser='lxml')))
+
+    for label, html in pages:
+        print(f'{label}: {len(html) / 1024:.0f} KiB')
+        baseline = time_it(legacy_extract, html, url, args.repeat)
+        print(f'  {"legacy multi-scan":<26}{baseline * 1000:9.1f} ms')
+
+        reference = legacy_extract(html, url)
+        for name, extractor in extractors:
+            elapsed = time_it(extractor.extract, html, url, args.repeat)
+            result = extractor.extract(html, url)
+            # contact_info is left out: the regex contact stage deliberately
+            # finds more than the legacy "first string with a digit"
+            same = (
+                _without_contacts(result['content']) == _without_contacts(reference['content']) and
+                result['metadata'] == reference['metadata']
+            )
+            print(f'  {name:<26}{elapsed * 1000:9.1f} ms  {baseline / elapsed:5.1f}x  '
+                  f'{"matches legacy" if same else "DIFFERS from legacy"}')
+
+
+if __name__ == '__main__':
+    main()
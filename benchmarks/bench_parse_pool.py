@@ -0,0 +1,83 @@
+"""Extraction throughput with concurrent callers, inline vs ParsePool workers.
+
+Run from the repository root:
+
+    python -m benchmarks.bench_parse_pool [--pages 48] [--threads 8] [--workers 0 1 2 4]
+
+Each run pushes the same large page through ParsePool.extract from
+``--threads`` threads, like request threads in one web worker, and reports
+pages per second. ``0`` workers is the inline baseline.
+
+Meanwhile a heartbeat thread asks to wake every 5 ms, as a light request
+sharing the worker would, and the p50/p99 of how late it wakes is
+reported. Throughput only scales with workers on a multi-core machine;
+the heartbeat shows the GIL contention the pool removes on any machine.
+"""
+import argparse
+import os
+import statistics
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from benchmarks.bench_extract import synthetic_page
+from modules.webapp.service.parse_pool import ParsePool
+
+HEARTBEAT_INTERVAL = 0.005
+
+
+def heartbeat(stop, delays):
+    while not stop.is_set():
+        start = time.perf_counter()
+        time.sleep(HEARTBEAT_INTERVAL)
+        delays.append((time.perf_counter() - start - HEARTBEAT_INTERVAL) * 1000)
+
+
+def run(workers, html, pages, threads):
+    pool = ParsePool(workers=workers)
+    try:
+        # Warm up so process start-up is not counted
+        pool.extract(html, 'https://www.example.com/')
+        if workers:
+            with ThreadPoolExecutor(max_workers=workers) as warm:
+                list(warm.map(lambda _: pool.extract(html, 'https://www.example.com/'), range(workers)))
+
+        stop, delays = threading.Event(), []
+        beat = threading.Thread(target=heartbeat, args=(stop, delays))
+        beat.start()
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=threads) as callers:
+            list(callers.map(lambda _: pool.extract(html, 'https://www.example.com/'), range(pages)))
+        elapsed = time.perf_counter() - start
+        stop.set()
+        beat.join()
+        cuts = statistics.quantiles(delays, n=100)
+        return elapsed, cuts[49], cuts[98]
+    finally:
+        pool.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--pages', type=int, default=48)
+    parser.add_argument('--threads', type=int, default=8)
+    parser.add_argument('--sections', type=int, default=500)
+    parser.add_argument('--workers', type=int, nargs='+', default=[0, 1, 2, 4])
+    args = parser.parse_args()
+
+    html = synthetic_page(args.sections)
+    print(f'{args.pages} pages of {len(html) / 1024:.0f} KiB, {args.threads} caller threads, '
+          f'{os.cpu_count()} CPUs')
+
+    baseline = None
+    for workers in args.workers:
+        elapsed, late_p50, late_p99 = run(workers, html, args.pages, args.threads)
+        throughput = args.pages / elapsed
+        baseline = baseline or throughput
+        label = 'inline' if workers == 0 else f'{workers} workers'
+        print(f'  {label:<12}{throughput:8.1f} pages/s  {throughput / baseline:5.2f}x  '
+              f'heartbeat late p50 {late_p50:6.1f} ms  p99 {late_p99:6.1f} ms')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,161 @@
+"""Local stand-in for the web: a generated corpus served over HTTP.
+
+Three kinds of page, each kind on its own port so the scraper's
+per-domain render decisions stay apart:
+
+- ``static``: server-rendered company profiles.
+- ``hydrated``: the same content server-side rendered by a JS framework,
+  with bundle scripts and a large inline state blob. Static extraction
+  finds the entity, so the scraper never launches a browser.
+- ``client``: an empty app shell that only renders in a browser; scraping
+  these needs Chrome.
+"""
+import json
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+KINDS = ('static', 'hydrated', 'client')
+
+INDUSTRIES = ['Manufacturing', 'Software', 'Logistics', 'Healthcare', 'Retail', 'Energy', 'Finance']
+WORDS = (
+    'lorem ipsum dolor sit amet consectetur adipiscing elit sed do eiusmod tempor incididunt ut '
+    'labore et dolore magna aliqua enim ad minim veniam quis nostrud exercitation ullamco laboris'
+).split()
+
+
+def _sentence(rng, words=16):
+    return ' '.join(rng.choice(WORDS) for _ in range(words)).capitalize() + '.'
+
+
+def company(rng, number):
+    name = f"{rng.choice(['Acme', 'Globex', 'Initech', 'Umbrella', 'Hooli', 'Vandelay'])} {number}"
+    return {
+        'name': name,
+        'industry': rng.choice(INDUSTRIES),
+        'about': ' '.join(_sentence(rng) for _ in range(rng.randint(3, 8))),
+        'phone': f'+1 (555) {rng.randint(100, 999)}-{rng.randint(1000, 9999)}',
+        'email': f'hello@company{number}.test',
+        'address': f'{rng.randint(1, 999)} Main St, Springfield, IL {rng.randint(10000, 99999)}'
+    }
+
+
+def _body(rng, entity, sections):
+    blocks = ''.join(
+        f'<section class="block-{i}"><h2>Section {i}</h2><p>{_sentence(rng, 30)}</p>'
+        f'<ul><li><a href="/page/{i}">Link {i}</a></li><li>{_sentence(rng, 6)}</li></ul></section>'
+        for i in range(sections)
+    )
+    return (
+        f'<header><nav><a href="/">Home</a> <a href="/about">About</a></nav></header>'
+        f'<main><h1>{entity["name"]}</h1><span class="industry">{entity["industry"]}</span>'
+        f'<div class="about">{entity["about"]}</div>{blocks}</main>'
+        f'<footer><address>{entity["address"]}</address>'
+        f'<a href="tel:{entity["phone"]}">{entity["phone"]}</a> '
+        f'<a href="mailto:{entity["email"]}">Email us</a></footer>'
+    )
+
+
+def _head(entity, extra=''):
+    return (
+        f'<head><title>{entity["name"]}</title>'
+        f'<meta name="description" content="{entity["about"][:150]}">'
+        f'<meta property="og:title" content="{entity["name"]}"><meta property="og:type" content="website">'
+        f'{extra}</head>'
+    )
+
+
+def static_page(rng, entity, sections):
+    return f'<!DOCTYPE html><html>{_head(entity)}<body>{_body(rng, entity, sections)}</body></html>'
+
+
+def hydrated_page(rng, entity, sections):
+    bundles = ''.join(f'<script src="/static/chunk-{i}.js" defer></script>' for i in range(8))
+    state = json.dumps({'props': {'company': entity, 'feed': [_sentence(rng, 40) for _ in range(sections * 4)]}})
+    return (
+        f'<!DOCTYPE html><html>{_head(entity, bundles)}<body>'
+        f'<div id="__next">{_body(rng, entity, sections)}</div>'
+        f'<script id="__NEXT_DATA__" type="application/json">{state}</script>'
+        f'<script>window.__REACT_HYDRATE__ = true;</script></body></html>'
+    )
+
+
+def client_page(rng, entity, sections):
+    markup = json.dumps(_body(rng, entity, sections))
+    return (
+        f'<!DOCTYPE html><html><head><title>Loading...</title></head><body><div id="root"></div>'
+        f'<script src="/static/react.js"></script>'
+        f'<script>document.getElementById("root").innerHTML = {markup};</script></body></html>'
+    )
+
+
+PAGE_BUILDERS = {'static': static_page, 'hydrated': hydrated_page, 'client': client_page}
+
+
+def build_corpus(pages, kinds=('static', 'hydrated'), sections=40, seed=1):
+    """``{kind: {path: (entity, html)}}`` with ``pages`` pages per kind."""
+    rng = random.Random(seed)
+    corpus = {}
+    for kind in kinds:
+        build = PAGE_BUILDERS[kind]
+        corpus[kind] = {}
+        for number in range(pages):
+            entity = company(rng, number)
+            corpus[kind][f'/{kind}/{number}'] = (entity, build(rng, entity, sections))
+    return corpus
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def do_GET(self):
+        site = self.server.site
+        if site.latency:
+            time.sleep(site.latency)
+        page = site.pages.get(self.path)
+        if page is None and self.path.startswith('/static/'):
+            body, content_type = b'/* bundle */', 'application/javascript'
+        elif page is None:
+            self.send_error(404)
+            return
+        else:
+            body, content_type = page[1].encode('utf-8'), 'text/html; charset=utf-8'
+        self.send_response(200)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class FixtureSite:
+    """Serve ``pages`` (``{path: (entity, html)}``) on a local port,
+    waiting ``latency`` seconds before each response.
+    """
+
+    def __init__(self, pages, latency=0.0):
+        self.pages = pages
+        self.latency = latency
+        self._server = ThreadingHTTPServer(('127.0.0.1', 0), _Handler)
+        self._server.daemon_threads = True
+        self._server.site = self
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+
+    @property
+    def base_url(self):
+        host, port = self._server.server_address
+        return f'http://{host}:{port}'
+
+    def urls(self):
+        return [self.base_url + path for path in self.pages]
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._server.shutdown()
+        self._server.server_close()
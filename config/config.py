@@ -1,3 +1,4 @@
+import json
 import os
 from dotenv import load_dotenv
 
@@ -11,3 +12,122 @@ class Config:
     OPENAI_API_KEY = os.getenv('OPENAI_API_KEY')
     GEMINI_DEFAULT_MODEL = os.getenv('GEMINI_DEFAULT_MODEL')
     GEMINI_API_KEY = os.getenv('GEMINI_API_KEY')
+
+    # Scraper
+    SCRAPER_DRIVER_POOL_SIZE = int(os.getenv('SCRAPER_DRIVER_POOL_SIZE', 2))
+    SCRAPER_DRIVER_MAX_PAGES = int(os.getenv('SCRAPER_DRIVER_MAX_PAGES', 50))
+    SCRAPER_DRIVER_LEASE_TIMEOUT = int(os.getenv('SCRAPER_DRIVER_LEASE_TIMEOUT', 30))
+    SCRAPER_BATCH_MAX_URLS = int(os.getenv('SCRAPER_BATCH_MAX_URLS', 500))
+    SCRAPER_BATCH_CONCURRENCY = int(os.getenv('SCRAPER_BATCH_CONCURRENCY', 20))
+    SCRAPER_BATCH_PER_HOST = int(os.getenv('SCRAPER_BATCH_PER_HOST', 4))
+    SCRAPER_HTTP_MAX_CONNECTIONS = int(os.getenv('SCRAPER_HTTP_MAX_CONNECTIONS', 100))
+    SCRAPER_HTTP_PER_HOST = int(os.getenv('SCRAPER_HTTP_PER_HOST', 10))
+    SCRAPER_CONNECT_TIMEOUT = float(os.getenv('SCRAPER_CONNECT_TIMEOUT', 5))
+    SCRAPER_READ_TIMEOUT = float(os.getenv('SCRAPER_READ_TIMEOUT', 10))
+    SCRAPER_HTTP2 = os.getenv('SCRAPER_HTTP2', 'false').lower() == 'true'
+    SCRAPER_MAX_BYTES = int(os.getenv('SCRAPER_MAX_BYTES', 5 * 1024 * 1024))
+    # Empty means lxml when installed, else the stdlib html.parser
+    SCRAPER_HTML_PARSER = os.getenv('SCRAPER_HTML_PARSER') or None
+    # Processes that parse and extract HTML off the request thread; 0 parses inline
+    SCRAPER_PARSE_WORKERS = int(os.getenv('SCRAPER_PARSE_WORKERS', 2))
+    SCRAPER_PARSE_MAX_TASKS_PER_CHILD = int(os.getenv('SCRAPER_PARSE_MAX_TASKS_PER_CHILD', 500)) or None
+    # Seconds a worker may spend on one page before it is killed; 0 waits forever
+    SCRAPER_PARSE_TIMEOUT = float(os.getenv('SCRAPER_PARSE_TIMEOUT', 30)) or None
+    # Per-domain field selectors; edits are picked up without a restart
+    SCRAPER_EXTRACTION_RULES = os.getenv(
+        'SCRAPER_EXTRACTION_RULES', os.path.join(os.path.dirname(__file__), 'extraction_rules.json')
+    )
+    SCRAPER_EXTRACTION_RULES_CHECK_INTERVAL = float(os.getenv('SCRAPER_EXTRACTION_RULES_CHECK_INTERVAL', 5))
+    SCRAPER_RENDER_CACHE_TTL = int(os.getenv('SCRAPER_RENDER_CACHE_TTL', 86400))
+    SCRAPER_RENDER_PAGE_LOAD_STRATEGY = os.getenv('SCRAPER_RENDER_PAGE_LOAD_STRATEGY', 'eager')
+    SCRAPER_RENDER_BLOCK_RESOURCES = os.getenv('SCRAPER_RENDER_BLOCK_RESOURCES', 'true').lower() == 'true'
+    SCRAPER_RENDER_BLOCK_TRACKERS = os.getenv('SCRAPER_RENDER_BLOCK_TRACKERS', 'true').lower() == 'true'
+    # Extra comma-separated URL patterns to block, e.g. "*cdn.example.com/ads*"
+    SCRAPER_RENDER_BLOCKLIST = [p for p in os.getenv('SCRAPER_RENDER_BLOCKLIST', '').split(',') if p]
+    SCRAPER_RENDER_QUIET_MS = int(os.getenv('SCRAPER_RENDER_QUIET_MS', 500))
+    SCRAPER_RENDER_MAX_WAIT = float(os.getenv('SCRAPER_RENDER_MAX_WAIT', 10))
+
+    # Scrape result cache
+    SCRAPE_CACHE_TTL = int(os.getenv('SCRAPE_CACHE_TTL', 3600))
+    SCRAPE_CACHE_MAX_ENTRIES = int(os.getenv('SCRAPE_CACHE_MAX_ENTRIES', 1024))
+
+    # Raw HTML snapshots for offline re-extraction
+    SNAPSHOTS_ENABLED = os.getenv('SNAPSHOTS_ENABLED', 'true').lower() == 'true'
+    SNAPSHOT_DIR = os.getenv('SNAPSHOT_DIR', 'snapshots')
+
+    # Same-domain crawl mode; these are also the per-request ceilings
+    CRAWL_MAX_DEPTH = int(os.getenv('CRAWL_MAX_DEPTH', 2))
+    CRAWL_MAX_PAGES = int(os.getenv('CRAWL_MAX_PAGES', 20))
+    CRAWL_CONCURRENCY = int(os.getenv('CRAWL_CONCURRENCY', 4))
+    CRAWL_POLITENESS_DELAY = float(os.getenv('CRAWL_POLITENESS_DELAY', 0.5))
+    CRAWL_BLOOM_CAPACITY = int(os.getenv('CRAWL_BLOOM_CAPACITY', 100000))
+
+    # LLM response cache; identical prompts are answered without a model call
+    LLM_CACHE_ENABLED = os.getenv('LLM_CACHE_ENABLED', 'true').lower() == 'true'
+    LLM_CACHE_TTL = int(os.getenv('LLM_CACHE_TTL', 7 * 86400))
+    LLM_CACHE_MAX_ENTRIES = int(os.getenv('LLM_CACHE_MAX_ENTRIES', 10000))
+    LLM_CACHE_MEMORY_ENTRIES = int(os.getenv('LLM_CACHE_MEMORY_ENTRIES', 256))
+    LLM_CACHE_MEMORY_TTL = int(os.getenv('LLM_CACHE_MEMORY_TTL', 300))
+
+    # Prompts estimated above LLM_CONTEXT_MAX_TOKENS have their long input
+    # summarized in chunks first
+    LLM_CONTEXT_MAX_TOKENS = int(os.getenv('LLM_CONTEXT_MAX_TOKENS', 6000))
+    LLM_CHUNK_TOKENS = int(os.getenv('LLM_CHUNK_TOKENS', 2000))
+    LLM_CHUNK_OVERLAP = int(os.getenv('LLM_CHUNK_OVERLAP', 100))
+    LLM_MAX_CHUNKS = int(os.getenv('LLM_MAX_CHUNKS', 16))
+    LLM_CHUNK_CONCURRENCY = int(os.getenv('LLM_CHUNK_CONCURRENCY', 4))
+
+    # LLM client: 'gemini', or 'fake' to run offline against a canned model
+    LLM_BACKEND = os.getenv('LLM_BACKEND', 'gemini')
+    LLM_FAKE_LATENCY = float(os.getenv('LLM_FAKE_LATENCY', 0.2))
+    LLM_FAKE_FAILURE_RATE = float(os.getenv('LLM_FAKE_FAILURE_RATE', 0))
+    # Seconds per attempt, and overall across one call's retries
+    LLM_TIMEOUT = float(os.getenv('LLM_TIMEOUT', 12))
+    LLM_DEADLINE = float(os.getenv('LLM_DEADLINE', 14))
+    # Seconds a web request's model work may take in all: condensing, the
+    # call and any fallback. Keep it under the gunicorn worker timeout (30s)
+    LLM_REQUEST_DEADLINE = float(os.getenv('LLM_REQUEST_DEADLINE', 25))
+    LLM_MAX_ATTEMPTS = int(os.getenv('LLM_MAX_ATTEMPTS', 3))
+    LLM_BACKOFF_BASE = float(os.getenv('LLM_BACKOFF_BASE', 0.5))
+    LLM_BACKOFF_MAX = float(os.getenv('LLM_BACKOFF_MAX', 8))
+    # Consecutive failures that open the circuit, and seconds it stays open
+    LLM_BREAKER_THRESHOLD = int(os.getenv('LLM_BREAKER_THRESHOLD', 5))
+    LLM_BREAKER_RESET = float(os.getenv('LLM_BREAKER_RESET', 30))
+
+    # Model routing: prompts estimated at up to LLM_SMALL_PROMPT_TOKENS go to
+    # the fast tier, larger ones to the tier LLM_TASK_TIERS names for their
+    # task. A tier averaging over its latency target is routed around for
+    # LLM_SLOW_COOLDOWN seconds; each tier falls back to the other
+    LLM_FAST_MODEL = os.getenv('LLM_FAST_MODEL', 'gemini-1.5-flash-8b')
+    LLM_STRONG_MODEL = os.getenv('LLM_STRONG_MODEL', GEMINI_DEFAULT_MODEL or 'gemini-1.5-flash')
+    LLM_SMALL_PROMPT_TOKENS = int(os.getenv('LLM_SMALL_PROMPT_TOKENS', 500))
+    LLM_FAST_LATENCY_TARGET_MS = int(os.getenv('LLM_FAST_LATENCY_TARGET_MS', 4000))
+    LLM_STRONG_LATENCY_TARGET_MS = int(os.getenv('LLM_STRONG_LATENCY_TARGET_MS', 10000))
+    LLM_SLOW_COOLDOWN = float(os.getenv('LLM_SLOW_COOLDOWN', 60))
+    LLM_TASK_TIERS = {'scraped_data': 'strong', 'custom': 'strong', 'chunk_summary': 'fast'}
+
+    # Pin prompt templates to a version, e.g. {"scraped_data": 1}; unpinned ones use their latest
+    LLM_PROMPT_VERSIONS = json.loads(os.getenv('LLM_PROMPT_VERSIONS', '{}'))
+
+    # Tokens each user may spend per UTC day unless their own budget is set; 0 means no limit
+    LLM_DAILY_TOKEN_BUDGET = int(os.getenv('LLM_DAILY_TOKEN_BUDGET', 500000)) or None
+
+    # Bulk analysis of stored scraped data
+    ANALYSIS_CONCURRENCY = int(os.getenv('ANALYSIS_CONCURRENCY', 5))
+    ANALYSIS_RPM = int(os.getenv('ANALYSIS_RPM', 60))
+    # Tokens one bulk run may spend; 0 means no limit
+    ANALYSIS_TOKEN_BUDGET = int(os.getenv('ANALYSIS_TOKEN_BUDGET', 200000)) or None
+    ANALYSIS_BATCH_SIZE = int(os.getenv('ANALYSIS_BATCH_SIZE', 50))
+    ANALYSIS_MAX_ROWS = int(os.getenv('ANALYSIS_MAX_ROWS', 1000))
+
+    # Background jobs
+    JOBS_WORKERS = int(os.getenv('JOBS_WORKERS', 2))
+    JOBS_POLL_INTERVAL = float(os.getenv('JOBS_POLL_INTERVAL', 2))
+    JOBS_MAX_ATTEMPTS = int(os.getenv('JOBS_MAX_ATTEMPTS', 3))
+    JOBS_RETRY_DELAY = int(os.getenv('JOBS_RETRY_DELAY', 10))
+    # A running job whose last checkpoint is older than this is presumed dead and reclaimed
+    JOBS_LEASE_TIMEOUT = int(os.getenv('JOBS_LEASE_TIMEOUT', 600))
+
+    # List endpoints and dashboard lists: rows per page, and the most a client may ask for
+    LIST_PAGE_SIZE = int(os.getenv('LIST_PAGE_SIZE', 50))
+    LIST_MAX_PAGE_SIZE = int(os.getenv('LIST_MAX_PAGE_SIZE', 200))
@@ -0,0 +1,126 @@
+import click
+from flask import current_app
+from flask.cli import AppGroup
+
+from .models.models import db, ScrapedData, ScrapeCacheEntry
+from .service.bulk_analysis import BulkAnalyzer, scraped_data_query
+from .service.extraction_rules import RuleRegistry
+from .service.registry import get_prompt_handler, get_usage_meter
+from .service.extractor import DocumentExtractor
+from .service.snapshots import SnapshotStore
+
+scraper_cli = AppGroup('scraper', help='Scraper maintenance commands.')
+
+
+def _batches(query, key_column, batch_size):
+    """Yield rows in ``key_column`` order without holding them all in memory."""
+    last_key = None
+    while True:
+        page = query
+        if last_key is not None:
+            page = page.filter(key_column > last_key)
+        rows = page.order_by(key_column).limit(batch_size).all()
+        if not rows:
+            return
+        yield rows
+        last_key = getattr(rows[-1], key_column.key)
+
+
+@scraper_cli.command('reextract')
+@click.option('--batch-size', default=200, show_default=True, help='Rows updated per transaction.')
+@click.option('--user', 'user_id', default=None, help='Only re-extract this user\'s rows.')
+@click.option('--cache/--no-cache', default=True, show_default=True,
+              help='Also refresh scrape cache entries that have a snapshot.')
+def reextract(batch_size, user_id, cache):
+    """Re-run extraction over stored HTML snapshots, with no network I/O."""
+    store = SnapshotStore(current_app.config['SNAPSHOT_DIR'])
+    extractor = DocumentExtractor(
+        parser=current_app.config['SCRAPER_HTML_PARSER'],
+        rules=RuleRegistry(current_app.config['SCRAPER_EXTRACTION_RULES'])
+    )
+    updated = missing = 0
+
+    query = ScrapedData.query.filter(ScrapedData.snapshot_hash.isnot(None))
+    if user_id:
+        query = query.filter_by(created_by_user_id=user_id)
+
+    for rows in _batches(query, ScrapedData.id, batch_size):
+        # Rows of the same page share a snapshot; extract each one once
+        documents = {}
+        for row in rows:
+            digest = row.snapshot_hash
+            if digest not in documents:
+                html = store.get(digest)
+                documents[digest] = extractor.extract(html, row.url) if html is not None else None
+            document = documents[digest]
+            if document is None:
+                missing += 1
+                continue
+            row.content = document['content']
+            row.page_metadata = document['metadata']
+            updated += 1
+        db.session.commit()
+        click.echo(f'Scraped data: {updated} updated, {missing} without a snapshot')
+
+    if not cache:
+        return
+
+    cache_updated = 0
+    cache_query = ScrapeCacheEntry.query.filter(ScrapeCacheEntry.content_hash.isnot(None))
+    for rows in _batches(cache_query, ScrapeCacheEntry.url_key, batch_size):
+        for row in rows:
+            html = store.get(row.content_hash)
+            if html is None:
+                continue
+            document = extractor.extract(html, row.normalized_url)
+            row.content = document['content']
+            row.page_metadata = document['metadata']
+            cache_updated += 1
+        db.session.commit()
+    click.echo(f'Scrape cache: {cache_updated} entries updated')
+
+
+@scraper_cli.command('analyze')
+@click.option('--user', 'user_id', required=True, help='Analyze this user\'s rows and log under them.')
+@click.option('--id', 'ids', multiple=True, help='A ScrapedData id; repeat for several.')
+@click.option('--url-contains', default=None, help='Only rows whose URL contains this.')
+@click.option('--since', default=None, help='Only rows created at or after this ISO date.')
+@click.option('--until', default=None, help='Only rows created before this ISO date.')
+@click.option('--limit', type=int, default=None, help='Analyze at most this many rows.')
+@click.option('--concurrency', type=int, default=None, help='Concurrent model calls.')
+@click.option('--rpm', type=int, default=None, help='Model calls started per minute.')
+@click.option('--token-budget', type=int, default=None, help='Stop making calls after this many tokens.')
+@click.option('--refresh', is_flag=True, help='Ignore cached responses.')
+def analyze(user_id, ids, url_contains, since, until, limit, concurrency, rpm, token_budget, refresh):
+    """Run the LLM analysis over stored scraped data."""
+    config = current_app.config
+    query = scraped_data_query(
+        user_id, ids=list(ids), url_contains=url_contains, created_after=since, created_before=until
+    )
+    rows = query.limit(limit or config['ANALYSIS_MAX_ROWS']).all()
+    if not rows:
+        click.echo('No scraped data matches')
+        return
+
+    analyzer = BulkAnalyzer(
+        get_prompt_handler(),
+        concurrency=concurrency or config['ANALYSIS_CONCURRENCY'],
+        rpm=rpm or config['ANALYSIS_RPM'],
+        token_budget=get_usage_meter().cap(user_id, token_budget or config['ANALYSIS_TOKEN_BUDGET']),
+        batch_size=config['ANALYSIS_BATCH_SIZE'],
+        refresh=refresh
+    )
+    committed = []
+
+    def report(row_ids):
+        committed.extend(row_ids)
+        click.echo(f'{len(committed)}/{len(rows)} analyses saved')
+
+    summary = analyzer.analyze(rows, user_id, on_batch=report)
+    click.echo(
+        f"Analyzed {summary['analyzed']} ({summary['cache_hits']} from cache), "
+        f"{summary['failed']} failed, {summary['skipped_budget']} skipped by the token budget; "
+        f"{summary['tokens_used']} tokens used, {summary['tokens_saved']} saved"
+    )
+    for error in summary['errors']:
+        click.echo(f"  {error['id']}: {error['error']}")
@@ -1,11 +1,12 @@
 from datetime import datetime
+from flask_login import UserMixin
 from flask_sqlalchemy import SQLAlchemy
 import uuid
 from sqlalchemy.dialects.postgresql import JSON
 
 db = SQLAlchemy()
 
-class User(db.Model):
+class User(UserMixin, db.Model):
     __tablename__ = 'users'
     
     id = db.Column(db.String(36), primary_key=True, default=lambda: str(uuid.uuid4()))
@@ -13,6 +14,7 @@ class User(db.Model):
     email = db.Column(db.String(120), unique=True, nullable=False)
     social_login_provider = db.Column(db.String(50), nullable=False)  # Google or Facebook
     profile_picture = db.Column(db.String(500))
+    daily_token_budget = db.Column(db.Integer)  # LLM tokens per UTC day; None uses the app default
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     
     # Relationships
@@ -34,13 +36,18 @@ class User(db.Model):
 
 class ScrapedData(db.Model):
     __tablename__ = 'scraped_data'
+    __table_args__ = (
+        # A user's rows newest first, a page at a time
+        db.Index('ix_scraped_data_user_created_at', 'created_by_user_id', 'created_at'),
+    )
     
     id = db.Column(db.String(36), primary_key=True, default=lambda: str(uuid.uuid4()))
     url = db.Column(db.String(500), nullable=False)
     content = db.Column(JSON, nullable=False)  # Stores structured data like Name, About, Source, Industry, etc.
     page_metadata = db.Column(JSON)  # Stores title, description, etc.
+    snapshot_hash = db.Column(db.String(64), index=True)  # Raw HTML in the snapshot store, if kept
     created_by_user_id = db.Column(db.String(36), db.ForeignKey('users.id', ondelete='CASCADE'), nullable=False)
-    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    created_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
 
     def __repr__(self):
         return f'<ScrapedData {self.url}>'
@@ -64,13 +71,28 @@ class ScrapedData(db.Model):
 
 class PromptLog(db.Model):
     __tablename__ = 'prompt_logs'
+    __table_args__ = (
+        # Per-user usage over a date range
+        db.Index('ix_prompt_logs_user_created_at', 'created_by_user_id', 'created_at'),
+    )
     
     id = db.Column(db.String(36), primary_key=True, default=lambda: str(uuid.uuid4()))
     prompt_text = db.Column(db.Text, nullable=False)
     generated_output = db.Column(db.Text, nullable=False)
     tokens_used = db.Column(db.Integer)  # Added to track token usage for API costs
+    model = db.Column(db.String(100))  # Model that produced the response
+    template_version = db.Column(db.String(100))  # Prompt template and version, e.g. scraped_data:v1
+    prompt_tokens = db.Column(db.Integer)  # Input tokens reported by the model
+    completion_tokens = db.Column(db.Integer)  # Output tokens reported by the model
+    latency_ms = db.Column(db.Integer)  # Wall-clock time to produce the response
+    cache_hit = db.Column(db.Boolean, nullable=False, default=False)  # Served from the LLM response cache
+    tokens_saved = db.Column(db.Integer, nullable=False, default=0)  # Tokens the cached response originally cost
+    latency_saved_ms = db.Column(db.Integer, nullable=False, default=0)  # Model latency the cache hit avoided
+    ttft_ms = db.Column(db.Integer)  # Time to first token, for streamed responses
     created_by_user_id = db.Column(db.String(36), db.ForeignKey('users.id', ondelete='CASCADE'), nullable=False)
-    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    created_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    # Start of the output, for lists that show a line of it without loading it all
+    output_preview = db.column_property(db.func.substr(generated_output, 1, 100), deferred=True)
 
     def __repr__(self):
         return f'<PromptLog {self.id}>'
@@ -87,6 +109,15 @@ class PromptLog(db.Model):
                 'prompt_text': self.prompt_text,
                 'generated_output': self.generated_output,
                 'tokens_used': self.tokens_used,
+                'model': self.model,
+                'template_version': self.template_version,
+                'prompt_tokens': self.prompt_tokens,
+                'completion_tokens': self.completion_tokens,
+                'latency_ms': self.latency_ms,
+                'cache_hit': self.cache_hit,
+                'tokens_saved': self.tokens_saved,
+                'latency_saved_ms': self.latency_saved_ms,
+                'ttft_ms': self.ttft_ms,
                 'created_at': created_at_str
             }
         except Exception as e:
@@ -96,5 +127,91 @@ class PromptLog(db.Model):
                 'prompt_text': self.prompt_text,
                 'generated_output': self.generated_output,
                 'tokens_used': self.tokens_used,
+                'model': self.model,
+                'template_version': self.template_version,
+                'prompt_tokens': self.prompt_tokens,
+                'completion_tokens': self.completion_tokens,
+                'latency_ms': self.latency_ms,
+                'cache_hit': self.cache_hit,
+                'tokens_saved': self.tokens_saved,
+                'latency_saved_ms': self.latency_saved_ms,
+                'ttft_ms': self.ttft_ms,
                 'created_at': str(self.created_at) if self.created_at else None
             }
+
+class ScrapeCacheEntry(db.Model):
+    __tablename__ = 'scrape_cache'
+
+    url_key = db.Column(db.String(64), primary_key=True)  # sha256 of the normalized URL
+    normalized_url = db.Column(db.Text, nullable=False)
+    content_hash = db.Column(db.String(64))  # sha256 of the fetched HTML
+    content = db.Column(JSON)
+    page_metadata = db.Column(JSON)
+    analysis = db.Column(db.Text)  # Cached LLM analysis of this exact content
+    analysis_tokens = db.Column(db.Integer)
+    fetched_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+    def __repr__(self):
+        return f'<ScrapeCacheEntry {self.normalized_url}>'
+
+    def to_dict(self):
+        return {
+            'normalized_url': self.normalized_url,
+            'content_hash': self.content_hash,
+            'content': self.content,
+            'metadata': self.page_metadata,
+            'analysis': self.analysis,
+            'analysis_tokens': self.analysis_tokens,
+            'fetched_at': self.fetched_at.isoformat() if self.fetched_at else None
+        }
+
+class LLMCacheEntry(db.Model):
+    __tablename__ = 'llm_cache'
+
+    cache_key = db.Column(db.String(64), primary_key=True)  # sha256 of model, temperature, prompt and inputs
+    model = db.Column(db.String(100))
+    response = db.Column(db.Text, nullable=False)
+    tokens_used = db.Column(db.Integer)
+    latency_ms = db.Column(db.Integer)  # How long the model took to produce it
+    hits = db.Column(db.Integer, nullable=False, default=0)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow, index=True)  # TTL eviction
+    last_hit_at = db.Column(db.DateTime, default=datetime.utcnow, index=True)  # LRU eviction
+
+    def __repr__(self):
+        return f'<LLMCacheEntry {self.cache_key}>'
+
+class Job(db.Model):
+    __tablename__ = 'jobs'
+
+    id = db.Column(db.String(36), primary_key=True, default=lambda: str(uuid.uuid4()))
+    kind = db.Column(db.String(50), nullable=False)  # Which handler runs it, e.g. scrape_and_analyze
+    status = db.Column(db.String(20), nullable=False, default='queued', index=True)  # queued, running, succeeded, failed
+    payload = db.Column(JSON, nullable=False)
+    result = db.Column(JSON)  # Checkpointed step results, then the final result
+    error = db.Column(db.Text)
+    attempts = db.Column(db.Integer, nullable=False, default=0)
+    max_attempts = db.Column(db.Integer, nullable=False, default=3)
+    run_after = db.Column(db.DateTime, default=datetime.utcnow)  # Retry backoff
+    created_by_user_id = db.Column(db.String(36), db.ForeignKey('users.id', ondelete='CASCADE'), nullable=False)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    started_at = db.Column(db.DateTime)
+    heartbeat_at = db.Column(db.DateTime)  # Renewed by checkpoints; once stale, another worker may reclaim the job
+    finished_at = db.Column(db.DateTime)
+
+    def __repr__(self):
+        return f'<Job {self.kind} {self.id} {self.status}>'
+
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'kind': self.kind,
+            'status': self.status,
+            'payload': self.payload,
+            'result': self.result,
+            'error': self.error,
+            'attempts': self.attempts,
+            'max_attempts': self.max_attempts,
+            'created_at': self.created_at.isoformat() if self.created_at else None,
+            'started_at': self.started_at.isoformat() if self.started_at else None,
+            'finished_at': self.finished_at.isoformat() if self.finished_at else None
+        }
@@ -0,0 +1,80 @@
+import asyncio
+import functools
+import logging
+from concurrent.futures import ThreadPoolExecutor
+
+import aiohttp
+
+from .http_client import BodyReader, FetchError, check_content_length, check_content_type, check_status
+
+logger = logging.getLogger(__name__)
+
+
+class BatchScraper:
+    """Scrape many URLs at once.
+
+    Static pages are fetched concurrently with aiohttp, bounded by a global
+    and a per-host connection limit. Parsing, and the Selenium render for
+    JS-heavy pages, runs on a small thread pool so the browser path is
+    shared with the scraper's driver pool.
+    """
+
+    def __init__(self, scraper, concurrency=20, per_host=4, render_workers=2, timeout=10,
+                 max_bytes=5 * 1024 * 1024):
+        self.scraper = scraper
+        self.max_bytes = max_bytes
+        self.concurrency = concurrency
+        self.per_host = per_host
+        self.render_workers = render_workers
+        self.timeout = timeout
+
+    def scrape_urls(self, urls):
+        """Return one result dict per URL, in input order."""
+        return asyncio.run(self._scrape_all(urls))
+
+    async def _scrape_all(self, urls):
+        connector = aiohttp.TCPConnector(limit=self.concurrency, limit_per_host=self.per_host)
+        timeout = aiohttp.ClientTimeout(total=self.timeout)
+
+        with ThreadPoolExecutor(max_workers=self.render_workers) as executor:
+            async with aiohttp.ClientSession(connector=connector, timeout=timeout) as session:
+                tasks = [self._scrape_one(session, executor, url) for url in urls]
+                return await asyncio.gather(*tasks)
+
+    async def _scrape_one(self, session, executor, url):
+        loop = asyncio.get_running_loop()
+        try:
+            decision = self.scraper.render_cache.lookup(url)
+            if decision:
+                # Known JS-heavy domain: go straight to the browser path
+                return await self._run(loop, executor, url, self.scraper.render_url, url)
+            html, final_url = await self._fetch_html(session, url)
+        except FetchError as e:
+            return {'url': url, 'status': 'error', 'error': str(e), 'error_code': e.code}
+        except Exception as e:
+            logger.warning(f"Batch fetch failed for {url}: {str(e)}")
+            return {'url': url, 'status': 'error', 'error': str(e) or type(e).__name__}
+
+        scrape = functools.partial(self.scraper.scrape_html, html, url, decision, final_url=final_url)
+        return await self._run(loop, executor, url, scrape)
+
+    async def _fetch_html(self, session, url):
+        async with session.get(url) as response:
+            check_status(url, response.status)
+            check_content_type(url, response.headers.get('Content-Type'))
+            check_content_length(url, response.headers.get('Content-Length'), self.max_bytes)
+
+            reader = BodyReader(url, response.charset, self.max_bytes)
+            async for chunk in response.content.iter_chunked(64 * 1024):
+                reader.feed(chunk)
+            return reader.text(), str(response.url)
+
+    async def _run(self, loop, executor, url, fn, *args):
+        try:
+            result = await loop.run_in_executor(executor, fn, *args)
+        except Exception as e:
+            logger.warning(f"Batch extraction failed for {url}: {str(e)}")
+            return {'url': url, 'status': 'error', 'error': str(e)}
+
+        result['url'] = url
+        return result
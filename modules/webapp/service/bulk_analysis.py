@@ -0,0 +1,158 @@
+import asyncio
+import logging
+from datetime import datetime
+
+from ..models.models import db, ScrapedData, PromptLog
+
+logger = logging.getLogger(__name__)
+
+MAX_REPORTED_ERRORS = 20
+
+
+class TokenBudgetExceeded(Exception):
+    """The run's token budget is spent; no further model calls are made."""
+
+
+class CallLimiter:
+    """Gate for model calls: a concurrency cap, a request rate and a token budget.
+
+    Call starts are spaced ``60 / rpm`` seconds apart rather than allowed
+    to burst, which keeps well inside per-minute provider quotas. Entering
+    raises ``TokenBudgetExceeded`` once ``spend`` has used up
+    ``token_budget``; calls already in flight finish, so the budget can be
+    overshot by at most ``concurrency`` calls.
+    """
+
+    def __init__(self, concurrency=5, rpm=None, token_budget=None):
+        self._semaphore = asyncio.Semaphore(concurrency)
+        self._interval = 60.0 / rpm if rpm else 0
+        self._next_start = 0.0
+        self.token_budget = token_budget
+        self.tokens_spent = 0
+
+    @property
+    def exhausted(self):
+        return self.token_budget is not None and self.tokens_spent >= self.token_budget
+
+    def spend(self, tokens):
+        self.tokens_spent += tokens or 0
+
+    async def __aenter__(self):
+        await self._semaphore.acquire()
+        try:
+            if self._interval:
+                loop = asyncio.get_running_loop()
+                now = loop.time()
+                start = max(now, self._next_start)
+                self._next_start = start + self._interval
+                if start > now:
+                    await asyncio.sleep(start - now)
+            # Checked after waiting, as the budget may have run out meanwhile
+            if self.exhausted:
+                raise TokenBudgetExceeded()
+        except BaseException:
+            self._semaphore.release()
+            raise
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        self._semaphore.release()
+
+
+def scraped_data_query(user_id, ids=None, url_contains=None, created_after=None, created_before=None):
+    """A user's ScrapedData rows, optionally narrowed by id, URL and date."""
+    query = ScrapedData.query.filter_by(created_by_user_id=user_id)
+    if ids:
+        query = query.filter(ScrapedData.id.in_(ids))
+    if url_contains:
+        query = query.filter(ScrapedData.url.contains(url_contains))
+    if created_after:
+        query = query.filter(ScrapedData.created_at >= _as_datetime(created_after))
+    if created_before:
+        query = query.filter(ScrapedData.created_at < _as_datetime(created_before))
+    return query.order_by(ScrapedData.created_at, ScrapedData.id)
+
+
+def _as_datetime(value):
+    return value if isinstance(value, datetime) else datetime.fromisoformat(value)
+
+
+class BulkAnalyzer:
+    """Run the scraped-data analysis over many stored rows concurrently.
+
+    Model calls go through the async chain API behind a ``CallLimiter``.
+    Each analysis becomes a ``PromptLog``; logs are committed
+    ``batch_size`` at a time. ``on_batch`` is called with the ids of the
+    rows in each batch just before its commit, so a caller can checkpoint
+    progress in the same transaction as the logs.
+    """
+
+    def __init__(self, prompt_handler, concurrency=5, rpm=60, token_budget=None, batch_size=50,
+                 refresh=False):
+        self.prompt_handler = prompt_handler
+        self.concurrency = concurrency
+        self.rpm = rpm
+        self.token_budget = token_budget
+        self.batch_size = batch_size
+        self.refresh = refresh
+
+    def analyze(self, rows, user_id, on_batch=None):
+        """Analyze ``rows`` (ScrapedData) on behalf of ``user_id``; return a summary."""
+        items = [{'id': row.id, 'url': row.url, 'content': row.content or {}} for row in rows]
+        return asyncio.run(self._analyze_all(items, user_id, on_batch))
+
+    async def _analyze_all(self, items, user_id, on_batch):
+        limiter = CallLimiter(self.concurrency, rpm=self.rpm, token_budget=self.token_budget)
+        summary = {
+            'total': len(items),
+            'analyzed': 0,
+            'cache_hits': 0,
+            'failed': 0,
+            'skipped_budget': 0,
+            'tokens_used': 0,
+            'tokens_saved': 0,
+            'errors': []
+        }
+        pending = []
+
+        def flush():
+            if not pending:
+                return
+            db.session.add_all(log for _, log in pending)
+            if on_batch is not None:
+                on_batch([row_id for row_id, _ in pending])
+            db.session.commit()
+            pending.clear()
+
+        async def analyze_one(item):
+            try:
+                response, tokens, meta = await self.prompt_handler.aprocess_scraped_data(
+                    item, refresh=self.refresh, limiter=limiter
+                )
+            except TokenBudgetExceeded:
+                summary['skipped_budget'] += 1
+                return
+            except Exception as e:
+                logger.warning(f"Bulk analysis failed for {item['id']}: {str(e)}")
+                summary['failed'] += 1
+                if len(summary['errors']) < MAX_REPORTED_ERRORS:
+                    summary['errors'].append({'id': item['id'], 'error': str(e)})
+                return
+
+            summary['analyzed'] += 1
+            summary['cache_hits'] += int(meta['cache_hit'])
+            summary['tokens_used'] += tokens
+            summary['tokens_saved'] += meta['tokens_saved']
+            pending.append((item['id'], PromptLog(
+                prompt_text=f"Analyze scraped data from: {item['url']}",
+                generated_output=response,
+                tokens_used=tokens,
+                created_by_user_id=user_id,
+                **meta
+            )))
+            if len(pending) >= self.batch_size:
+                flush()
+
+        await asyncio.gather(*(analyze_one(item) for item in items))
+        flush()
+        return summary
@@ -0,0 +1,123 @@
+import re
+from urllib.parse import unquote
+
+# Text under these tags is never shown, so it is left out of the buffer
+INVISIBLE_TAGS = frozenset(['script', 'style', 'noscript', 'template', 'head', 'title'])
+
+# "+44 20 7946 0958", "+1 (555) 123-4567"
+_INTERNATIONAL_PHONE = r'\+\d{1,3}(?:[ \t.-]?\(?\d{1,4}\)?){2,5}'
+# "(555) 123-4567", "555.123.4567", "020 7946 0958"
+_NATIONAL_PHONE = r'\(?\d{2,5}\)?[ \t.-]\d{3,4}[ \t.-]\d{3,4}'
+
+PHONE_PATTERN = re.compile(
+    rf'(?<![\w.+/-])(?:{_INTERNATIONAL_PHONE}|{_NATIONAL_PHONE})'
+    r'(?:[ \t]*(?:ext\.?|x)[ \t]*\d{1,5})?'
+    r'(?![\w/-]|\.\d)',
+    re.IGNORECASE
+)
+EMAIL_PATTERN = re.compile(
+    r'(?<![\w.%+-])[A-Za-z0-9._%+-]+@(?:[A-Za-z0-9-]+\.)+[A-Za-z]{2,24}(?![\w@-])'
+)
+STREET_SUFFIXES = (
+    r'Street|St|Avenue|Ave|Road|Rd|Boulevard|Blvd|Lane|Ln|Drive|Dr|Court|Ct|'
+    r'Way|Place|Pl|Square|Sq|Parkway|Pkwy|Highway|Hwy|Terrace|Circle|Cir'
+)
+# "123 Main Street, Suite 4, Springfield, IL 62704"; the city/state part
+# may follow on the next text node, as after a <br>
+ADDRESS_PATTERN = re.compile(
+    r'\b\d{1,6}[ \t]+(?:[A-Z][\w\'.-]*[ \t]+){1,5}'
+    rf'(?:{STREET_SUFFIXES})\b\.?'
+    r'(?:,?[ \t]*(?:Suite|Ste|Unit|Floor|Fl|#)\.?[ \t]*[\w-]+)?'
+    r'(?:,?\s*[A-Z][A-Za-z .\'-]{1,40}?,[ \t]*[A-Z]{2}[ \t]+\d{5}(?:-\d{4})?)?'
+)
+
+_IMAGE_SUFFIXES = ('.png', '.jpg', '.jpeg', '.gif', '.svg', '.webp')
+_ISO_DATE = re.compile(r'^\d{4}[.-]\d{2}[.-]\d{2}$')
+_WHITESPACE = re.compile(r'\s+')
+_NON_DIGIT = re.compile(r'\D')
+_EXTENSION = re.compile(r'^(?P<number>.*?)(?:\s*(?:ext\.?|x)\s*(?P<extension>\d+))?$', re.IGNORECASE)
+
+
+def normalize_phone(raw):
+    """Digits only, keeping a leading ``+``; None if it can't be a phone."""
+    number, extension = _EXTENSION.match(raw.strip()).group('number', 'extension')
+    if _ISO_DATE.match(number):
+        return None
+    digits = _NON_DIGIT.sub('', number)
+    if not 7 <= len(digits) <= 15:
+        return None
+    normalized = ('+' if number.startswith('+') else '') + digits
+    if extension:
+        normalized += f' x{extension}'
+    return normalized
+
+
+def normalize_email(raw):
+    email = unquote(raw).strip().strip('.').lower()
+    if email.endswith(_IMAGE_SUFFIXES):
+        # Retina asset names like logo@2x.png
+        return None
+    return email
+
+
+def normalize_address(raw):
+    return _WHITESPACE.sub(' ', raw).strip(' ,')
+
+
+def _unique(values, normalize, covered=None):
+    """Normalize ``values`` and drop blanks and repeats.
+
+    Without ``covered`` only exact repeats are dropped; with it, any value
+    ``covered(value, kept)`` says is already represented.
+    """
+    seen = set()
+    result = []
+    for value in values:
+        value = normalize(value)
+        if not value or value in seen:
+            continue
+        if covered is not None and any(covered(value, kept) for kept in result):
+            continue
+        seen.add(value)
+        result.append(value)
+    return result
+
+
+def _same_phone(phone, kept):
+    # "5551234567" is the national form of "+15551234567"
+    digits, kept_digits = phone.lstrip('+'), kept.lstrip('+')
+    return digits == kept_digits or (
+        not (phone.startswith('+') and kept.startswith('+')) and
+        (digits.endswith(kept_digits) or kept_digits.endswith(digits))
+    )
+
+
+def _same_address(address, kept):
+    # "1 Main St" is already part of "1 Main St, Springfield"
+    return address.lower() in kept.lower() or kept.lower() in address.lower()
+
+
+def extract_contacts(text, emails=(), phones=(), addresses=()):
+    """Find phones, emails and street addresses in a page's visible text.
+
+    ``text`` is the flattened text buffer; ``emails``, ``phones`` and
+    ``addresses`` are values already known from markup (``mailto:`` and
+    ``tel:`` links, ``<address>`` elements) and are listed first. Each kind
+    comes back normalized and deduplicated, in document order.
+    """
+    return {
+        'phones': _unique(
+            list(phones) + [match.group() for match in PHONE_PATTERN.finditer(text)],
+            normalize_phone,
+            _same_phone
+        ),
+        'emails': _unique(
+            list(emails) + EMAIL_PATTERN.findall(text),
+            normalize_email
+        ),
+        'addresses': _unique(
+            list(addresses) + [match.group() for match in ADDRESS_PATTERN.finditer(text)],
+            normalize_address,
+            _same_address
+        )
+    }
@@ -0,0 +1,50 @@
+import logging
+import math
+
+from langchain_text_splitters import RecursiveCharacterTextSplitter
+
+logger = logging.getLogger(__name__)
+
+# Rough but cheap; asking the provider to count would cost a round trip
+CHARS_PER_TOKEN = 4
+
+
+def estimate_tokens(text):
+    return math.ceil(len(text or '') / CHARS_PER_TOKEN)
+
+
+class ContextBudget:
+    """Decide when a prompt is too big and how to cut its long input into chunks.
+
+    A rendered prompt estimated above ``max_tokens`` has its long field
+    split into chunks of about ``chunk_tokens`` for map-reduce. At most
+    ``max_chunks`` chunks are kept, so the cost of a huge page is bounded;
+    the rest of the text is dropped. ``concurrency`` caps how many chunk
+    summaries run at once.
+    """
+
+    def __init__(self, max_tokens=6000, chunk_tokens=2000, chunk_overlap=100, max_chunks=16,
+                 concurrency=4, max_rounds=2):
+        self.max_tokens = max_tokens
+        self.chunk_tokens = chunk_tokens
+        self.max_chunks = max_chunks
+        self.concurrency = concurrency
+        self.max_rounds = max_rounds
+        self.splitter = RecursiveCharacterTextSplitter(
+            chunk_size=chunk_tokens,
+            chunk_overlap=chunk_overlap,
+            length_function=estimate_tokens
+        )
+
+    def fits(self, text):
+        return estimate_tokens(text) <= self.max_tokens
+
+    def split(self, text):
+        chunks = self.splitter.split_text(text)
+        if len(chunks) > self.max_chunks:
+            logger.warning(
+                f"Input of ~{estimate_tokens(text)} tokens needs {len(chunks)} chunks; "
+                f"keeping the first {self.max_chunks}"
+            )
+            chunks = chunks[:self.max_chunks]
+        return chunks
@@ -0,0 +1,238 @@
+import hashlib
+import heapq
+import itertools
+import logging
+import math
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from urllib.parse import urldefrag, urljoin, urlsplit
+
+from .scrape_cache import normalize_url
+
+logger = logging.getLogger(__name__)
+
+# Lower scores are crawled first
+PRIORITY_KEYWORDS = [
+    (('about', 'who-we-are', 'our-story', 'company'), 0),
+    (('team', 'leadership', 'people', 'management', 'founders'), 1),
+    (('contact', 'locations', 'offices'), 2),
+    (('careers', 'services', 'products', 'solutions', 'industries'), 5)
+]
+DEFAULT_PRIORITY = 10
+
+SKIPPED_EXTENSIONS = (
+    '.pdf', '.jpg', '.jpeg', '.png', '.gif', '.svg', '.webp', '.zip', '.gz',
+    '.mp4', '.mp3', '.css', '.js', '.xml', '.json', '.doc', '.docx', '.xls', '.xlsx'
+)
+
+
+class BloomFilter:
+    """Fixed-size set membership with no false negatives.
+
+    Memory is set by ``capacity`` and ``error_rate`` up front and never
+    grows, however many URLs a large site links to.
+    """
+
+    def __init__(self, capacity=100000, error_rate=0.001):
+        self.size = max(8, int(-capacity * math.log(error_rate) / (math.log(2) ** 2)))
+        self.hashes = max(1, round(self.size / capacity * math.log(2)))
+        self._bits = bytearray((self.size + 7) // 8)
+
+    def _positions(self, item):
+        digest = hashlib.blake2b(item.encode('utf-8'), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], 'little')
+        h2 = int.from_bytes(digest[8:], 'little') | 1
+        return ((h1 + i * h2) % self.size for i in range(self.hashes))
+
+    def add(self, item):
+        """Add ``item``; return False if it was (probably) already present."""
+        added = False
+        for position in self._positions(item):
+            byte, bit = divmod(position, 8)
+            if not self._bits[byte] & (1 << bit):
+                self._bits[byte] |= 1 << bit
+                added = True
+        return added
+
+    def __contains__(self, item):
+        for position in self._positions(item):
+            byte, bit = divmod(position, 8)
+            if not self._bits[byte] & (1 << bit):
+                return False
+        return True
+
+
+def link_priority(url, anchor_text):
+    haystack = f'{urlsplit(url).path} {anchor_text}'.lower()
+    for keywords, score in PRIORITY_KEYWORDS:
+        if any(keyword in haystack for keyword in keywords):
+            return score
+    return DEFAULT_PRIORITY
+
+
+def _site(url):
+    host = (urlsplit(url).hostname or '').lower()
+    return host[4:] if host.startswith('www.') else host
+
+
+class Crawler:
+    """Crawl one site from a seed URL and merge its pages into one record.
+
+    Same-site links are queued on a priority frontier that favours about,
+    team and contact pages, up to ``max_depth`` hops and ``max_pages``
+    fetched pages. Seen URLs live in a Bloom filter so memory stays bounded.
+    Pages are fetched ``concurrency`` at a time, but never more often than
+    one every ``delay`` seconds, since every request hits the same host.
+    """
+
+    def __init__(self, scraper, max_depth=2, max_pages=20, concurrency=4, delay=0.5,
+                 bloom_capacity=100000):
+        self.scraper = scraper
+        self.max_depth = max_depth
+        self.max_pages = max_pages
+        self.concurrency = concurrency
+        self.delay = delay
+        self.bloom_capacity = bloom_capacity
+        self._next_slot = 0.0
+        self._slot_lock = threading.Lock()
+
+    def _wait_turn(self):
+        with self._slot_lock:
+            now = time.monotonic()
+            start = max(now, self._next_slot)
+            self._next_slot = start + self.delay
+        if start > now:
+            time.sleep(start - now)
+
+    def _fetch(self, url):
+        self._wait_turn()
+        return self.scraper.scrape_url(url, collect_links=True)
+
+    def _candidates(self, page_url, links, site):
+        """Same-site links on ``page_url``, the URL the page was served
+        from after redirects, as ``(url, seen_key, anchor_text)``. Relative
+        links resolve against that URL as served, since normalizing trims
+        the trailing slash a directory-style page's links are relative to.
+        """
+        for href, anchor_text in links:
+            absolute = urldefrag(urljoin(page_url, href)).url
+            parts = urlsplit(absolute)
+            if parts.scheme not in ('http', 'https'):
+                continue
+            if _site(absolute) != site:
+                continue
+            if parts.path.lower().endswith(SKIPPED_EXTENSIONS):
+                continue
+            yield absolute, normalize_url(absolute), anchor_text
+
+    def crawl(self, seed_url):
+        """Return ``{'status', 'content', 'metadata', 'pages'}`` for the site."""
+        site = _site(seed_url)
+        seen = BloomFilter(capacity=self.bloom_capacity)
+        order = itertools.count()
+        frontier = []
+
+        # The frontier holds URLs as linked; only ``seen`` uses normalized ones
+        seen.add(normalize_url(seed_url))
+        heapq.heappush(frontier, (-1, next(order), seed_url, 0))
+
+        pages = []
+        errors = []
+        in_flight = {}
+        # Where fetched pages were served from; at most ``max_pages`` of them
+        served = set()
+
+        with ThreadPoolExecutor(max_workers=self.concurrency) as executor:
+            while frontier or in_flight:
+                while frontier and len(in_flight) < self.concurrency and \
+                        len(pages) + len(in_flight) < self.max_pages:
+                    _, _, url, depth = heapq.heappop(frontier)
+                    in_flight[executor.submit(self._fetch, url)] = (url, depth)
+
+                if not in_flight:
+                    break
+
+                done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+                for future in done:
+                    url, depth = in_flight.pop(future)
+                    result = future.result()
+                    if result['status'] != 'success':
+                        errors.append({'url': url, 'error': result.get('error')})
+                        continue
+
+                    page_url = result.get('final_url') or url
+                    if depth == 0:
+                        # The seed may redirect, e.g. to its canonical host;
+                        # that is the site being crawled
+                        site = _site(page_url)
+                    elif _site(page_url) != site:
+                        errors.append({'url': url, 'error': f'Redirected off-site to {page_url}'})
+                        continue
+                    served_key = normalize_url(page_url)
+                    if served_key in served:
+                        # Redirected to a page already crawled
+                        continue
+                    served.add(served_key)
+                    seen.add(served_key)
+
+                    pages.append((url, result))
+                    if depth >= self.max_depth:
+                        continue
+                    for link, seen_key, anchor_text in self._candidates(page_url, result.get('links', []), site):
+                        if seen.add(seen_key):
+                            priority = link_priority(link, anchor_text) + depth
+                            heapq.heappush(frontier, (priority, next(order), link, depth + 1))
+
+        if not pages:
+            return {
+                'status': 'error',
+                'error': errors[0]['error'] if errors else 'Nothing could be crawled'
+            }
+
+        logger.info(f"Crawled {len(pages)} pages from {site} ({len(errors)} errors)")
+        return {
+            'status': 'success',
+            'content': merge_pages(pages),
+            'metadata': pages[0][1]['metadata'],
+            'pages': [url for url, _ in pages],
+            'errors': errors
+        }
+
+
+def merge_pages(pages):
+    """Fold per-page extractions into one ``content`` record.
+
+    Scalar fields come from the first page that has them, in crawl order
+    (seed first, then about/team/contact pages). ``about`` keeps the
+    longest description found; contact details are unioned.
+    """
+    merged = {}
+    for field in ('title', 'description', 'name', 'source', 'industry', 'email', 'page_type'):
+        merged[field] = next(
+            (result['content'].get(field) for _, result in pages if result['content'].get(field)),
+            None
+        )
+
+    abouts = [result['content'].get('about') for _, result in pages if result['content'].get('about')]
+    merged['about'] = max(abouts, key=len) if abouts else None
+
+    contact_info = {}
+    for _, result in pages:
+        for key, value in (result['content'].get('contact_info') or {}).items():
+            if isinstance(value, list):
+                found = contact_info.setdefault(key, [])
+                found.extend(item for item in value if item not in found)
+            else:
+                contact_info.setdefault(key, value)
+    merged['contact_info'] = contact_info
+
+    merged['pages'] = [
+        {
+            'url': url,
+            'title': result['content'].get('title'),
+            'page_type': result['content'].get('page_type')
+        }
+        for url, result in pages
+    ]
+    return merged
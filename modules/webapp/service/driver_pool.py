@@ -0,0 +1,158 @@
+import logging
+import threading
+import time
+from contextlib import contextmanager
+
+from selenium import webdriver
+from selenium.common.exceptions import TimeoutException, WebDriverException
+
+from .render_profile import RenderProfile
+
+logger = logging.getLogger(__name__)
+
+
+class DriverPoolExhausted(Exception):
+    """Raised when no driver could be leased within the timeout."""
+
+
+class _PooledDriver:
+    def __init__(self, driver):
+        self.driver = driver
+        self.pages = 0
+
+
+class DriverPool:
+    """Bounded pool of headless Chrome drivers with lease/return semantics.
+
+    Drivers are started lazily, up to ``size``. A driver is recycled after
+    ``max_pages`` navigations, when it fails its health check, or when the
+    caller's work raises a ``WebDriverException``.
+    """
+
+    def __init__(self, size=2, max_pages=50, lease_timeout=30, profile=None):
+        self.size = size
+        self.profile = profile or RenderProfile()
+        self.max_pages = max_pages
+        self.lease_timeout = lease_timeout
+        self._idle = []  # Most recently returned last, so warm drivers are reused first
+        # Guards _idle, _created and _closed; notified whenever a driver is
+        # returned or a slot frees up, so waiters can take either
+        self._cond = threading.Condition()
+        self._created = 0
+        self._closed = False
+
+    def _start_driver(self):
+        driver = webdriver.Chrome(options=self.profile.chrome_options())
+        try:
+            self.profile.apply(driver)
+        except Exception:
+            driver.quit()
+            raise
+        return _PooledDriver(driver)
+
+    def _is_healthy(self, pooled):
+        try:
+            # Any round trip to the browser proves the session is alive
+            pooled.driver.execute_script('return 1')
+            return True
+        except Exception:
+            return False
+
+    def _quit(self, pooled):
+        try:
+            pooled.driver.quit()
+        except Exception as e:
+            logger.warning(f"Error quitting Chrome driver: {str(e)}")
+
+    def _free_slot(self):
+        with self._cond:
+            self._created -= 1
+            self._cond.notify()
+
+    def _discard(self, pooled):
+        self._quit(pooled)
+        self._free_slot()
+
+    def _reserve(self, deadline):
+        """An idle driver, or None once a slot to start one is reserved;
+        waits until ``deadline`` for either.
+        """
+        with self._cond:
+            while True:
+                if self._closed:
+                    raise DriverPoolExhausted('Driver pool is closed')
+                if self._idle:
+                    return self._idle.pop()
+                if self._created < self.size:
+                    self._created += 1
+                    return None
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    raise DriverPoolExhausted(
+                        f'No Chrome driver available after {self.lease_timeout}s'
+                    )
+                self._cond.wait(remaining)
+
+    def _acquire(self):
+        deadline = time.monotonic() + self.lease_timeout
+        while True:
+            pooled = self._reserve(deadline)
+            if pooled is None:
+                try:
+                    return self._start_driver()
+                except Exception:
+                    self._free_slot()
+                    raise
+
+            if self._is_healthy(pooled):
+                return pooled
+            logger.info("Recycling unhealthy Chrome driver")
+            self._discard(pooled)
+
+    def _release(self, pooled, broken=False):
+        pooled.pages += 1
+        with self._cond:
+            keep = not (self._closed or broken or pooled.pages >= self.max_pages)
+            if keep:
+                self._idle.append(pooled)
+                self._cond.notify()
+        if not keep:
+            self._discard(pooled)
+
+    @contextmanager
+    def lease(self):
+        """Lease a driver for the duration of the ``with`` block."""
+        pooled = self._acquire()
+        broken = False
+        try:
+            yield pooled.driver
+        except TimeoutException:
+            # A slow page says nothing about the browser itself
+            raise
+        except WebDriverException:
+            broken = True
+            raise
+        finally:
+            self._release(pooled, broken=broken)
+
+    def stats(self):
+        with self._cond:
+            created = self._created
+            idle = len(self._idle)
+        return {
+            'size': self.size,
+            'started': created,
+            'idle': idle,
+            'max_pages': self.max_pages
+        }
+
+    def close(self):
+        with self._cond:
+            if self._closed:
+                return
+            self._closed = True
+            idle, self._idle = self._idle, []
+            # Waiters see the pool is closed instead of sitting out their timeout
+            self._cond.notify_all()
+        for pooled in idle:
+            self._discard(pooled)
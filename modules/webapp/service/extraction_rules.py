@@ -0,0 +1,300 @@
+import fnmatch
+import json
+import logging
+import os
+import re
+import threading
+import time
+from urllib.parse import urlparse
+
+import soupsieve
+
+logger = logging.getLogger(__name__)
+
+# Used when no rules file is configured, and as the fallback rule's fields
+NAME_SELECTORS = ['h1', '.profile-name', '.name', '[itemprop="name"]']
+ABOUT_SELECTORS = ['.about', '#about', '[itemprop="description"]', '.bio', '.description']
+INDUSTRY_SELECTORS = ['.industry', '[itemprop="industry"]', '.business-category']
+
+DEFAULT_FIELDS = {
+    'name': NAME_SELECTORS,
+    'about': ABOUT_SELECTORS,
+    'industry': INDUSTRY_SELECTORS
+}
+
+_SIMPLE_SELECTOR = re.compile(
+    r'^(?:'
+    r'(?P<tag>[a-zA-Z][a-zA-Z0-9-]*)'
+    r'|\.(?P<cls>[\w-]+)'
+    r'|#(?P<id>[\w-]+)'
+    r'|\[(?P<attr>[\w-]+)(?:="(?P<value>[^"]*)")?\]'
+    r')$'
+)
+
+
+def _attr_value(value):
+    if isinstance(value, list):
+        return ' '.join(value)
+    return value
+
+
+class SelectorIndex:
+    """Field selectors compiled once and indexed for per-element matching.
+
+    The common one-token forms (``h1``, ``.cls``, ``#id``, ``[attr]``,
+    ``[attr="v"]``) are bucketed by tag name, class, id and attribute so
+    each element costs a few dict lookups. Anything else is compiled once
+    with soupsieve and matched element by element.
+    """
+
+    def __init__(self, field_selectors):
+        self.fields = {field: len(selectors) for field, selectors in field_selectors.items()}
+        self.by_tag = {}
+        self.by_class = {}
+        self.by_id = {}
+        self.by_attr = {}
+        self.complex = []
+
+        for field, selectors in field_selectors.items():
+            for index, selector in enumerate(selectors):
+                self._add(field, index, selector)
+
+    def _add(self, field, index, selector):
+        entry = (field, index)
+        match = _SIMPLE_SELECTOR.match(selector.strip())
+        if not match:
+            self.complex.append((field, index, soupsieve.compile(selector).match))
+            return
+
+        tag_name, cls, id_, attr, value = match.group('tag', 'cls', 'id', 'attr', 'value')
+        if tag_name:
+            self.by_tag.setdefault(tag_name.lower(), []).append(entry)
+        elif cls:
+            self.by_class.setdefault(cls, []).append(entry)
+        elif id_:
+            self.by_id.setdefault(id_, []).append(entry)
+        else:
+            self.by_attr.setdefault(attr, []).append((field, index, value))
+
+    def matches(self, tag):
+        """Yield ``(field, selector_index)`` for every selector ``tag`` matches."""
+        entries = self.by_tag.get(tag.name)
+        if entries:
+            yield from entries
+
+        attrs = tag.attrs
+        if attrs:
+            for key, value in attrs.items():
+                if key == 'class':
+                    for cls in value:
+                        entries = self.by_class.get(cls)
+                        if entries:
+                            yield from entries
+                elif key == 'id':
+                    entries = self.by_id.get(value)
+                    if entries:
+                        yield from entries
+                attr_entries = self.by_attr.get(key)
+                if attr_entries:
+                    text = _attr_value(value)
+                    for field, index, expected in attr_entries:
+                        if expected is None or text == expected:
+                            yield field, index
+
+        for field, index, match in self.complex:
+            if match(tag):
+                yield field, index
+
+
+class ExtractionRule:
+    """Field selectors and source label for one group of domains."""
+
+    def __init__(self, name, domains, source, selectors):
+        self.name = name
+        self.domains = domains
+        self.source = source
+        self.selectors = selectors
+        self.index = SelectorIndex(selectors)
+
+
+class RuleSet:
+    """Compiled extraction rules with host lookup.
+
+    A domain pattern without wildcards matches that host and all of its
+    subdomains, so ``linkedin.com`` covers ``www.linkedin.com``; those are
+    found by walking the host's suffixes through a dict. Patterns with
+    ``*`` or ``?`` are matched with fnmatch in file order. Hosts no rule
+    claims get the fallback rule, the one without ``domains``.
+    """
+
+    def __init__(self, rules, fallback):
+        self.rules = rules
+        self.fallback = fallback
+        self.by_suffix = {}
+        self.wildcards = []
+        for rule in rules:
+            for pattern in rule.domains:
+                if any(char in pattern for char in '*?['):
+                    self.wildcards.append((pattern, rule))
+                else:
+                    self.by_suffix.setdefault(pattern, rule)
+
+    @classmethod
+    def from_config(cls, config):
+        """Build a RuleSet from parsed rules-file JSON.
+
+        Domain rules put their selectors ahead of the fallback rule's for
+        the same field unless the rule sets ``"inherit": false``.
+        """
+        entries = config.get('rules')
+        if not isinstance(entries, list):
+            raise ValueError("Extraction rules need a 'rules' list")
+
+        fallback_entry = None
+        domain_entries = []
+        names = set()
+        for entry in entries:
+            name = entry.get('name')
+            if not name or name in names:
+                raise ValueError(f"Extraction rule names must be present and unique: {name!r}")
+            names.add(name)
+            if entry.get('domains'):
+                domain_entries.append(entry)
+            elif fallback_entry is None:
+                fallback_entry = entry
+            else:
+                raise ValueError(f"Only one rule may omit 'domains', found {fallback_entry['name']!r} and {name!r}")
+
+        fallback = cls._compile(fallback_entry or {'name': 'default'}, DEFAULT_FIELDS)
+        rules = [cls._compile(entry, fallback.selectors) for entry in domain_entries]
+        return cls(rules, fallback)
+
+    @staticmethod
+    def _compile(entry, base_fields):
+        name = entry['name']
+        fields = entry.get('fields')
+        if fields is None:
+            fields = {} if entry.get('domains') else DEFAULT_FIELDS
+        inherit = entry.get('inherit', True)
+
+        selectors = {}
+        for field in set(base_fields) | set(fields):
+            own = fields.get(field, [])
+            if not isinstance(own, list) or not all(isinstance(s, str) for s in own):
+                raise ValueError(f"Rule {name!r}: selectors for {field!r} must be a list of strings")
+            inherited = base_fields.get(field, []) if inherit and entry.get('domains') else []
+            # Keep order, drop selectors the rule repeats from the fallback
+            selectors[field] = list(dict.fromkeys(own + inherited))
+
+        domains = [domain.lower().lstrip('.') for domain in entry.get('domains', [])]
+        try:
+            return ExtractionRule(name, domains, entry.get('source', 'Website'), selectors)
+        except soupsieve.SelectorSyntaxError as e:
+            raise ValueError(f"Rule {name!r}: bad selector: {str(e)}") from e
+
+    @classmethod
+    def default(cls):
+        return cls([], cls._compile({'name': 'default'}, DEFAULT_FIELDS))
+
+    def match(self, url):
+        host = (urlparse(url or '').hostname or '').lower()
+        labels = host.split('.')
+        for start in range(len(labels)):
+            rule = self.by_suffix.get('.'.join(labels[start:]))
+            if rule is not None:
+                return rule
+        for pattern, rule in self.wildcards:
+            if fnmatch.fnmatchcase(host, pattern):
+                return rule
+        return self.fallback
+
+
+class RuleRegistry:
+    """Extraction rules loaded from a JSON file and reloaded when it changes.
+
+    ``current()`` checks the file's mtime at most every ``check_interval``
+    seconds and recompiles when it moved, so rules can be edited without a
+    restart. A file that fails to load at start-up raises; one that breaks
+    later is logged and the previous rules stay in force.
+
+    Per-rule hit counters are kept here too. Parse workers run their own
+    registry from the same path and only report which selectors matched;
+    the owning process records them with ``record``.
+    """
+
+    def __init__(self, path=None, check_interval=5):
+        self.path = path
+        self.check_interval = check_interval
+        self._lock = threading.Lock()
+        self._mtime = None
+        self._checked_at = 0
+        self._loaded_at = None
+        self._counters = {}
+        self._rules = self._load() if path else RuleSet.default()
+
+    def _load(self):
+        mtime = os.stat(self.path).st_mtime
+        with open(self.path, encoding='utf-8') as f:
+            rules = RuleSet.from_config(json.load(f))
+        self._mtime = mtime
+        self._loaded_at = time.time()
+        return rules
+
+    def current(self):
+        if not self.path:
+            return self._rules
+
+        now = time.monotonic()
+        if now - self._checked_at < self.check_interval:
+            return self._rules
+
+        with self._lock:
+            if now - self._checked_at < self.check_interval:
+                return self._rules
+            self._checked_at = now
+            try:
+                if os.stat(self.path).st_mtime != self._mtime:
+                    self._rules = self._load()
+                    logger.info(f"Reloaded extraction rules from {self.path}")
+            except (OSError, ValueError) as e:
+                logger.error(f"Keeping previous extraction rules, could not reload {self.path}: {str(e)}")
+            return self._rules
+
+    def match(self, url):
+        return self.current().match(url)
+
+    def record(self, hit):
+        """Count one extracted page from the ``rule`` entry of a document."""
+        with self._lock:
+            counters = self._counters.get(hit['name'])
+            if counters is None:
+                counters = {'pages': 0, 'fields': {}}
+                self._counters[hit['name']] = counters
+            counters['pages'] += 1
+            for field, selector in hit['selectors'].items():
+                field_counters = counters['fields'].setdefault(field, {'hits': 0, 'selectors': {}})
+                if selector is not None:
+                    field_counters['hits'] += 1
+                    field_counters['selectors'][selector] = field_counters['selectors'].get(selector, 0) + 1
+
+    def stats(self):
+        with self._lock:
+            rules = {}
+            for name, counters in self._counters.items():
+                pages = counters['pages']
+                rules[name] = {
+                    'pages': pages,
+                    'fields': {
+                        field: {
+                            'hits': entry['hits'],
+                            'hit_rate': round(entry['hits'] / pages, 3),
+                            'selectors': dict(entry['selectors'])
+                        }
+                        for field, entry in counters['fields'].items()
+                    }
+                }
+        return {
+            'path': self.path,
+            'loaded_at': self._loaded_at,
+            'rules': rules
+        }
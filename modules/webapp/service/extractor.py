@@ -0,0 +1,188 @@
+import importlib.util
+import re
+
+from bs4 import BeautifulSoup, NavigableString, Tag
+
+from .contacts import INVISIBLE_TAGS, extract_contacts
+from .extraction_rules import RuleRegistry
+
+JS_FRAMEWORK_PATTERN = re.compile(r'react|angular|vue', re.IGNORECASE)
+JS_SCRIPT_THRESHOLD = 5
+
+
+def default_parser():
+    """Prefer lxml when it is installed; it is several times faster."""
+    return 'lxml' if importlib.util.find_spec('lxml') else 'html.parser'
+
+
+class _Walk:
+    """Mutable state for one pass over a document."""
+
+    def __init__(self, selectors, collect_links=False):
+        self.selectors = selectors
+        self.collect_links = collect_links
+        self.links = []
+        self.best = {field: (count, None) for field, count in selectors.fields.items()}
+        self.title = None
+        self.description = None
+        self.og_data = {}
+        self.script_srcs = 0
+        self.has_article = False
+        self.has_form = False
+        self.has_table = False
+        self.addresses = []
+        self.emails = []
+        self.phones = []
+        self.text = []
+
+    def visit_tag(self, tag):
+        name = tag.name
+
+        if name == 'title':
+            if self.title is None:
+                self.title = tag
+        elif name == 'meta':
+            if self.description is None and tag.get('name') == 'description':
+                self.description = tag.get('content')
+            prop = tag.get('property')
+            if prop and prop.startswith('og:'):
+                self.og_data[prop[3:]] = tag.get('content')
+        elif name == 'script':
+            if tag.has_attr('src'):
+                self.script_srcs += 1
+        elif name == 'article':
+            self.has_article = True
+        elif name == 'form' or name == 'input':
+            self.has_form = True
+        elif name == 'table':
+            self.has_table = True
+        elif name == 'address':
+            self.addresses.append(tag.get_text(' '))
+        elif name == 'a':
+            href = tag.get('href')
+            if href:
+                if href.startswith('mailto:'):
+                    self.emails.append(href[len('mailto:'):].split('?', 1)[0])
+                elif href.startswith('tel:'):
+                    self.phones.append(href[len('tel:'):])
+                elif self.collect_links:
+                    self.links.append((href, tag.get_text(' ', strip=True)))
+
+        best = self.best
+        for field, index in self.selectors.matches(tag):
+            # Document order plus strict comparison keeps the first element
+            # matched by the highest-priority selector, like select_one
+            if index < best[field][0]:
+                best[field] = (index, tag)
+
+    def visit_string(self, string):
+        # Only visible text: no comments, doctypes, scripts or styles
+        if type(string) is not NavigableString or string.parent.name in INVISIBLE_TAGS:
+            return
+        if not string.isspace():
+            self.text.append(str(string))
+
+    def field_text(self, field):
+        tag = self.best[field][1]
+        return tag.text.strip() if tag is not None else None
+
+    def winning_selector(self, field, selectors):
+        index, tag = self.best[field]
+        return selectors[field][index] if tag is not None else None
+
+
+class DocumentExtractor:
+    """Extract every content field and the page metadata in one DOM walk."""
+
+    def __init__(self, parser=None, rules=None):
+        self.parser = parser or default_parser()
+        self.rules = rules or RuleRegistry()
+
+    def parse(self, html):
+        return BeautifulSoup(html, self.parser)
+
+    def extract(self, html, url, collect_links=False):
+        """Return ``{'content', 'metadata', 'needs_js', 'rule'}`` for raw page HTML.
+
+        ``rule`` names the extraction rule used for the URL's domain and,
+        per field, the selector that matched (or None), for hit counting.
+        With ``collect_links`` the result also has ``links``, a list of
+        ``(href, anchor_text)`` pairs in document order.
+        """
+        rule = self.rules.match(url)
+        soup = self.parse(html)
+        walk = _Walk(rule.index, collect_links=collect_links)
+
+        for node in soup.descendants:
+            if isinstance(node, Tag):
+                walk.visit_tag(node)
+            elif isinstance(node, NavigableString):
+                walk.visit_string(node)
+
+        # Plain str, not NavigableString, so the result holds no reference
+        # back into the tree
+        title = walk.title.string if walk.title is not None else None
+        if title is not None:
+            title = str(title)
+
+        # One newline per text node keeps matches from running across
+        # unrelated elements
+        contacts = extract_contacts(
+            '\n'.join(walk.text),
+            emails=walk.emails,
+            phones=walk.phones,
+            addresses=walk.addresses
+        )
+        contact_info = {}
+        if contacts['phones']:
+            contact_info['phone'] = contacts['phones'][0]
+        if contacts['addresses']:
+            contact_info['address'] = contacts['addresses'][0]
+        contact_info.update((kind, found) for kind, found in contacts.items() if found)
+
+        if walk.has_article:
+            page_type = 'Article'
+        elif walk.has_form:
+            page_type = 'Form/Contact'
+        elif walk.has_table:
+            page_type = 'Data'
+        else:
+            page_type = 'General'
+
+        content = {
+            'title': title,
+            'description': walk.description,
+            'name': walk.field_text('name'),
+            'about': walk.field_text('about'),
+            'source': rule.source,
+            'industry': walk.field_text('industry'),
+            'contact_info': contact_info,
+            'email': contacts['emails'][0] if contacts['emails'] else None,
+            'page_type': page_type
+        }
+        for field in rule.selectors:
+            # Fields a rule adds beyond the standard ones
+            if field not in content:
+                content[field] = walk.field_text(field)
+        metadata = {
+            'meta_title': title,
+            'meta_description': walk.description,
+            'og_data': walk.og_data
+        }
+        needs_js = (
+            walk.script_srcs > JS_SCRIPT_THRESHOLD or
+            JS_FRAMEWORK_PATTERN.search(html) is not None
+        )
+
+        document = {
+            'content': content,
+            'metadata': metadata,
+            'needs_js': needs_js,
+            'rule': {
+                'name': rule.name,
+                'selectors': {field: walk.winning_selector(field, rule.selectors) for field in rule.selectors}
+            }
+        }
+        if collect_links:
+            document['links'] = walk.links
+        return document
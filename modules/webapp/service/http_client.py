@@ -0,0 +1,154 @@
+import codecs
+import importlib.util
+import logging
+import threading
+from contextlib import contextmanager
+from urllib.parse import urlparse
+
+import httpx
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_HEADERS = {
+    'User-Agent': 'Mozilla/5.0 (compatible; WebAnalyzer/1.0)',
+    'Accept': 'text/html,application/xhtml+xml;q=0.9,*/*;q=0.8'
+}
+
+HTML_CONTENT_TYPES = ('text/html', 'application/xhtml+xml')
+
+
+class FetchError(Exception):
+    """A fetch that was refused before or while downloading the body."""
+
+    def __init__(self, code, message):
+        super().__init__(message)
+        self.code = code
+
+
+def check_status(url, status_code):
+    """Reject error pages, which would otherwise be extracted as content."""
+    if not 200 <= status_code < 300:
+        raise FetchError('http_status', f'{url} returned HTTP {status_code}')
+
+
+def check_content_type(url, content_type):
+    """Reject anything that is not HTML from its headers alone."""
+    if not content_type:
+        return
+    mime = content_type.split(';', 1)[0].strip().lower()
+    if mime not in HTML_CONTENT_TYPES:
+        raise FetchError('unsupported_content_type', f'{url} is {mime}, not HTML')
+
+
+def check_content_length(url, content_length, max_bytes):
+    if content_length and content_length.isdigit() and int(content_length) > max_bytes:
+        raise FetchError(
+            'content_too_large',
+            f'{url} is {int(content_length)} bytes; the limit is {max_bytes}'
+        )
+
+
+class BodyReader:
+    """Incrementally decode body chunks, enforcing a byte ceiling."""
+
+    def __init__(self, url, encoding, max_bytes):
+        self.url = url
+        self.max_bytes = max_bytes
+        self.received = 0
+        self.parts = []
+        try:
+            self._decoder = codecs.getincrementaldecoder(encoding or 'utf-8')(errors='replace')
+        except LookupError:
+            self._decoder = codecs.getincrementaldecoder('utf-8')(errors='replace')
+
+    def feed(self, chunk):
+        self.received += len(chunk)
+        if self.received > self.max_bytes:
+            raise FetchError(
+                'content_too_large',
+                f'{self.url} exceeded the {self.max_bytes} byte limit'
+            )
+        self.parts.append(self._decoder.decode(chunk))
+
+    def text(self):
+        self.parts.append(self._decoder.decode(b'', final=True))
+        return ''.join(self.parts)
+
+
+class HttpClient:
+    """Long-lived, pooled HTTP client for the static fetch path.
+
+    Connections are kept alive and reused across scrapes, so repeat hits on
+    a domain skip the TCP and TLS handshakes. ``per_host`` caps in-flight
+    requests to any single host on top of the client-wide pool. gzip and
+    deflate are always decoded; br is decoded when ``brotli`` is installed.
+    HTTP/2 is used when requested and ``h2`` is installed.
+    """
+
+    def __init__(self, max_connections=100, per_host=10, keepalive_expiry=30,
+                 connect_timeout=5, read_timeout=10, http2=False, max_bytes=5 * 1024 * 1024):
+        if http2 and importlib.util.find_spec('h2') is None:
+            logger.warning("HTTP/2 requested but the h2 package is not installed; using HTTP/1.1")
+            http2 = False
+
+        self.per_host = per_host
+        self.max_bytes = max_bytes
+        # host -> [semaphore, threads holding or waiting for it]; a host's
+        # entry is dropped once nobody is, so the map only holds busy hosts
+        self._host_slots = {}
+        self._lock = threading.Lock()
+        self._client = httpx.Client(
+            http2=http2,
+            headers=DEFAULT_HEADERS,
+            follow_redirects=True,
+            limits=httpx.Limits(
+                max_connections=max_connections,
+                max_keepalive_connections=max_connections,
+                keepalive_expiry=keepalive_expiry
+            ),
+            timeout=httpx.Timeout(read_timeout, connect=connect_timeout)
+        )
+
+    @contextmanager
+    def _host_slot(self, url):
+        host = urlparse(url).netloc.lower()
+        with self._lock:
+            entry = self._host_slots.get(host)
+            if entry is None:
+                entry = self._host_slots[host] = [threading.BoundedSemaphore(self.per_host), 0]
+            entry[1] += 1
+        slot = entry[0]
+        try:
+            slot.acquire()
+            try:
+                yield
+            finally:
+                slot.release()
+        finally:
+            with self._lock:
+                entry[1] -= 1
+                if not entry[1]:
+                    del self._host_slots[host]
+
+    def fetch_html(self, url):
+        """Stream ``url`` and return its decoded HTML and the URL it was
+        served from, after redirects.
+
+        Error statuses, non-HTML content types and declared lengths over
+        ``max_bytes`` are refused from the headers; bodies that keep streaming past the limit
+        are cut off. Either way a ``FetchError`` is raised without the body
+        ever being held in full.
+        """
+        with self._host_slot(url):
+            with self._client.stream('GET', url) as response:
+                check_status(url, response.status_code)
+                check_content_type(url, response.headers.get('content-type'))
+                check_content_length(url, response.headers.get('content-length'), self.max_bytes)
+
+                reader = BodyReader(url, response.charset_encoding, self.max_bytes)
+                for chunk in response.iter_bytes():
+                    reader.feed(chunk)
+                return reader.text(), str(response.url)
+
+    def close(self):
+        self._client.close()
@@ -0,0 +1,212 @@
+import logging
+import threading
+from datetime import datetime, timedelta
+
+from sqlalchemy import and_, or_, update
+
+from ..models.models import db, Job
+
+logger = logging.getLogger(__name__)
+
+
+class JobError(Exception):
+    """A step failed in a way that is worth retrying.
+
+    ``retry_at`` (naive UTC) replaces the usual backoff when the step
+    cannot succeed before a known time.
+    """
+
+    def __init__(self, message, retry_at=None):
+        super().__init__(message)
+        self.retry_at = retry_at
+
+
+class PermanentJobError(Exception):
+    """A step failed in a way that retrying cannot fix."""
+
+
+class LeaseLost(Exception):
+    """Another worker reclaimed the job; this run must stop without writing."""
+
+
+class JobQueue:
+    """Database-backed job queue with an in-process worker pool.
+
+    Jobs are rows in the ``jobs`` table, so any web worker can enqueue and
+    any worker process can run them; no external broker is needed. Workers
+    claim a job with a conditional UPDATE, which is safe across threads and
+    processes on any database. A failed job is re-queued with exponential
+    backoff until ``max_attempts``; handlers checkpoint finished steps into
+    ``job.result`` so a retry resumes where the last attempt stopped. Each
+    checkpoint also renews the job's lease; a ``running`` job whose lease
+    is older than ``lease_timeout`` seconds, e.g. because its worker died,
+    is reclaimed. Every write of a run is guarded on the attempt it
+    claimed, so a run whose job was reclaimed meanwhile commits nothing.
+    """
+
+    def __init__(self, app, workers=2, poll_interval=2.0, max_attempts=3,
+                 retry_delay=10, lease_timeout=600):
+        self.app = app
+        self.workers = workers
+        self.poll_interval = poll_interval
+        self.max_attempts = max_attempts
+        self.retry_delay = retry_delay
+        self.lease_timeout = lease_timeout
+        self._handlers = {}
+        self._threads = []
+        self._stop = threading.Event()
+        self._wake = threading.Event()
+        self._start_lock = threading.Lock()
+
+    def register(self, kind, handler):
+        """``handler(job)`` returns the job's final result dict."""
+        self._handlers[kind] = handler
+
+    def enqueue(self, kind, payload, user_id, max_attempts=None):
+        if kind not in self._handlers:
+            raise ValueError(f'Unknown job kind: {kind}')
+
+        job = Job(
+            kind=kind,
+            payload=payload,
+            created_by_user_id=user_id,
+            max_attempts=max_attempts or self.max_attempts,
+            run_after=datetime.utcnow()
+        )
+        db.session.add(job)
+        db.session.commit()
+
+        self.start()
+        self._wake.set()
+        return job
+
+    def start(self):
+        with self._start_lock:
+            if self._threads:
+                return
+            for i in range(self.workers):
+                thread = threading.Thread(
+                    target=self._worker_loop,
+                    name=f'job-worker-{i}',
+                    daemon=True
+                )
+                thread.start()
+                self._threads.append(thread)
+            logger.info(f"Started {self.workers} job workers")
+
+    def close(self):
+        self._stop.set()
+        self._wake.set()
+        for thread in self._threads:
+            thread.join(timeout=5)
+        self._threads = []
+
+    def _worker_loop(self):
+        with self.app.app_context():
+            while not self._stop.is_set():
+                try:
+                    job = self._claim()
+                except Exception as e:
+                    logger.error(f"Error claiming job: {str(e)}")
+                    db.session.rollback()
+                    job = None
+
+                if job is None:
+                    # Don't sit in the poll's transaction while idle
+                    db.session.remove()
+                    self._wake.wait(self.poll_interval)
+                    self._wake.clear()
+                    continue
+
+                self._run(job)
+                db.session.remove()
+
+    def _claim(self):
+        now = datetime.utcnow()
+        stale = now - timedelta(seconds=self.lease_timeout)
+        candidates = Job.query.filter(or_(
+            and_(Job.status == 'queued', Job.run_after <= now),
+            and_(Job.status == 'running', Job.heartbeat_at < stale)
+        )).order_by(Job.created_at).limit(self.workers * 2).all()
+
+        for candidate in candidates:
+            # Only one worker's UPDATE can match the row it saw
+            claimed = db.session.execute(
+                update(Job)
+                .where(Job.id == candidate.id)
+                .where(Job.status == candidate.status)
+                .where(Job.attempts == candidate.attempts)
+                .values(status='running', attempts=Job.attempts + 1, started_at=now, heartbeat_at=now)
+            )
+            db.session.commit()
+            if claimed.rowcount == 1:
+                job = db.session.get(Job, candidate.id, populate_existing=True)
+                # The attempt this run holds; ``job.attempts`` reloads after each commit
+                job.lease = job.attempts
+                return job
+        return None
+
+    def _run(self, job):
+        handler = self._handlers.get(job.kind)
+        try:
+            if handler is None:
+                raise PermanentJobError(f'No handler for job kind {job.kind}')
+            result = handler(job)
+            if self._settle(job, status='succeeded', result=result, error=None, finished_at=datetime.utcnow()):
+                logger.info(f"Job {job.id} ({job.kind}) succeeded")
+
+        except LeaseLost as e:
+            db.session.rollback()
+            logger.warning(f"Job {job.id} ({job.kind}) stopped: {str(e)}")
+
+        except Exception as e:
+            db.session.rollback()
+            retryable = not isinstance(e, PermanentJobError)
+            if retryable and job.lease < job.max_attempts:
+                now = datetime.utcnow()
+                retry_at = getattr(e, 'retry_at', None)
+                if retry_at is None:
+                    retry_at = now + timedelta(seconds=self.retry_delay * 2 ** (job.lease - 1))
+                if self._settle(job, status='queued', run_after=retry_at, error=str(e)):
+                    logger.warning(
+                        f"Job {job.id} ({job.kind}) failed, retrying in "
+                        f"{(retry_at - now).total_seconds():.0f}s: {str(e)}"
+                    )
+            elif self._settle(job, status='failed', error=str(e), finished_at=datetime.utcnow()):
+                logger.error(f"Job {job.id} ({job.kind}) failed: {str(e)}")
+
+    def _settle(self, job, **values):
+        """Commit this run's outcome, unless the job was reclaimed meanwhile."""
+        settled = db.session.execute(_held(job).values(**values))
+        if settled.rowcount != 1:
+            db.session.rollback()
+            logger.warning(f"Job {job.id} ({job.kind}) was reclaimed by another worker; dropping this run's outcome")
+            return False
+        db.session.commit()
+        return True
+
+
+def _held(job):
+    """An UPDATE of ``job`` that only matches while this run holds its lease."""
+    return (
+        update(Job)
+        .where(Job.id == job.id)
+        .where(Job.status == 'running')
+        .where(Job.attempts == job.lease)
+    )
+
+
+def checkpoint(job, **steps):
+    """Persist finished steps so a retry can skip them, and renew the lease.
+
+    Whatever else is pending in the session commits with the steps. If
+    another worker reclaimed the job meanwhile, nothing is committed and
+    ``LeaseLost`` is raised.
+    """
+    result = dict(job.result or {})
+    result.update(steps)
+    renewed = db.session.execute(_held(job).values(result=result, heartbeat_at=datetime.utcnow()))
+    if renewed.rowcount != 1:
+        db.session.rollback()
+        raise LeaseLost(f'job {job.id} was reclaimed by another worker')
+    db.session.commit()
@@ -0,0 +1,118 @@
+import hashlib
+import json
+import logging
+import threading
+from datetime import datetime, timedelta
+
+from cachetools import TTLCache
+from sqlalchemy.exc import IntegrityError
+
+from ..models.models import db, LLMCacheEntry
+
+logger = logging.getLogger(__name__)
+
+
+def llm_cache_key(model, temperature, prompt, inputs):
+    """Exact-match key for one model call: any change in these is a miss."""
+    payload = json.dumps(
+        {'model': model, 'temperature': temperature, 'prompt': prompt, 'inputs': inputs},
+        sort_keys=True,
+        default=str
+    )
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+class LLMResponseCache:
+    """Model responses keyed by ``llm_cache_key``.
+
+    A small in-process TTL cache sits in front of the ``llm_cache`` table.
+    Rows expire ``ttl`` seconds after they were written. Past
+    ``max_entries`` the least recently hit rows go first; eviction runs
+    every ``evict_every`` writes. Memory hits don't touch the table, so a
+    row's ``last_hit_at`` is refreshed at most once per memory TTL.
+
+    Writes are added to the current session; the caller commits.
+    """
+
+    def __init__(self, ttl=7 * 86400, max_entries=10000, memory_entries=256, memory_ttl=300,
+                 evict_every=100):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.evict_every = evict_every
+        self._memory = TTLCache(maxsize=memory_entries, ttl=memory_ttl)
+        self._lock = threading.Lock()
+        self._writes = 0
+
+    def _entry(self, row):
+        return {
+            'model': row.model,
+            'response': row.response,
+            'tokens_used': row.tokens_used or 0,
+            'latency_ms': row.latency_ms or 0,
+            'created_at': row.created_at
+        }
+
+    def _is_fresh(self, entry):
+        created_at = entry['created_at']
+        return created_at is not None and datetime.utcnow() - created_at < timedelta(seconds=self.ttl)
+
+    def get(self, key):
+        """Return the cached ``{'model', 'response', 'tokens_used', 'latency_ms'}``, or None."""
+        with self._lock:
+            entry = self._memory.get(key)
+        if entry is not None and self._is_fresh(entry):
+            return entry
+
+        row = db.session.get(LLMCacheEntry, key)
+        if row is None:
+            return None
+        entry = self._entry(row)
+        if not self._is_fresh(entry):
+            return None
+
+        row.hits += 1
+        row.last_hit_at = datetime.utcnow()
+        with self._lock:
+            self._memory[key] = entry
+        return entry
+
+    def put(self, key, model, response, tokens_used, latency_ms):
+        row = LLMCacheEntry(
+            cache_key=key,
+            model=model,
+            response=response,
+            tokens_used=tokens_used,
+            latency_ms=latency_ms,
+            hits=0,
+            created_at=datetime.utcnow(),
+            last_hit_at=datetime.utcnow()
+        )
+        try:
+            # A savepoint, so a concurrent writer of the same key can't
+            # fail the caller's transaction
+            with db.session.begin_nested():
+                db.session.merge(row)
+        except IntegrityError:
+            logger.debug(f"LLM cache entry {key} was written concurrently")
+        with self._lock:
+            self._memory[key] = self._entry(row)
+            self._writes += 1
+            evict = self._writes % self.evict_every == 0
+        if evict:
+            self.evict()
+
+    def evict(self):
+        """Delete expired rows, then the least recently hit beyond ``max_entries``."""
+        cutoff = datetime.utcnow() - timedelta(seconds=self.ttl)
+        expired = LLMCacheEntry.query.filter(LLMCacheEntry.created_at < cutoff).delete(
+            synchronize_session=False
+        )
+
+        overflow = db.session.query(LLMCacheEntry.cache_key).order_by(
+            LLMCacheEntry.last_hit_at.desc()
+        ).offset(self.max_entries).subquery()
+        evicted = LLMCacheEntry.query.filter(LLMCacheEntry.cache_key.in_(db.select(overflow))).delete(
+            synchronize_session=False
+        )
+        if expired or evicted:
+            logger.info(f"LLM cache evicted {expired} expired and {evicted} least recently used entries")
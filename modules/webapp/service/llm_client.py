@@ -0,0 +1,464 @@
+import asyncio
+import concurrent.futures
+import contextlib
+import logging
+import queue
+import random
+import threading
+import time
+from typing import Optional
+
+from google.api_core import exceptions as google_exceptions
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, AIMessageChunk
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult
+from pydantic import PrivateAttr
+from tenacity import (
+    AsyncRetrying, Retrying, retry_if_exception, stop_after_attempt,
+    stop_before_delay, wait_random_exponential
+)
+
+from .context_budget import estimate_tokens
+
+logger = logging.getLogger(__name__)
+
+# Upstream trouble that is worth another attempt and counts against the
+# circuit breaker; anything else (a bad prompt, a blocked response) is the
+# caller's problem and is raised at once
+RETRYABLE_ERRORS = (
+    google_exceptions.ResourceExhausted,
+    google_exceptions.TooManyRequests,
+    google_exceptions.ServiceUnavailable,
+    google_exceptions.InternalServerError,
+    google_exceptions.BadGateway,
+    google_exceptions.GatewayTimeout,
+    google_exceptions.DeadlineExceeded,
+    google_exceptions.RetryError,
+    ConnectionError,
+    TimeoutError,
+)
+
+
+class LLMError(Exception):
+    """The model could not be reached in time."""
+
+
+class LLMTimeout(LLMError):
+    """One attempt ran past its timeout."""
+
+
+class LLMUnavailable(LLMError):
+    """The circuit breaker is open; the call was not attempted."""
+
+    def __init__(self, retry_after):
+        super().__init__(f"LLM backend unavailable; retry in {retry_after:.0f}s")
+        self.retry_after = retry_after
+
+
+class LLMUpstreamError(LLMError):
+    """The upstream kept failing (429, 5xx, dropped connections) until the
+    retries ran out; the last error is the ``__cause__``.
+    """
+
+    def __init__(self, error, retry_after):
+        super().__init__(f"LLM backend error: {error}")
+        self.retry_after = retry_after
+
+
+@contextlib.contextmanager
+def _upstream_errors(retry_after):
+    # Callers handle one error type, whichever client library raised
+    try:
+        yield
+    except RETRYABLE_ERRORS as e:
+        raise LLMUpstreamError(e, retry_after) from e
+
+
+def is_retryable(exc):
+    return isinstance(exc, (LLMTimeout, *RETRYABLE_ERRORS))
+
+
+def _log_retry(retry_state):
+    logger.warning(
+        f"LLM call attempt {retry_state.attempt_number} failed: {retry_state.outcome.exception()}; "
+        f"retrying in {retry_state.next_action.sleep:.2f}s"
+    )
+
+
+class CircuitBreaker:
+    """Fail fast while the upstream is unhealthy.
+
+    ``failure_threshold`` consecutive retryable failures open the circuit;
+    calls are then refused with ``LLMUnavailable`` for ``reset_timeout``
+    seconds. After that one probe call is let through (half-open): success
+    closes the circuit, failure opens it again.
+    """
+
+    CLOSED = 'closed'
+    OPEN = 'open'
+    HALF_OPEN = 'half_open'
+
+    def __init__(self, failure_threshold=5, reset_timeout=30):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._lock = threading.Lock()
+        self._failures = 0
+        self._opened_at = None
+        self._probing = False
+        self.times_opened = 0
+
+    def _retry_after(self):
+        return max(self._opened_at + self.reset_timeout - time.monotonic(), 0)
+
+    def _refusing(self):
+        return self._opened_at is not None and (self._probing or self._retry_after() > 0)
+
+    @property
+    def state(self):
+        with self._lock:
+            if self._opened_at is None:
+                return self.CLOSED
+            return self.OPEN if self._refusing() else self.HALF_OPEN
+
+    def check(self):
+        """Raise ``LLMUnavailable`` while the circuit is open, without
+        taking the half-open probe.
+        """
+        with self._lock:
+            if self._refusing():
+                raise LLMUnavailable(self._retry_after() or self.reset_timeout)
+
+    def before_call(self):
+        """Raise ``LLMUnavailable`` unless a call may go ahead now."""
+        with self._lock:
+            if self._opened_at is None:
+                return
+            if self._refusing():
+                raise LLMUnavailable(self._retry_after() or self.reset_timeout)
+            self._probing = True
+            logger.info("LLM circuit half-open; sending a probe call")
+
+    def record_success(self):
+        with self._lock:
+            if self._opened_at is not None:
+                logger.info("LLM circuit closed")
+            self._failures = 0
+            self._opened_at = None
+            self._probing = False
+
+    def record_failure(self):
+        with self._lock:
+            self._failures += 1
+            if self._probing or (self._opened_at is None and self._failures >= self.failure_threshold):
+                self._opened_at = time.monotonic()
+                self._probing = False
+                self.times_opened += 1
+                logger.warning(
+                    f"LLM circuit open after {self._failures} consecutive failures; "
+                    f"refusing calls for {self.reset_timeout}s"
+                )
+
+    def stats(self):
+        state = self.state
+        with self._lock:
+            return {
+                'state': state,
+                'consecutive_failures': self._failures,
+                'times_opened': self.times_opened,
+                'retry_after': round(self._retry_after(), 1) if state == self.OPEN else 0
+            }
+
+
+class LLMClient:
+    """Every model call the app makes goes through here.
+
+    Each attempt is cut off after ``timeout`` seconds. Retryable errors are
+    retried with jittered exponential backoff (``backoff_base`` up to
+    ``backoff_max`` seconds) for at most ``max_attempts`` attempts, and no
+    attempt starts later than ``deadline`` seconds after the call began.
+    All attempts report to the ``breaker``, which refuses calls outright
+    while it is open.
+
+    A call may also be given a ``deadline`` (a ``time.monotonic()`` value)
+    for the request it is part of; it then gets no longer than is left.
+
+    Sync calls run on a small thread pool so they can be abandoned at the
+    timeout; a hung request keeps its thread until the client library
+    gives up on it. Streams are retried only until the first chunk, and
+    ``timeout`` then bounds the wait for each following chunk.
+    """
+
+    def __init__(self, llm, timeout=20, deadline=25, max_attempts=3, backoff_base=0.5,
+                 backoff_max=8, breaker=None, max_workers=16):
+        self.llm = llm
+        self.timeout = timeout
+        self.deadline = deadline
+        self.max_attempts = max_attempts
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.breaker = breaker or CircuitBreaker()
+        self._chains = {}
+        self._executor = concurrent.futures.ThreadPoolExecutor(
+            max_workers=max_workers, thread_name_prefix='llm-call'
+        )
+
+    @property
+    def model_name(self):
+        return getattr(self.llm, 'model', None) or type(self.llm).__name__
+
+    @property
+    def temperature(self):
+        return getattr(self.llm, 'temperature', None)
+
+    def _chain(self, prompt):
+        """The runnable for ``prompt`` (a ``VersionedPrompt``), built once per template."""
+        chain = self._chains.get(prompt.key)
+        if chain is None:
+            chain = self._chains.setdefault(prompt.key, prompt.prompt | self.llm)
+        return chain
+
+    def _budget(self, deadline):
+        """Seconds this call may take, given the request's ``deadline``."""
+        if deadline is None:
+            return self.deadline
+        budget = min(self.deadline, deadline - time.monotonic())
+        if budget <= 0:
+            raise LLMTimeout("Request deadline passed before the LLM call")
+        return budget
+
+    def _retry_options(self, budget):
+        return {
+            'stop': stop_after_attempt(self.max_attempts) | stop_before_delay(budget),
+            'wait': wait_random_exponential(multiplier=self.backoff_base, max=self.backoff_max),
+            'retry': retry_if_exception(is_retryable),
+            'before_sleep': _log_retry,
+            'reraise': True
+        }
+
+    def _attempt_timeout(self, started, budget):
+        return max(min(self.timeout, budget - (time.monotonic() - started)), 0.001)
+
+    def _record(self, exc):
+        if exc is None or not is_retryable(exc):
+            # The upstream answered, even if only to reject the request
+            self.breaker.record_success()
+        else:
+            self.breaker.record_failure()
+
+    def _call(self, fn, started, budget):
+        self.breaker.before_call()
+        timeout = self._attempt_timeout(started, budget)
+        future = self._executor.submit(fn)
+        try:
+            result = future.result(timeout=timeout)
+        except concurrent.futures.TimeoutError:
+            future.cancel()
+            self.breaker.record_failure()
+            raise LLMTimeout(f"LLM call timed out after {timeout:.1f}s")
+        except Exception as e:
+            self._record(e)
+            raise
+        self._record(None)
+        return result
+
+    async def _acall(self, make_coro, started, budget):
+        self.breaker.before_call()
+        timeout = self._attempt_timeout(started, budget)
+        try:
+            result = await asyncio.wait_for(make_coro(), timeout)
+        except asyncio.TimeoutError:
+            self.breaker.record_failure()
+            raise LLMTimeout(f"LLM call timed out after {timeout:.1f}s")
+        except Exception as e:
+            self._record(e)
+            raise
+        self._record(None)
+        return result
+
+    def invoke(self, prompt, inputs, deadline=None):
+        """Run ``prompt`` with ``inputs``; return the model's message.
+
+        Raises an ``LLMError`` once the retries give up.
+        """
+        started = time.monotonic()
+        budget = self._budget(deadline)
+        chain = self._chain(prompt)
+        with _upstream_errors(self.backoff_max):
+            for attempt in Retrying(**self._retry_options(budget)):
+                with attempt:
+                    return self._call(lambda: chain.invoke(inputs), started, budget)
+
+    async def ainvoke(self, prompt, inputs, deadline=None):
+        started = time.monotonic()
+        budget = self._budget(deadline)
+        chain = self._chain(prompt)
+        with _upstream_errors(self.backoff_max):
+            async for attempt in AsyncRetrying(**self._retry_options(budget)):
+                with attempt:
+                    return await self._acall(lambda: chain.ainvoke(inputs), started, budget)
+
+    def stream(self, prompt, inputs, deadline=None):
+        """Yield the model's message chunks as they arrive. ``deadline``
+        bounds the wait for the first chunk.
+        """
+        started = time.monotonic()
+        budget = self._budget(deadline)
+        chain = self._chain(prompt)
+        with _upstream_errors(self.backoff_max):
+            for attempt in Retrying(**self._retry_options(budget)):
+                with attempt:
+                    self.breaker.before_call()
+                    pump = _ChunkPump(self._executor, lambda: chain.stream(inputs))
+                    chunk = self._next_chunk(pump, self._attempt_timeout(started, budget))
+
+            try:
+                while chunk is not None:
+                    yield chunk
+                    chunk = self._next_chunk(pump, self.timeout)
+            finally:
+                pump.close()
+
+    def _next_chunk(self, pump, timeout):
+        try:
+            chunk = pump.next(timeout)
+        except Exception as e:
+            pump.close()
+            self._record(e)
+            raise
+        self._record(None)
+        return chunk
+
+    def stats(self):
+        return {
+            'model': self.model_name,
+            'timeout': self.timeout,
+            'deadline': self.deadline,
+            'max_attempts': self.max_attempts,
+            'breaker': self.breaker.stats()
+        }
+
+    def close(self):
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+
+class _ChunkPump:
+    """Reads a stream on a pool thread, so the reader can stop waiting on it."""
+
+    _DONE = object()
+
+    def __init__(self, executor, open_stream):
+        self._chunks = queue.Queue()
+        self._stopped = threading.Event()
+        executor.submit(self._produce, open_stream)
+
+    def _produce(self, open_stream):
+        try:
+            for chunk in open_stream():
+                if self._stopped.is_set():
+                    return
+                self._chunks.put(chunk)
+            self._chunks.put(self._DONE)
+        except Exception as e:
+            self._chunks.put(e)
+
+    def next(self, timeout):
+        """The next chunk, or None at the end of the stream."""
+        try:
+            item = self._chunks.get(timeout=timeout)
+        except queue.Empty:
+            raise LLMTimeout(f"No output from the LLM for {timeout:.1f}s")
+        if item is self._DONE:
+            return None
+        if isinstance(item, Exception):
+            raise item
+        return item
+
+    def close(self):
+        self._stopped.set()
+
+
+class FakeChatModel(BaseChatModel):
+    """Offline stand-in for Gemini, for tests and local runs.
+
+    Answers cycle through ``responses``, or echo the prompt when there are
+    none. Each call takes ``latency`` seconds and fails with a 503 with
+    probability ``failure_rate``. Usage metadata is estimated from the
+    text, so metering and budgets behave as they would against the real
+    model.
+    """
+
+    model: str = 'fake-chat'
+    temperature: float = 0.0
+    responses: list = []
+    latency: float = 0.0
+    failure_rate: float = 0.0
+    seed: Optional[int] = None
+    _index: int = PrivateAttr(default=0)
+    _lock: object = PrivateAttr(default_factory=threading.Lock)
+    _random: object = PrivateAttr(default=None)
+
+    @property
+    def _llm_type(self):
+        return 'fake-chat'
+
+    def _reply(self, messages):
+        with self._lock:
+            if self._random is None:
+                self._random = random.Random(self.seed)
+            if self._random.random() < self.failure_rate:
+                raise google_exceptions.ServiceUnavailable('Fake backend failure')
+            if self.responses:
+                text = self.responses[self._index % len(self.responses)]
+                self._index += 1
+            else:
+                text = None
+        prompt = '\n'.join(str(message.content) for message in messages)
+        if text is None:
+            text = f"Fake response to: {' '.join(prompt.split())[:200]}"
+        input_tokens, output_tokens = estimate_tokens(prompt), estimate_tokens(text)
+        return text, {
+            'input_tokens': input_tokens,
+            'output_tokens': output_tokens,
+            'total_tokens': input_tokens + output_tokens
+        }
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs):
+        time.sleep(self.latency)
+        text, usage = self._reply(messages)
+        return ChatResult(generations=[ChatGeneration(message=AIMessage(content=text, usage_metadata=usage))])
+
+    async def _agenerate(self, messages, stop=None, run_manager=None, **kwargs):
+        await asyncio.sleep(self.latency)
+        text, usage = self._reply(messages)
+        return ChatResult(generations=[ChatGeneration(message=AIMessage(content=text, usage_metadata=usage))])
+
+    def _stream(self, messages, stop=None, run_manager=None, **kwargs):
+        time.sleep(self.latency)
+        text, usage = self._reply(messages)
+        words = text.split(' ')
+        for number, word in enumerate(words):
+            last = number == len(words) - 1
+            chunk = AIMessageChunk(
+                content=word if last else word + ' ',
+                usage_metadata=usage if last else None
+            )
+            if run_manager:
+                run_manager.on_llm_new_token(chunk.content, chunk=chunk)
+            yield ChatGenerationChunk(message=chunk)
+
+
+def build_chat_model(backend, model=None, api_key=None, temperature=0.7, fake_latency=0.0,
+                     fake_failure_rate=0.0):
+    """The chat model for ``backend``: ``'gemini'`` or ``'fake'``."""
+    if backend == 'fake':
+        return FakeChatModel(model=model or 'fake-chat', temperature=temperature, latency=fake_latency, failure_rate=fake_failure_rate)
+    if backend != 'gemini':
+        raise ValueError(f"Unknown LLM backend: {backend}")
+
+    import google.generativeai as genai
+    from langchain_google_genai import ChatGoogleGenerativeAI
+
+    genai.configure(api_key=api_key)
+    # The Gemini client makes up to two tries of its own per call; those
+    # happen inside one of our attempts and its timeout
+    return ChatGoogleGenerativeAI(model=model, temperature=temperature)
@@ -0,0 +1,216 @@
+import asyncio
+import concurrent.futures
+import itertools
+import logging
+import threading
+import time
+
+from .context_budget import estimate_tokens
+from .llm_client import LLMError, LLMUnavailable
+
+logger = logging.getLogger(__name__)
+
+# Calls averaged before a tier can be judged slow, so one outlier doesn't
+MIN_LATENCY_SAMPLES = 3
+
+
+class ModelTier:
+    """One model behind its own ``LLMClient``.
+
+    ``latency_target_ms`` is what the tier's calls should take; once their
+    moving average goes over it, the tier counts as slow for ``cooldown``
+    seconds and the router sends its traffic to the fallback instead.
+    """
+
+    def __init__(self, name, client, latency_target_ms=None, fallback=None):
+        self.name = name
+        self.client = client
+        self.latency_target_ms = latency_target_ms
+        self.fallback = fallback
+        self.latency_ms = None
+        self.samples = 0
+        self.slow_until = 0.0
+        self.calls = 0
+        self.fallbacks = 0
+
+    @property
+    def model_name(self):
+        return self.client.model_name
+
+
+class ModelRouter:
+    """Pick a model tier for each call and fall back when it is slow or down.
+
+    A prompt estimated at no more than ``small_prompt_tokens`` goes to the
+    ``small_tier``; larger ones go to the tier ``task_tiers`` names for
+    their task, or ``default_tier``. If that tier is slow (see
+    ``ModelTier``) its fallback is tried first; if a call fails with an
+    ``LLMError`` (a timeout, an open circuit, or upstream errors that
+    outlasted the retries) the fallback gets one go at it. Either way the
+    model that answered is returned with the response.
+
+    ``deadline`` (a ``time.monotonic()`` value) bounds a call and its
+    fallback together; a fallback is not tried once it has passed.
+    """
+
+    def __init__(self, tiers, default_tier, small_tier=None, small_prompt_tokens=0, task_tiers=None,
+                 cooldown=60, smoothing=0.3):
+        self.tiers = {tier.name: tier for tier in tiers}
+        self.default_tier = default_tier
+        self.small_tier = small_tier
+        self.small_prompt_tokens = small_prompt_tokens
+        self.task_tiers = task_tiers or {}
+        self.cooldown = cooldown
+        self.smoothing = smoothing
+        self._lock = threading.Lock()
+
+    @classmethod
+    def single(cls, client):
+        """A router that always uses ``client``."""
+        return cls([ModelTier('default', client)], default_tier='default')
+
+    def plan(self, task, prompt, inputs):
+        """The tier ``task`` goes to by size and task alone."""
+        if self.small_tier and estimate_tokens(prompt.format(**inputs)) <= self.small_prompt_tokens:
+            return self.tiers[self.small_tier]
+        return self.tiers[self.task_tiers.get(task, self.default_tier)]
+
+    def _is_slow(self, tier):
+        with self._lock:
+            now = time.monotonic()
+            if (tier.latency_target_ms and tier.samples >= MIN_LATENCY_SAMPLES
+                    and tier.latency_ms > tier.latency_target_ms):
+                logger.warning(
+                    f"Model {tier.model_name} averaging {tier.latency_ms:.0f} ms against a "
+                    f"{tier.latency_target_ms} ms target; routing around it for {self.cooldown}s"
+                )
+                tier.slow_until = now + self.cooldown
+                # Start afresh when the cooldown ends
+                tier.latency_ms = None
+                tier.samples = 0
+            return now < tier.slow_until
+
+    def _candidates(self, task, prompt, inputs):
+        primary = self.plan(task, prompt, inputs)
+        fallback = self.tiers.get(primary.fallback)
+        if fallback is None:
+            return [primary]
+        if self._is_slow(primary) and not self._is_slow(fallback):
+            with self._lock:
+                primary.fallbacks += 1
+            return [fallback, primary]
+        return [primary, fallback]
+
+    def _observe(self, tier, started):
+        latency_ms = (time.monotonic() - started) * 1000
+        with self._lock:
+            tier.calls += 1
+            tier.samples += 1
+            if tier.latency_ms is None:
+                tier.latency_ms = latency_ms
+            else:
+                tier.latency_ms += self.smoothing * (latency_ms - tier.latency_ms)
+
+    def _fall_back(self, tier, error, tiers, deadline):
+        if tier is tiers[-1] or (deadline is not None and time.monotonic() >= deadline):
+            return False
+        with self._lock:
+            tier.fallbacks += 1
+        logger.warning(f"Model {tier.model_name} failed ({error}); falling back")
+        return True
+
+    def invoke(self, task, prompt, inputs, deadline=None):
+        """Return the model's message and the name of the model that answered."""
+        tiers = self._candidates(task, prompt, inputs)
+        for tier in tiers:
+            started = time.monotonic()
+            try:
+                message = tier.client.invoke(prompt, inputs, deadline=deadline)
+            except LLMError as e:
+                if self._fall_back(tier, e, tiers, deadline):
+                    continue
+                raise
+            self._observe(tier, started)
+            return message, tier.model_name
+
+    async def ainvoke(self, task, prompt, inputs, deadline=None):
+        tiers = self._candidates(task, prompt, inputs)
+        for tier in tiers:
+            started = time.monotonic()
+            try:
+                message = await tier.client.ainvoke(prompt, inputs, deadline=deadline)
+            except LLMError as e:
+                if self._fall_back(tier, e, tiers, deadline):
+                    continue
+                raise
+            self._observe(tier, started)
+            return message, tier.model_name
+
+    def batch(self, task, prompt, inputs_list, max_concurrency=4, deadline=None):
+        """``invoke`` over ``inputs_list``, at most ``max_concurrency`` at a
+        time; returns just the messages.
+        """
+        with concurrent.futures.ThreadPoolExecutor(max_workers=max_concurrency) as pool:
+            results = pool.map(lambda inputs: self.invoke(task, prompt, inputs, deadline=deadline), inputs_list)
+            return [message for message, _ in results]
+
+    async def abatch(self, task, prompt, inputs_list, max_concurrency=4, deadline=None):
+        semaphore = asyncio.Semaphore(max_concurrency)
+
+        async def run(inputs):
+            async with semaphore:
+                message, _ = await self.ainvoke(task, prompt, inputs, deadline=deadline)
+            return message
+
+        return await asyncio.gather(*(run(inputs) for inputs in inputs_list))
+
+    def stream(self, task, prompt, inputs, deadline=None):
+        """Return the name of the model streaming and its chunks. A tier
+        that fails before its first chunk is fallen back from.
+        """
+        tiers = self._candidates(task, prompt, inputs)
+        for tier in tiers:
+            chunks = tier.client.stream(prompt, inputs, deadline=deadline)
+            try:
+                first = next(chunks, None)
+            except LLMError as e:
+                if self._fall_back(tier, e, tiers, deadline):
+                    continue
+                raise
+            return tier.model_name, itertools.chain([first] if first is not None else [], chunks)
+
+    def check(self):
+        """Raise ``LLMUnavailable`` when every tier's circuit is open."""
+        errors = []
+        for tier in self.tiers.values():
+            try:
+                tier.client.breaker.check()
+                return
+            except LLMUnavailable as e:
+                errors.append(e)
+        raise min(errors, key=lambda e: e.retry_after)
+
+    def stats(self):
+        now = time.monotonic()
+        return {
+            'default_tier': self.default_tier,
+            'small_tier': self.small_tier,
+            'small_prompt_tokens': self.small_prompt_tokens,
+            'task_tiers': self.task_tiers,
+            'tiers': {
+                tier.name: {
+                    'model': tier.model_name,
+                    'fallback': tier.fallback,
+                    'latency_target_ms': tier.latency_target_ms,
+                    'avg_latency_ms': round(tier.latency_ms) if tier.latency_ms is not None else None,
+                    'slow': now < tier.slow_until,
+                    'calls': tier.calls,
+                    'fallbacks': tier.fallbacks,
+                    'client': tier.client.stats()
+                } for tier in self.tiers.values()
+            }
+        }
+
+    def close(self):
+        for tier in self.tiers.values():
+            tier.client.close()
@@ -0,0 +1,72 @@
+import base64
+import binascii
+import json
+from datetime import datetime
+
+from sqlalchemy import and_, or_
+from sqlalchemy.orm import load_only
+
+
+class InvalidPageRequest(ValueError):
+    """A bad ``cursor``, ``limit`` or ``fields`` parameter."""
+
+
+def encode_cursor(row):
+    """An opaque cursor for the page after ``row``."""
+    position = json.dumps([row.created_at.isoformat(), row.id])
+    return base64.urlsafe_b64encode(position.encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor):
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        created_at, row_id = json.loads(base64.urlsafe_b64decode(padded))
+        return datetime.fromisoformat(created_at), str(row_id)
+    except (binascii.Error, UnicodeDecodeError, TypeError, ValueError):
+        raise InvalidPageRequest('Invalid cursor')
+
+
+def parse_limit(value, default, maximum):
+    if value in (None, ''):
+        return default
+    try:
+        limit = int(value)
+    except ValueError:
+        raise InvalidPageRequest('limit must be an integer')
+    if not 1 <= limit <= maximum:
+        raise InvalidPageRequest(f'limit must be between 1 and {maximum}')
+    return limit
+
+
+def parse_fields(value, allowed, default):
+    """The comma-separated ``fields`` asked for, in ``allowed``; else ``default``."""
+    if not value:
+        return list(default)
+    fields = [field.strip() for field in value.split(',') if field.strip()]
+    unknown = [field for field in fields if field not in allowed]
+    if unknown:
+        raise InvalidPageRequest(f"Unknown fields: {', '.join(unknown)}; allowed: {', '.join(allowed)}")
+    return fields
+
+
+def keyset_page(query, model, limit, cursor=None, columns=()):
+    """One page of ``query``, newest first, and the cursor for the next.
+
+    Rows are ordered on ``(created_at, id)`` and a page starts strictly
+    after the cursor's row, so the cost of a page does not depend on how
+    many came before it, and rows added meanwhile don't shift the pages.
+    Only ``columns`` (attribute names) are loaded, plus the two the
+    cursor needs; the next cursor is None on the last page.
+    """
+    attributes = [getattr(model, name) for name in dict.fromkeys(('id', 'created_at', *columns))]
+    query = query.options(load_only(*attributes))
+    if cursor:
+        created_at, row_id = decode_cursor(cursor)
+        query = query.filter(or_(
+            model.created_at < created_at,
+            and_(model.created_at == created_at, model.id < row_id)
+        ))
+    rows = query.order_by(model.created_at.desc(), model.id.desc()).limit(limit + 1).all()
+    if len(rows) > limit:
+        return rows[:limit], encode_cursor(rows[limit - 1])
+    return rows, None
@@ -0,0 +1,138 @@
+import logging
+import multiprocessing
+import sys
+import threading
+from concurrent.futures import ProcessPoolExecutor, TimeoutError as FutureTimeoutError
+from concurrent.futures.process import BrokenProcessPool
+
+from .extraction_rules import RuleRegistry
+from .extractor import DocumentExtractor
+
+logger = logging.getLogger(__name__)
+
+# ProcessPoolExecutor only takes max_tasks_per_child from Python 3.11
+NATIVE_MAX_TASKS_PER_CHILD = sys.version_info >= (3, 11)
+
+# Set in each worker process by _init_worker
+_worker_extractor = None
+
+
+class ParseTimeout(Exception):
+    """A page took longer than the pool's ``timeout`` to parse."""
+
+
+def _init_worker(parser, rules_path, rules_check_interval):
+    global _worker_extractor
+    # Each worker watches the rules file itself, so edits reach it without
+    # restarting the pool
+    rules = RuleRegistry(rules_path, check_interval=rules_check_interval)
+    _worker_extractor = DocumentExtractor(parser=parser, rules=rules)
+
+
+def _extract_in_worker(html, url, collect_links):
+    return _worker_extractor.extract(html, url, collect_links=collect_links)
+
+
+class ParsePool:
+    """Run HTML parsing and extraction in separate processes.
+
+    BeautifulSoup work is CPU-bound and holds the GIL, so on big pages it
+    stalls every other thread in a web worker. With ``workers`` > 0 the HTML
+    goes to a process pool and only the small extracted dict comes back.
+    Worker processes are spawned rather than forked, since the web process
+    is multi-threaded, and are only started on first use. ``workers=0``
+    extracts inline.
+
+    Workers are replaced after ``max_tasks_per_child`` pages each, to cap
+    any memory a parser leaks. Before Python 3.11 the executor can't do
+    that per process, so the whole pool is replaced once it has been given
+    ``workers * max_tasks_per_child`` pages; the old one finishes what it
+    has in hand.
+
+    A page that takes longer than ``timeout`` seconds raises
+    ``ParseTimeout``. Its worker can't be interrupted, so the pool is torn
+    down with its processes killed; parses other threads had in flight on
+    it are redone inline.
+
+    Extraction rule hits are counted in ``rules``, this process's registry,
+    whichever process did the parsing.
+    """
+
+    def __init__(self, workers=2, parser=None, max_tasks_per_child=None, timeout=None, rules=None):
+        self.workers = workers
+        self.parser = parser
+        self.max_tasks_per_child = max_tasks_per_child
+        self.timeout = timeout
+        self.rules = rules or RuleRegistry()
+        self._inline = DocumentExtractor(parser=parser, rules=self.rules)
+        self._executor = None
+        self._submitted = 0
+        self._lock = threading.Lock()
+
+    def _new_executor(self):
+        options = {}
+        if self.max_tasks_per_child and NATIVE_MAX_TASKS_PER_CHILD:
+            options['max_tasks_per_child'] = self.max_tasks_per_child
+        return ProcessPoolExecutor(
+            max_workers=self.workers,
+            mp_context=multiprocessing.get_context('spawn'),
+            initializer=_init_worker,
+            initargs=(self.parser, self.rules.path, self.rules.check_interval),
+            **options
+        )
+
+    def _get_executor(self):
+        retired = None
+        with self._lock:
+            if (self._executor is not None and self.max_tasks_per_child and not NATIVE_MAX_TASKS_PER_CHILD
+                    and self._submitted >= self.workers * self.max_tasks_per_child):
+                retired, self._executor = self._executor, None
+            if self._executor is None:
+                self._executor = self._new_executor()
+                self._submitted = 0
+            self._submitted += 1
+            executor = self._executor
+        if retired is not None:
+            logger.info("Recycling parse pool workers")
+            retired.shutdown(wait=False)
+        return executor
+
+    def _reset(self, executor, kill=False):
+        with self._lock:
+            if self._executor is executor:
+                self._executor = None
+        # The executor forgets its processes on shutdown
+        processes = list((executor._processes or {}).values()) if kill else []
+        executor.shutdown(wait=False, cancel_futures=True)
+        for process in processes:
+            process.terminate()
+
+    def extract(self, html, url, collect_links=False):
+        document = self._extract(html, url, collect_links)
+        self.rules.record(document['rule'])
+        return document
+
+    def _extract(self, html, url, collect_links):
+        if not self.workers:
+            return self._inline.extract(html, url, collect_links=collect_links)
+
+        executor = self._get_executor()
+        try:
+            return executor.submit(_extract_in_worker, html, url, collect_links).result(timeout=self.timeout)
+        except FutureTimeoutError:
+            # Retrying inline would hang this thread instead
+            logger.warning(f"Parsing {url} took over {self.timeout}s; killing the parse pool")
+            self._reset(executor, kill=True)
+            raise ParseTimeout(f'Parsing {url} took longer than {self.timeout}s')
+        except BrokenProcessPool:
+            # A worker died (e.g. OOM on a pathological page); start a fresh
+            # pool for the next call and extract this page inline
+            logger.warning("Parse pool broke; restarting it")
+            self._reset(executor)
+            return self._inline.extract(html, url, collect_links=collect_links)
+
+    def close(self):
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=True, cancel_futures=True)
@@ -1,69 +1,348 @@
-from langchain_google_genai import ChatGoogleGenerativeAI
-import google.generativeai as genai
-from langchain.prompts import ChatPromptTemplate
-from langchain.chains import LLMChain
-from langchain.callbacks import get_openai_callback
+import asyncio
+import contextlib
+import logging
 import os
+import time
+
+from .context_budget import ContextBudget, estimate_tokens
+from .llm_cache import llm_cache_key
+from .llm_client import LLMClient, build_chat_model
+from .model_router import ModelRouter
+from .prompt_templates import (
+    CHUNK_SUMMARY, CUSTOM_CONTEXT, CUSTOM_PLAIN, SCRAPED_DATA, PromptTemplateRegistry
+)
+
+logger = logging.getLogger(__name__)
+
+SCRAPED_DATA_FOCUS = "about the entity and its business"
+
+
+def _usage(message):
+    """Token counts the model reported for one response."""
+    usage = message.usage_metadata or {}
+    return {
+        'prompt_tokens': usage.get('input_tokens', 0),
+        'completion_tokens': usage.get('output_tokens', 0),
+        'total_tokens': usage.get('total_tokens', 0)
+    }
+
+
+_NO_USAGE = {'prompt_tokens': 0, 'completion_tokens': 0, 'total_tokens': 0}
+
+
+def _add_usage(*usages):
+    return {key: sum(usage[key] for usage in usages) for key in _NO_USAGE}
+
+
+def _elapsed_ms(started):
+    return int((time.monotonic() - started) * 1000)
+
 
 class PromptHandler:
-    def __init__(self):
-        genai.configure(api_key=os.getenv('GEMINI_API_KEY'))
-        self.llm = ChatGoogleGenerativeAI(
-                model=f"{os.getenv('GEMINI_DEFAULT_MODEL')}",
-                temperature=0.7
-                )
+    """Run the app's prompts through a ``ModelRouter`` (one Gemini model by default).
+
+    Every method returns ``(response, tokens_used, meta)``. ``meta`` holds
+    the usage columns of ``PromptLog`` (``model``, ``template_version``,
+    ``prompt_tokens``, ``completion_tokens``, ``latency_ms``, ``cache_hit``,
+    ``tokens_saved``, ``latency_saved_ms``) so callers can pass it straight through. Token
+    counts come from the model's response metadata. With a ``cache``,
+    identical calls are answered from it; ``refresh`` skips the lookup but
+    still stores the new response.
+
+    Prompts come from ``templates`` at their active versions. Calls are
+    routed by task (``scraped_data``, ``custom`` and ``chunk_summary``) and
+    prompt size. The cache is keyed on the model the
+    router plans to use, whichever model ends up answering.
+
+    Given a ``usage_meter`` and a ``user_id``, a call that would go to the
+    model first checks the user's daily token budget and raises
+    ``DailyBudgetExceeded`` if it is spent. Cache hits are always served.
+
+    Prompts estimated over the ``context_budget`` have their long input
+    (``about``, or the custom prompt's ``context``) split into chunks that
+    are summarized in parallel; the summaries take its place in the final
+    prompt. The cache is keyed on the original input, so a hit skips all
+    of it, and ``tokens_used`` includes the chunk summaries.
+
+    Model calls can raise ``LLMTimeout``, ``LLMUpstreamError`` or
+    ``LLMUnavailable`` (all ``LLMError``) once the retries, circuit
+    breakers and fallbacks give up. In the sync paths, which serve web
+    requests, condensing, the call and any fallback share one
+    ``request_deadline`` (seconds); the stream's applies to its first token.
+    """
+
+    def __init__(self, router=None, templates=None, cache=None, context_budget=None,
+                 usage_meter=None, request_deadline=None):
+        self.router = router or ModelRouter.single(LLMClient(
+            build_chat_model('gemini', os.getenv('GEMINI_DEFAULT_MODEL'), os.getenv('GEMINI_API_KEY'))
+        ))
+        self.templates = templates or PromptTemplateRegistry()
+        self.cache = cache
+        self.context_budget = context_budget or ContextBudget()
+        self.usage_meter = usage_meter
+        self.request_deadline = request_deadline
+
+    def _deadline(self, started):
+        return started + self.request_deadline if self.request_deadline else None
+
+    def _cache_key(self, task, prompt, inputs):
+        if self.cache is None:
+            return None
+        client = self.router.plan(task, prompt, inputs).client
+        return llm_cache_key(client.model_name, client.temperature, prompt.format(**inputs), inputs)
+
+    def _cached(self, key, refresh):
+        if key is None or refresh:
+            return None
+        return self.cache.get(key)
+
+    @staticmethod
+    def _hit_meta(cached, started, prompt):
+        return {
+            'model': cached['model'],
+            'template_version': prompt.key,
+            'prompt_tokens': 0,
+            'completion_tokens': 0,
+            'latency_ms': _elapsed_ms(started),
+            'cache_hit': True,
+            'tokens_saved': cached['tokens_used'],
+            'latency_saved_ms': cached['latency_ms']
+        }
+
+    @staticmethod
+    def _miss_meta(usage, latency_ms, model, prompt):
+        return {
+            'model': model,
+            'template_version': prompt.key,
+            'prompt_tokens': usage['prompt_tokens'],
+            'completion_tokens': usage['completion_tokens'],
+            'latency_ms': latency_ms,
+            'cache_hit': False,
+            'tokens_saved': 0,
+            'latency_saved_ms': 0
+        }
 
-    def process_scraped_data(self, scraped_data):
-        prompt = ChatPromptTemplate.from_template("""
-        Analyze the following scraped data and provide insights:
-        
-        Name: {name}
-        About: {about}
-        Industry: {industry}
-        Source: {source}
-        
-        Please provide:
-        1. A brief summary of the entity
-        2. Key points about their business/profile
-        3. Potential opportunities or areas of interest
-        4. Recommended follow-up actions
-        """)
-        chain = LLMChain(llm=self.llm, prompt=prompt)
-        
-        with get_openai_callback() as cb:
-            response = chain.run(
-                name=scraped_data['content'].get('name', ''),
-                about=scraped_data['content'].get('about', ''),
-                industry=scraped_data['content'].get('industry', ''),
-                source=scraped_data['content'].get('source', '')
+    def _check_budget(self, user_id, prompt, inputs, condense=None):
+        if self.usage_meter is None or user_id is None:
+            return
+        # Oversized input is condensed first, so the final prompt is at
+        # most about the context budget, but the chunk summaries cost too
+        estimate = min(estimate_tokens(prompt.format(**inputs)), self.context_budget.max_tokens)
+        estimate += self._condense_estimate(prompt, inputs, condense)
+        self.usage_meter.check(user_id, estimated_tokens=estimate)
+
+    def _condense_estimate(self, prompt, inputs, condense):
+        """Upper bound on the input tokens ``_condense`` would summarize.
+
+        Each round reads at most ``max_chunks`` chunks of ``chunk_tokens``.
+        """
+        if condense is None:
+            return 0
+        field, _ = condense
+        text = inputs.get(field) or ''
+        if not self._over_budget(prompt, inputs, field, text):
+            return 0
+        budget = self.context_budget
+        per_round = min(estimate_tokens(text), budget.max_chunks * budget.chunk_tokens)
+        return per_round * budget.max_rounds
+
+    def _over_budget(self, prompt, inputs, field, text):
+        return not self.context_budget.fits(prompt.format(**dict(inputs, **{field: text})))
+
+    def _chunk_inputs(self, text, focus):
+        chunks = self.context_budget.split(text)
+        return [
+            {'part': number, 'parts': len(chunks), 'focus': focus, 'text': chunk}
+            for number, chunk in enumerate(chunks, start=1)
+        ]
+
+    def _log_condensed(self, field, before, after, rounds):
+        logger.info(
+            f"Condensed {field} from ~{estimate_tokens(before)} to ~{estimate_tokens(after)} "
+            f"tokens in {rounds} round(s)"
+        )
+
+    def _condense(self, prompt, inputs, condense, deadline=None):
+        """Map-reduce ``inputs[field]`` while the prompt is over budget.
+
+        ``condense`` is ``(field, focus)`` or None. Returns the inputs to
+        send and the usage of the chunk summaries.
+        """
+        if condense is None:
+            return inputs, _NO_USAGE
+        field, focus = condense
+        original = text = inputs.get(field) or ''
+        summary_prompt = self.templates.get(CHUNK_SUMMARY)
+        usage = _NO_USAGE
+        rounds = 0
+        while rounds < self.context_budget.max_rounds and self._over_budget(prompt, inputs, field, text):
+            messages = self.router.batch(
+                'chunk_summary', summary_prompt, self._chunk_inputs(text, focus),
+                max_concurrency=self.context_budget.concurrency, deadline=deadline
             )
-            tokens_used = cb.total_tokens
+            text = '\n\n'.join(message.content for message in messages)
+            usage = _add_usage(usage, *(_usage(message) for message in messages))
+            rounds += 1
+        if not rounds:
+            return inputs, usage
+        self._log_condensed(field, original, text, rounds)
+        return dict(inputs, **{field: text}), usage
+
+    async def _acondense(self, prompt, inputs, condense, limiter=None):
+        """Async ``_condense``; with a ``limiter`` each chunk summary is a
+        call under its rate, concurrency and token limits.
+        """
+        if condense is None:
+            return inputs, _NO_USAGE
+        field, focus = condense
+        original = text = inputs.get(field) or ''
+        summary_prompt = self.templates.get(CHUNK_SUMMARY)
+        usage = _NO_USAGE
+        rounds = 0
+
+        async def summarize(chunk_inputs):
+            async with limiter:
+                message, _ = await self.router.ainvoke('chunk_summary', summary_prompt, chunk_inputs)
+                limiter.spend(_usage(message)['total_tokens'])
+            return message
+
+        while rounds < self.context_budget.max_rounds and self._over_budget(prompt, inputs, field, text):
+            batch = self._chunk_inputs(text, focus)
+            if limiter is None:
+                messages = await self.router.abatch(
+                    'chunk_summary', summary_prompt, batch, max_concurrency=self.context_budget.concurrency
+                )
+            else:
+                messages = await asyncio.gather(*(summarize(chunk_inputs) for chunk_inputs in batch))
+            text = '\n\n'.join(message.content for message in messages)
+            usage = _add_usage(usage, *(_usage(message) for message in messages))
+            rounds += 1
+        if not rounds:
+            return inputs, usage
+        self._log_condensed(field, original, text, rounds)
+        return dict(inputs, **{field: text}), usage
+
+    def _invoke(self, task, prompt, inputs, refresh=False, condense=None, user_id=None):
+        started = time.monotonic()
+        key = self._cache_key(task, prompt, inputs)
+        cached = self._cached(key, refresh)
+        if cached is not None:
+            return cached['response'], 0, self._hit_meta(cached, started, prompt)
 
-        return response, tokens_used
+        self._check_budget(user_id, prompt, inputs, condense)
+        deadline = self._deadline(started)
+        inputs, condense_usage = self._condense(prompt, inputs, condense, deadline)
+        message, model = self.router.invoke(task, prompt, inputs, deadline=deadline)
+        usage = _add_usage(condense_usage, _usage(message))
+        latency_ms = _elapsed_ms(started)
 
-    def process_custom_prompt(self, prompt_text, context=None):
+        if key is not None:
+            self.cache.put(key, model, message.content, usage['total_tokens'], latency_ms)
+        return message.content, usage['total_tokens'], self._miss_meta(usage, latency_ms, model, prompt)
+
+    def _stream(self, task, prompt, inputs, refresh=False, condense=None, user_id=None):
+        """Yield ``('token', text)`` as the model produces output, then one
+        ``('done', result)`` with the full ``response``, ``tokens_used``,
+        ``ttft_ms`` (time to first token) and the cache ``meta``.
+        """
+        started = time.monotonic()
+        key = self._cache_key(task, prompt, inputs)
+        cached = self._cached(key, refresh)
+        if cached is not None:
+            yield 'token', cached['response']
+            yield 'done', {
+                'response': cached['response'],
+                'tokens_used': 0,
+                'ttft_ms': _elapsed_ms(started),
+                'meta': self._hit_meta(cached, started, prompt)
+            }
+            return
+
+        self._check_budget(user_id, prompt, inputs, condense)
+        # Condensing happens before the first token, so it counts in ttft_ms
+        deadline = self._deadline(started)
+        inputs, usage = self._condense(prompt, inputs, condense, deadline)
+        parts = []
+        ttft_ms = None
+        model, chunks = self.router.stream(task, prompt, inputs, deadline=deadline)
+        for chunk in chunks:
+            if chunk.usage_metadata:
+                # Chunk usage is a delta, like the content
+                usage = _add_usage(usage, _usage(chunk))
+            if not chunk.content:
+                continue
+            if ttft_ms is None:
+                ttft_ms = _elapsed_ms(started)
+            parts.append(chunk.content)
+            yield 'token', chunk.content
+
+        response = ''.join(parts)
+        latency_ms = _elapsed_ms(started)
+        if key is not None:
+            self.cache.put(key, model, response, usage['total_tokens'], latency_ms)
+        yield 'done', {
+            'response': response,
+            'tokens_used': usage['total_tokens'],
+            'ttft_ms': ttft_ms if ttft_ms is not None else latency_ms,
+            'meta': self._miss_meta(usage, latency_ms, model, prompt)
+        }
+
+    async def _ainvoke(self, task, prompt, inputs, refresh=False, limiter=None, condense=None):
+        """Async ``_invoke``. ``limiter`` (a ``bulk_analysis.CallLimiter``) is
+        only entered for real model calls, so cache hits never wait on it or
+        count against its token budget.
+        """
+        started = time.monotonic()
+        key = self._cache_key(task, prompt, inputs)
+        cached = self._cached(key, refresh)
+        if cached is not None:
+            return cached['response'], 0, self._hit_meta(cached, started, prompt)
+
+        inputs, condense_usage = await self._acondense(prompt, inputs, condense, limiter=limiter)
+        async with limiter or contextlib.nullcontext():
+            message, model = await self.router.ainvoke(task, prompt, inputs)
+            if limiter is not None:
+                limiter.spend(_usage(message)['total_tokens'])
+        usage = _add_usage(condense_usage, _usage(message))
+        latency_ms = _elapsed_ms(started)
+
+        if key is not None:
+            self.cache.put(key, model, message.content, usage['total_tokens'], latency_ms)
+        return message.content, usage['total_tokens'], self._miss_meta(usage, latency_ms, model, prompt)
+
+    @staticmethod
+    def _scraped_data_inputs(scraped_data):
+        return {
+            'name': scraped_data['content'].get('name', ''),
+            'about': scraped_data['content'].get('about', ''),
+            'industry': scraped_data['content'].get('industry', ''),
+            'source': scraped_data['content'].get('source', '')
+        }
+
+    def process_scraped_data(self, scraped_data, refresh=False, user_id=None):
+        return self._invoke(
+            'scraped_data', self.templates.get(SCRAPED_DATA), self._scraped_data_inputs(scraped_data),
+            refresh=refresh, condense=('about', SCRAPED_DATA_FOCUS), user_id=user_id
+        )
+
+    async def aprocess_scraped_data(self, scraped_data, refresh=False, limiter=None):
+        return await self._ainvoke(
+            'scraped_data', self.templates.get(SCRAPED_DATA), self._scraped_data_inputs(scraped_data),
+            refresh=refresh, limiter=limiter, condense=('about', SCRAPED_DATA_FOCUS)
+        )
+
+    def _custom_prompt(self, prompt_text, context):
         if context:
-            prompt = ChatPromptTemplate.from_template("""
-            Context: {context}
-            
-            User Query: {prompt}
-            
-            Please provide a detailed response considering the given context.
-            """)
-            chain = LLMChain(llm=self.llm, prompt=prompt)
-            
-            with get_openai_callback() as cb:
-                response = chain.run(context=context, prompt=prompt_text)
-                tokens_used = cb.total_tokens
-        else:
-            chain = LLMChain(
-                llm=self.llm,
-                prompt=ChatPromptTemplate.from_template("{prompt}")
-            )
-            
-            with get_openai_callback() as cb:
-                response = chain.run(prompt=prompt_text)
-                tokens_used = cb.total_tokens
+            return self.templates.get(CUSTOM_CONTEXT), {'context': context, 'prompt': prompt_text}, {
+                'condense': ('context', f"relevant to this query: {prompt_text}")
+            }
+        return self.templates.get(CUSTOM_PLAIN), {'prompt': prompt_text}, {}
 
-        return response, tokens_used
+    def process_custom_prompt(self, prompt_text, context=None, refresh=False, user_id=None):
+        prompt, inputs, options = self._custom_prompt(prompt_text, context)
+        return self._invoke('custom', prompt, inputs, refresh=refresh, user_id=user_id, **options)
 
+    def stream_custom_prompt(self, prompt_text, context=None, refresh=False, user_id=None):
+        """Streaming ``process_custom_prompt``; see ``_stream`` for the events."""
+        prompt, inputs, options = self._custom_prompt(prompt_text, context)
+        return self._stream('custom', prompt, inputs, refresh=refresh, user_id=user_id, **options)
@@ -0,0 +1,94 @@
+import logging
+
+from langchain_core.prompts import ChatPromptTemplate
+
+logger = logging.getLogger(__name__)
+
+SCRAPED_DATA = 'scraped_data'
+CUSTOM_CONTEXT = 'custom_context'
+CUSTOM_PLAIN = 'custom_plain'
+# Map step for inputs too long for one prompt; the prompt they were cut
+# from is the reduce step
+CHUNK_SUMMARY = 'chunk_summary'
+
+# (name, version, template). Add a new version rather than editing a
+# shipped one: each PromptLog records the version that produced it, and
+# the cache is keyed on the rendered text.
+TEMPLATES = [
+    (SCRAPED_DATA, 1, """
+        Analyze the following scraped data and provide insights:
+
+        Name: {name}
+        About: {about}
+        Industry: {industry}
+        Source: {source}
+
+        Please provide:
+        1. A brief summary of the entity
+        2. Key points about their business/profile
+        3. Potential opportunities or areas of interest
+        4. Recommended follow-up actions
+        """),
+    (CUSTOM_CONTEXT, 1, """
+            Context: {context}
+
+            User Query: {prompt}
+
+            Please provide a detailed response considering the given context.
+            """),
+    (CUSTOM_PLAIN, 1, "{prompt}"),
+    (CHUNK_SUMMARY, 1, """
+        Below is part {part} of {parts} of a longer text. Summarize it in a few
+        sentences, keeping names, figures and facts {focus}.
+
+        {text}
+        """),
+]
+
+
+class VersionedPrompt:
+    """A parsed ``ChatPromptTemplate`` with the name and version it is
+    registered under; ``key`` identifies it in logs and chain caches.
+    """
+
+    def __init__(self, name, version, template):
+        self.name = name
+        self.version = version
+        self.key = f"{name}:v{version}"
+        self.prompt = ChatPromptTemplate.from_template(template)
+
+    def format(self, **inputs):
+        return self.prompt.format(**inputs)
+
+    def __repr__(self):
+        return f'<VersionedPrompt {self.key}>'
+
+
+class PromptTemplateRegistry:
+    """Every prompt the app sends, parsed once.
+
+    ``get`` returns the version ``pins`` names for a template, else its
+    latest. Pinning lets a new version be rolled back from config.
+    """
+
+    def __init__(self, templates=TEMPLATES, pins=None):
+        self._versions = {}
+        for name, version, template in templates:
+            self._versions.setdefault(name, {})[version] = VersionedPrompt(name, version, template)
+
+        self.pins = dict(pins or {})
+        for name, version in self.pins.items():
+            if version not in self._versions.get(name, {}):
+                raise ValueError(f"No version {version} of prompt template {name}")
+
+    def get(self, name, version=None):
+        versions = self._versions[name]
+        if version is None:
+            version = self.pins.get(name, max(versions))
+        return versions[version]
+
+    def stats(self):
+        return {
+            name: {'versions': sorted(versions), 'active': self.get(name).version}
+            for name, versions in self._versions.items()
+        }
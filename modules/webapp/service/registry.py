@@ -0,0 +1,219 @@
+import atexit
+import logging
+import os
+import threading
+
+from flask import current_app
+
+logger = logging.getLogger(__name__)
+
+
+class ServiceRegistry:
+    """Per-process container for expensive service clients.
+
+    Factories are registered up front and only called the first time a
+    service is requested, so importing the views or forking a preloaded
+    gunicorn master never starts a browser or an LLM client. Instances are
+    keyed to the creating process id; a forked child that inherits the
+    registry builds its own fresh instances instead of sharing the parent's.
+    """
+
+    def __init__(self):
+        self._factories = {}
+        self._instances = {}
+        self._lock = threading.RLock()
+        self._pid = os.getpid()
+
+    def register(self, name, factory):
+        with self._lock:
+            self._factories[name] = factory
+
+    def _check_pid(self):
+        if self._pid != os.getpid():
+            # Inherited from a parent process; those clients are not ours
+            # to use or to shut down.
+            self._instances = {}
+            self._lock = threading.RLock()
+            self._pid = os.getpid()
+
+    def get(self, name):
+        self._check_pid()
+        # Membership rather than truthiness: a factory may return None for
+        # a service that is switched off
+        if name in self._instances:
+            return self._instances[name]
+
+        with self._lock:
+            if name not in self._instances:
+                if name not in self._factories:
+                    raise KeyError(f'Unknown service: {name}')
+                logger.info(f"Starting service: {name}")
+                self._instances[name] = self._factories[name]()
+            return self._instances[name]
+
+    def is_started(self, name):
+        self._check_pid()
+        return name in self._instances
+
+    def shutdown(self):
+        self._check_pid()
+        with self._lock:
+            instances = list(self._instances.items())
+            self._instances = {}
+
+        for name, instance in reversed(instances):
+            close = getattr(instance, 'close', None)
+            if close is None:
+                continue
+            try:
+                close()
+                logger.info(f"Stopped service: {name}")
+            except Exception as e:
+                logger.error(f"Error stopping service {name}: {str(e)}")
+
+
+def init_services(app):
+    """Register the app's service factories and attach the registry."""
+    from .scraper import WebScraper
+    from .prompt_handler import PromptHandler
+    from .scrape_cache import ScrapeCache
+    from .jobs import JobQueue
+    from .tasks import register_tasks
+    from .snapshots import SnapshotStore
+    from .llm_cache import LLMResponseCache
+    from .context_budget import ContextBudget
+    from .usage import UsageMeter
+    from .llm_client import CircuitBreaker, LLMClient, build_chat_model
+    from .model_router import ModelRouter, ModelTier
+    from .prompt_templates import PromptTemplateRegistry
+
+    registry = ServiceRegistry()
+    registry.register('scraper', lambda: WebScraper(
+        pool_size=app.config['SCRAPER_DRIVER_POOL_SIZE'],
+        max_pages_per_driver=app.config['SCRAPER_DRIVER_MAX_PAGES'],
+        snapshot_store=registry.get('snapshots')
+    ))
+    registry.register('snapshots', lambda: (
+        SnapshotStore(app.config['SNAPSHOT_DIR']) if app.config['SNAPSHOTS_ENABLED'] else None
+    ))
+    def build_llm_client(model):
+        return LLMClient(
+            build_chat_model(
+                app.config['LLM_BACKEND'],
+                model=model,
+                api_key=app.config['GEMINI_API_KEY'],
+                fake_latency=app.config['LLM_FAKE_LATENCY'],
+                fake_failure_rate=app.config['LLM_FAKE_FAILURE_RATE']
+            ),
+            timeout=app.config['LLM_TIMEOUT'],
+            deadline=app.config['LLM_DEADLINE'],
+            max_attempts=app.config['LLM_MAX_ATTEMPTS'],
+            backoff_base=app.config['LLM_BACKOFF_BASE'],
+            backoff_max=app.config['LLM_BACKOFF_MAX'],
+            breaker=CircuitBreaker(
+                failure_threshold=app.config['LLM_BREAKER_THRESHOLD'],
+                reset_timeout=app.config['LLM_BREAKER_RESET']
+            )
+        )
+
+    registry.register('llm_router', lambda: ModelRouter(
+        [
+            ModelTier(
+                'fast', build_llm_client(app.config['LLM_FAST_MODEL']),
+                latency_target_ms=app.config['LLM_FAST_LATENCY_TARGET_MS'], fallback='strong'
+            ),
+            ModelTier(
+                'strong', build_llm_client(app.config['LLM_STRONG_MODEL']),
+                latency_target_ms=app.config['LLM_STRONG_LATENCY_TARGET_MS'], fallback='fast'
+            )
+        ],
+        default_tier='strong',
+        small_tier='fast',
+        small_prompt_tokens=app.config['LLM_SMALL_PROMPT_TOKENS'],
+        task_tiers=app.config['LLM_TASK_TIERS'],
+        cooldown=app.config['LLM_SLOW_COOLDOWN']
+    ))
+    registry.register('prompt_handler', lambda: PromptHandler(
+        router=registry.get('llm_router'),
+        templates=PromptTemplateRegistry(pins=app.config['LLM_PROMPT_VERSIONS']),
+        cache=registry.get('llm_cache'),
+        context_budget=ContextBudget(
+            max_tokens=app.config['LLM_CONTEXT_MAX_TOKENS'],
+            chunk_tokens=app.config['LLM_CHUNK_TOKENS'],
+            chunk_overlap=app.config['LLM_CHUNK_OVERLAP'],
+            max_chunks=app.config['LLM_MAX_CHUNKS'],
+            concurrency=app.config['LLM_CHUNK_CONCURRENCY']
+        ),
+        usage_meter=registry.get('usage_meter'),
+        request_deadline=app.config['LLM_REQUEST_DEADLINE']
+    ))
+    registry.register('usage_meter', lambda: UsageMeter(
+        default_daily_budget=app.config['LLM_DAILY_TOKEN_BUDGET']
+    ))
+    registry.register('llm_cache', lambda: LLMResponseCache(
+        ttl=app.config['LLM_CACHE_TTL'],
+        max_entries=app.config['LLM_CACHE_MAX_ENTRIES'],
+        memory_entries=app.config['LLM_CACHE_MEMORY_ENTRIES'],
+        memory_ttl=app.config['LLM_CACHE_MEMORY_TTL']
+    ) if app.config['LLM_CACHE_ENABLED'] else None)
+    registry.register('scrape_cache', lambda: ScrapeCache(
+        ttl=app.config['SCRAPE_CACHE_TTL'],
+        max_entries=app.config['SCRAPE_CACHE_MAX_ENTRIES']
+    ))
+
+    def build_job_queue():
+        queue = JobQueue(
+            app,
+            workers=app.config['JOBS_WORKERS'],
+            poll_interval=app.config['JOBS_POLL_INTERVAL'],
+            max_attempts=app.config['JOBS_MAX_ATTEMPTS'],
+            retry_delay=app.config['JOBS_RETRY_DELAY'],
+            lease_timeout=app.config['JOBS_LEASE_TIMEOUT']
+        )
+        register_tasks(queue)
+        queue.start()
+        return queue
+
+    registry.register('job_queue', build_job_queue)
+
+    @app.before_request
+    def start_job_workers():
+        # Workers start in the serving process, after any gunicorn fork, and
+        # pick up jobs queued before a restart.
+        registry.get('job_queue')
+
+    app.extensions['services'] = registry
+    atexit.register(registry.shutdown)
+    return registry
+
+
+def get_service(name):
+    return current_app.extensions['services'].get(name)
+
+
+def get_scraper():
+    return get_service('scraper')
+
+
+def get_prompt_handler():
+    return get_service('prompt_handler')
+
+
+def get_scrape_cache():
+    return get_service('scrape_cache')
+
+
+def get_job_queue():
+    return get_service('job_queue')
+
+
+def get_llm_router():
+    return get_service('llm_router')
+
+
+def get_usage_meter():
+    return get_service('usage_meter')
+
+
+def get_snapshot_store():
+    return get_service('snapshots')
@@ -0,0 +1,80 @@
+import threading
+from urllib.parse import urlparse
+
+from cachetools import LRUCache, TTLCache
+
+
+def domain_of(url):
+    return urlparse(url).netloc.lower()
+
+
+class RenderDecisionCache:
+    """Remember, per domain, whether pages needed a browser render.
+
+    Decisions expire after ``ttl`` seconds so a site that moves to or away
+    from client-side rendering is re-evaluated. Counters per domain show how
+    many static fetches and browser launches the cache saved.
+    """
+
+    def __init__(self, ttl=86400, max_domains=10000):
+        self._decisions = TTLCache(maxsize=max_domains, ttl=ttl)
+        self._stats = LRUCache(maxsize=max_domains)
+        self._lock = threading.Lock()
+
+    def _counters(self, domain):
+        counters = self._stats.get(domain)
+        if counters is None:
+            counters = {
+                'hits': 0,
+                'misses': 0,
+                'renders': 0,
+                'static_fetches_skipped': 0,
+                'renders_skipped': 0
+            }
+            self._stats[domain] = counters
+        return counters
+
+    def lookup(self, url):
+        """Return True (render), False (static) or None when unknown."""
+        domain = domain_of(url)
+        with self._lock:
+            decision = self._decisions.get(domain)
+            counters = self._counters(domain)
+            if decision is None:
+                counters['misses'] += 1
+            else:
+                counters['hits'] += 1
+                if decision:
+                    counters['static_fetches_skipped'] += 1
+            return decision
+
+    def record(self, url, needs_js, heuristic_needs_js=False):
+        domain = domain_of(url)
+        with self._lock:
+            self._decisions[domain] = needs_js
+            counters = self._counters(domain)
+            if needs_js:
+                counters['renders'] += 1
+            elif heuristic_needs_js:
+                # The markup looked JS-heavy but the static fields were usable
+                counters['renders_skipped'] += 1
+
+    def record_static_hit(self, url, heuristic_needs_js):
+        """Count a known-static page that would otherwise have been rendered."""
+        if not heuristic_needs_js:
+            return
+        with self._lock:
+            self._counters(domain_of(url))['renders_skipped'] += 1
+
+    def record_render(self, url):
+        with self._lock:
+            self._counters(domain_of(url))['renders'] += 1
+
+    def stats(self):
+        with self._lock:
+            domains = {}
+            for domain, counters in self._stats.items():
+                entry = dict(counters)
+                entry['needs_js'] = self._decisions.get(domain)
+                domains[domain] = entry
+        return domains
@@ -0,0 +1,128 @@
+import logging
+import time
+
+from selenium.webdriver.chrome.options import Options
+
+logger = logging.getLogger(__name__)
+
+IMAGE_PATTERNS = ['*.png', '*.jpg', '*.jpeg', '*.gif', '*.webp', '*.svg', '*.ico', '*.avif']
+MEDIA_PATTERNS = ['*.mp4', '*.webm', '*.mp3', '*.ogg', '*.wav', '*.m3u8']
+FONT_PATTERNS = ['*.woff', '*.woff2', '*.ttf', '*.otf', '*.eot']
+STYLESHEET_PATTERNS = ['*.css']
+TRACKER_PATTERNS = [
+    '*google-analytics.com*',
+    '*googletagmanager.com*',
+    '*doubleclick.net*',
+    '*googlesyndication.com*',
+    '*connect.facebook.net*',
+    '*hotjar.com*',
+    '*segment.com*',
+    '*segment.io*',
+    '*mixpanel.com*',
+    '*fullstory.com*',
+    '*intercom.io*',
+    '*hubspot.com*',
+    '*optimizely.com*',
+    '*newrelic.com*',
+    '*nr-data.net*'
+]
+
+# Records the time of the last DOM mutation and reports how long the page
+# has been quiet. Installed lazily so it survives being called repeatedly.
+_QUIET_PROBE = """
+if (!window.__scraperObserver && document.documentElement) {
+    window.__scraperLastMutation = performance.now();
+    window.__scraperObserver = new MutationObserver(function () {
+        window.__scraperLastMutation = performance.now();
+    });
+    window.__scraperObserver.observe(document.documentElement, {
+        childList: true, subtree: true, attributes: true, characterData: true
+    });
+}
+return [
+    document.readyState,
+    !!document.body,
+    window.__scraperObserver ? performance.now() - window.__scraperLastMutation : 0
+];
+"""
+
+
+class RenderProfile:
+    """How the pooled Chrome drivers load pages.
+
+    We only read text out of ``page_source``, so by default pages load with
+    the ``eager`` strategy (return at DOMContentLoaded), images, media,
+    fonts, stylesheets and common third-party trackers are blocked, and
+    ``wait_until_settled`` returns once the DOM has stopped changing for
+    ``quiet_ms`` instead of waiting a fixed time for ``body``.
+    """
+
+    def __init__(self, page_load_strategy='eager', block_resources=True, block_trackers=True,
+                 extra_blocked_patterns=None, quiet_ms=500, max_wait=10, poll_interval=0.1,
+                 page_load_timeout=30):
+        self.page_load_strategy = page_load_strategy
+        self.block_resources = block_resources
+        self.block_trackers = block_trackers
+        self.extra_blocked_patterns = list(extra_blocked_patterns or [])
+        self.quiet_ms = quiet_ms
+        self.max_wait = max_wait
+        self.poll_interval = poll_interval
+        self.page_load_timeout = page_load_timeout
+
+    def blocked_patterns(self):
+        patterns = []
+        if self.block_resources:
+            patterns += IMAGE_PATTERNS + MEDIA_PATTERNS + FONT_PATTERNS + STYLESHEET_PATTERNS
+        if self.block_trackers:
+            patterns += TRACKER_PATTERNS
+        return patterns + self.extra_blocked_patterns
+
+    def chrome_options(self):
+        chrome_options = Options()
+        chrome_options.add_argument('--headless')
+        chrome_options.add_argument('--no-sandbox')
+        chrome_options.add_argument('--disable-dev-shm-usage')
+        chrome_options.add_argument('--disable-extensions')
+        chrome_options.add_argument('--disable-background-networking')
+        chrome_options.add_argument('--mute-audio')
+        chrome_options.page_load_strategy = self.page_load_strategy
+
+        if self.block_resources:
+            chrome_options.add_argument('--blink-settings=imagesEnabled=false')
+            chrome_options.add_argument('--autoplay-policy=user-gesture-required')
+            chrome_options.add_experimental_option('prefs', {
+                'profile.managed_default_content_settings.images': 2,
+                'profile.managed_default_content_settings.media_stream': 2,
+                'profile.managed_default_content_settings.plugins': 2
+            })
+        return chrome_options
+
+    def apply(self, driver):
+        """Configure a freshly started driver."""
+        driver.set_page_load_timeout(self.page_load_timeout)
+        patterns = self.blocked_patterns()
+        if not patterns:
+            return
+        try:
+            driver.execute_cdp_cmd('Network.enable', {})
+            driver.execute_cdp_cmd('Network.setBlockedURLs', {'urls': patterns})
+        except Exception as e:
+            # Blocking is an optimisation; a driver without CDP still renders
+            logger.warning(f"Could not install request blocklist: {str(e)}")
+
+    def wait_until_settled(self, driver):
+        """Block until the DOM has been quiet for ``quiet_ms`` or ``max_wait`` passes."""
+        deadline = time.monotonic() + self.max_wait
+        while True:
+            try:
+                ready_state, has_body, quiet_for = driver.execute_script(_QUIET_PROBE)
+            except Exception:
+                # The page navigated away mid-probe; try again on the new document
+                ready_state, has_body, quiet_for = 'loading', False, 0
+
+            if has_body and ready_state != 'loading' and quiet_for >= self.quiet_ms:
+                return True
+            if time.monotonic() >= deadline:
+                logger.info(f"Page still changing after {self.max_wait}s; reading it anyway")
+                return False
+            time.sleep(self.poll_interval)
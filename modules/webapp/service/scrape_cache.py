@@ -0,0 +1,171 @@
+import hashlib
+import logging
+import threading
+from datetime import datetime, timedelta
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
+from cachetools import TTLCache
+
+from ..models.models import db, ScrapeCacheEntry
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_PORTS = {'http': 80, 'https': 443}
+TRACKING_PARAMS = ('utm_', 'fbclid', 'gclid', 'mc_cid', 'mc_eid')
+
+
+def normalize_url(url):
+    """Canonical form used as the cache key.
+
+    Lowercases scheme and host, drops default ports, fragments and tracking
+    parameters, sorts the query string and trims a trailing slash.
+    """
+    parts = urlsplit(url.strip())
+    scheme = parts.scheme.lower()
+    host = (parts.hostname or '').lower()
+    if parts.port and parts.port != DEFAULT_PORTS.get(scheme):
+        host = f'{host}:{parts.port}'
+
+    path = parts.path or '/'
+    if len(path) > 1:
+        path = path.rstrip('/')
+
+    query = sorted(
+        (key, value) for key, value in parse_qsl(parts.query, keep_blank_values=True)
+        if not key.lower().startswith(TRACKING_PARAMS)
+    )
+    return urlunsplit((scheme, host, path, urlencode(query), ''))
+
+
+def url_key(url):
+    return hashlib.sha256(normalize_url(url).encode('utf-8')).hexdigest()
+
+
+class ScrapeCache:
+    """Scrape results keyed by normalized URL.
+
+    A bounded in-process TTL cache sits in front of the ``scrape_cache``
+    table. Fresh entries are served without any network I/O. Stale entries
+    still carry the content hash of the page they were extracted from; if
+    the re-fetched page hashes the same, the stored extraction and analysis
+    are reused instead of re-extracting and re-calling the LLM.
+
+    Writes are added to the current session; the caller commits.
+    """
+
+    def __init__(self, ttl=3600, max_entries=1024):
+        self.ttl = ttl
+        self._memory = TTLCache(maxsize=max_entries, ttl=ttl)
+        self._lock = threading.Lock()
+
+    def _entry(self, row):
+        return {
+            'normalized_url': row.normalized_url,
+            'content_hash': row.content_hash,
+            'content': row.content,
+            'metadata': row.page_metadata,
+            'analysis': row.analysis,
+            'analysis_tokens': row.analysis_tokens,
+            'fetched_at': row.fetched_at
+        }
+
+    def _is_fresh(self, entry):
+        fetched_at = entry['fetched_at']
+        return fetched_at is not None and datetime.utcnow() - fetched_at < timedelta(seconds=self.ttl)
+
+    def _remember(self, key, entry):
+        with self._lock:
+            self._memory[key] = entry
+
+    def lookup(self, url):
+        """Return the cached entry for ``url`` (fresh or stale), or None."""
+        key = url_key(url)
+        with self._lock:
+            entry = self._memory.get(key)
+        if entry is not None:
+            return entry
+
+        row = db.session.get(ScrapeCacheEntry, key)
+        if row is None:
+            return None
+        entry = self._entry(row)
+        if self._is_fresh(entry):
+            self._remember(key, entry)
+        return entry
+
+    def fetch(self, url, scraper, refresh=False):
+        """Scrape ``url`` through the cache.
+
+        The result has the scraper's shape plus ``cache`` (``hit``,
+        ``unchanged`` or ``miss``) and any stored ``analysis``. ``refresh``
+        bypasses the cache entirely.
+        """
+        entry = None if refresh else self.lookup(url)
+
+        if entry is not None and self._is_fresh(entry):
+            return self._cached_result(entry, 'hit')
+
+        known_hash = entry['content_hash'] if entry is not None else None
+        result = scraper.scrape_url(url, known_hash=known_hash)
+
+        if result['status'] == 'unchanged':
+            entry = self._touch(url)
+            return self._cached_result(entry, 'unchanged')
+
+        if result['status'] == 'success':
+            self.store(url, result)
+            result['cache'] = 'miss'
+            result['analysis'] = None
+            result['analysis_tokens'] = None
+        return result
+
+    def _cached_result(self, entry, cache_status):
+        return {
+            'status': 'success',
+            'content': entry['content'],
+            'metadata': entry['metadata'],
+            'content_hash': entry['content_hash'],
+            'analysis': entry['analysis'],
+            'analysis_tokens': entry['analysis_tokens'],
+            'cache': cache_status
+        }
+
+    def _row(self, url):
+        key = url_key(url)
+        row = db.session.get(ScrapeCacheEntry, key)
+        if row is None:
+            row = ScrapeCacheEntry(url_key=key, normalized_url=normalize_url(url))
+            db.session.add(row)
+        return key, row
+
+    def _touch(self, url):
+        key, row = self._row(url)
+        row.fetched_at = datetime.utcnow()
+        entry = self._entry(row)
+        self._remember(key, entry)
+        return entry
+
+    def store(self, url, result):
+        """Record a fresh extraction; any analysis of older content is dropped."""
+        key, row = self._row(url)
+        row.content_hash = result.get('content_hash')
+        row.content = result['content']
+        row.page_metadata = result['metadata']
+        row.analysis = None
+        row.analysis_tokens = None
+        row.fetched_at = datetime.utcnow()
+        self._remember(key, self._entry(row))
+
+    def store_analysis(self, url, analysis, tokens):
+        key, row = self._row(url)
+        row.analysis = analysis
+        row.analysis_tokens = tokens
+        self._remember(key, self._entry(row))
+
+    def invalidate(self, url):
+        key = url_key(url)
+        with self._lock:
+            self._memory.pop(key, None)
+        row = db.session.get(ScrapeCacheEntry, key)
+        if row is not None:
+            db.session.delete(row)
@@ -1,182 +1,184 @@
-from bs4 import BeautifulSoup
-import requests
-from selenium import webdriver
-from selenium.webdriver.chrome.options import Options
-from selenium.webdriver.common.by import By
-from selenium.webdriver.support.ui import WebDriverWait
-from selenium.webdriver.support import expected_conditions as EC
-from urllib.parse import urlparse
+import hashlib
+import logging
+from config.config import Config
+from .driver_pool import DriverPool
+from .extraction_rules import RuleRegistry
+from .http_client import FetchError, HttpClient
+from .parse_pool import ParsePool
+from .render_cache import RenderDecisionCache
+from .render_profile import RenderProfile
+
+logger = logging.getLogger(__name__)
+
+
+def content_hash(html):
+    return hashlib.sha256(html.encode('utf-8', 'replace')).hexdigest()
+
 
 class WebScraper:
-    def __init__(self):
-        chrome_options = Options()
-        chrome_options.add_argument('--headless')
-        chrome_options.add_argument('--no-sandbox')
-        chrome_options.add_argument('--disable-dev-shm-usage')
-        self.driver = webdriver.Chrome(options=chrome_options)
-
-    def scrape_url(self, url):
+    def __init__(self, pool_size=None, max_pages_per_driver=None, render_profile=None,
+                 snapshot_store=None):
+        self.snapshot_store = snapshot_store
+        self.render_profile = render_profile or RenderProfile(
+            page_load_strategy=Config.SCRAPER_RENDER_PAGE_LOAD_STRATEGY,
+            block_resources=Config.SCRAPER_RENDER_BLOCK_RESOURCES,
+            block_trackers=Config.SCRAPER_RENDER_BLOCK_TRACKERS,
+            extra_blocked_patterns=Config.SCRAPER_RENDER_BLOCKLIST,
+            quiet_ms=Config.SCRAPER_RENDER_QUIET_MS,
+            max_wait=Config.SCRAPER_RENDER_MAX_WAIT
+        )
+        self.driver_pool = DriverPool(
+            size=pool_size or Config.SCRAPER_DRIVER_POOL_SIZE,
+            max_pages=max_pages_per_driver or Config.SCRAPER_DRIVER_MAX_PAGES,
+            lease_timeout=Config.SCRAPER_DRIVER_LEASE_TIMEOUT,
+            profile=self.render_profile
+        )
+        self.http = HttpClient(
+            max_connections=Config.SCRAPER_HTTP_MAX_CONNECTIONS,
+            per_host=Config.SCRAPER_HTTP_PER_HOST,
+            connect_timeout=Config.SCRAPER_CONNECT_TIMEOUT,
+            read_timeout=Config.SCRAPER_READ_TIMEOUT,
+            http2=Config.SCRAPER_HTTP2,
+            max_bytes=Config.SCRAPER_MAX_BYTES
+        )
+        self.extraction_rules = RuleRegistry(
+            Config.SCRAPER_EXTRACTION_RULES,
+            check_interval=Config.SCRAPER_EXTRACTION_RULES_CHECK_INTERVAL
+        )
+        self.parse_pool = ParsePool(
+            workers=Config.SCRAPER_PARSE_WORKERS,
+            parser=Config.SCRAPER_HTML_PARSER,
+            max_tasks_per_child=Config.SCRAPER_PARSE_MAX_TASKS_PER_CHILD,
+            timeout=Config.SCRAPER_PARSE_TIMEOUT,
+            rules=self.extraction_rules
+        )
+        self.render_cache = RenderDecisionCache(ttl=Config.SCRAPER_RENDER_CACHE_TTL)
+
+    def scrape_url(self, url, known_hash=None, collect_links=False):
+        """Fetch and extract ``url``.
+
+        When the fetched page hashes to ``known_hash`` extraction is skipped
+        and ``{'status': 'unchanged'}`` is returned, so callers holding an
+        earlier result can reuse it. ``collect_links`` adds the page's
+        ``(href, anchor_text)`` pairs to the result as ``links``.
+        """
         try:
+            decision = self.render_cache.lookup(url)
+            if decision:
+                # Known JS-heavy domain: skip the static fetch entirely
+                return self.render_url(url, known_hash=known_hash, collect_links=collect_links)
+
             # Initial request to check if JS rendering is needed
-            response = requests.get(url, timeout=10)
-            soup = BeautifulSoup(response.text, 'html.parser')
-            
-            # Check if content needs JS rendering
-            if self._needs_js_rendering(soup):
-                content = self._scrape_with_selenium(url)
-            else:
-                content = self._scrape_with_requests(soup)
-                
-            # print("Inside scrape_url:", content)
+            html, final_url = self.http.fetch_html(url)
+            return self.scrape_html(
+                html, url, decision=decision, known_hash=known_hash, collect_links=collect_links,
+                final_url=final_url
+            )
 
+        except FetchError as e:
             return {
-                'status': 'success',
-                'content': content,
-                'metadata': self._get_metadata(soup)
+                'status': 'error',
+                'error': str(e),
+                'error_code': e.code
             }
-
         except Exception as e:
             return {
                 'status': 'error',
                 'error': str(e)
             }
 
-    def _needs_js_rendering(self, soup):
-        # Check for signs that JS rendering might be needed
-        return (
-            len(soup.find_all('script', {'src': True})) > 5 or
-            'react' in str(soup).lower() or
-            'angular' in str(soup).lower() or
-            'vue' in str(soup).lower()
-        )
+    def scrape_html(self, html, url, decision=None, known_hash=None, collect_links=False,
+                    final_url=None):
+        """Extract a page we already fetched, rendering it first if needed.
+
+        ``decision`` is the cached render decision for the domain, if the
+        caller looked it up; None re-evaluates the page from scratch.
+        ``final_url`` is where the fetch of ``url`` ended up after
+        redirects; the result carries it, since relative links on the page
+        are relative to it.
+        """
+        final_url = final_url or url
+        page_hash = content_hash(html)
+        if known_hash and page_hash == known_hash:
+            return {'status': 'unchanged', 'content_hash': page_hash}
+
+        document = self.parse_pool.extract(html, final_url, collect_links=collect_links)
+        heuristic_needs_js = document['needs_js']
+
+        if decision is False:
+            # Known static domain: never launch the browser
+            self.render_cache.record_static_hit(url, heuristic_needs_js)
+        elif heuristic_needs_js and not self._is_usable(document['content']):
+            self.render_cache.record(url, True)
+            return self.render_url(url, count=False, collect_links=collect_links)
+        else:
+            self.render_cache.record(url, False, heuristic_needs_js=heuristic_needs_js)
 
-    def _scrape_with_selenium(self, url):
-        self.driver.get(url)
-        WebDriverWait(self.driver, 10).until(
-            EC.presence_of_element_located((By.TAG_NAME, "body"))
-        )
-        
-        return self._extract_content(BeautifulSoup(self.driver.page_source, 'html.parser'))
-
-    def _scrape_with_requests(self, soup):
-        return self._extract_content(soup)
-
-    def _extract_content(self, soup):
-        content = {
-            'title': self._get_title(soup),
-            'description': self._get_description(soup),
-            'name': self._extract_name(soup),
-            'about': self._extract_about(soup),
-            'source': self._determine_source(soup),
-            'industry': self._extract_industry(soup),
-            'contact_info': self._extract_contact_info(soup),
-            'email': self._extract_email(soup),
-            'page_type': self._determine_page_type(soup)
+        self._snapshot(page_hash, html)
+        return self._result(document, page_hash, final_url)
+
+    def render_url(self, url, count=True, known_hash=None, collect_links=False):
+        """Render a page in the browser and extract it."""
+        if count:
+            self.render_cache.record_render(url)
+        page_source, final_url = self._scrape_with_selenium(url)
+
+        page_hash = content_hash(page_source)
+        if known_hash and page_hash == known_hash:
+            return {'status': 'unchanged', 'content_hash': page_hash}
+
+        document = self.parse_pool.extract(page_source, final_url, collect_links=collect_links)
+        self._snapshot(page_hash, page_source)
+        return self._result(document, page_hash, final_url)
+
+    def _snapshot(self, page_hash, html):
+        if self.snapshot_store is None:
+            return
+        try:
+            self.snapshot_store.put(page_hash, html)
+        except OSError as e:
+            # Losing a snapshot only costs a future offline re-extraction
+            logger.warning(f"Could not store snapshot {page_hash}: {str(e)}")
+
+    def _result(self, document, page_hash, final_url):
+        result = {
+            'status': 'success',
+            'content': document['content'],
+            'metadata': document['metadata'],
+            'content_hash': page_hash,
+            'final_url': final_url
         }
-        return content
+        if 'links' in document:
+            result['links'] = document['links']
+        return result
 
-    def _get_metadata(self, soup):
+    def _is_usable(self, content):
+        # A static extraction that found the entity is good enough
+        return bool(content.get('name') or content.get('about'))
+
+    def _scrape_with_selenium(self, url):
+        # Each caller leases its own browser so concurrent renders never
+        # share a tab
+        with self.driver_pool.lease() as driver:
+            driver.get(url)
+            self.render_profile.wait_until_settled(driver)
+            final_url = driver.current_url
+            page_source = driver.page_source
+
+        return page_source, final_url
+
+    def stats(self):
         return {
-            'meta_title': soup.title.string if soup.title else None,
-            'meta_description': soup.find('meta', {'name': 'description'})['content'] if soup.find('meta', {'name': 'description'}) else None,
-            'og_data': {
-                tag['property'][3:]: tag['content']
-                for tag in soup.find_all('meta', property=True)
-                if tag['property'].startswith('og:')
-            }
+            'render_decisions': self.render_cache.stats(),
+            'driver_pool': self.driver_pool.stats(),
+            'extraction_rules': self.extraction_rules.stats()
         }
 
-    # Helper methods for content extraction
-    def _get_title(self, soup):
-        return soup.title.string if soup.title else None
-
-    def _get_description(self, soup):
-        meta_desc = soup.find('meta', {'name': 'description'})
-        return meta_desc['content'] if meta_desc else None
-
-    def _extract_name(self, soup):
-        # Try common selectors for names
-        selectors = [
-            'h1', 
-            '.profile-name',
-            '.name',
-            '[itemprop="name"]'
-        ]
-        for selector in selectors:
-            element = soup.select_one(selector)
-            if element:
-                return element.text.strip()
-        return None
-
-    def _extract_about(self, soup):
-        # Try common selectors for about sections
-        selectors = [
-            '.about',
-            '#about',
-            '[itemprop="description"]',
-            '.bio',
-            '.description'
-        ]
-        for selector in selectors:
-            element = soup.select_one(selector)
-            if element:
-                return element.text.strip()
-        return None
-
-    def _determine_source(self, soup):
-        domain = urlparse(self.driver.current_url).netloc
-        if 'linkedin' in domain:
-            return 'LinkedIn'
-        elif 'facebook' in domain:
-            return 'Facebook'
-        elif 'twitter' in domain:
-            return 'Twitter'
-        else:
-            return 'Website'
-
-    def _extract_industry(self, soup):
-        # Try common selectors for industry information
-        selectors = [
-            '.industry',
-            '[itemprop="industry"]',
-            '.business-category'
-        ]
-        for selector in selectors:
-            element = soup.select_one(selector)
-            if element:
-                return element.text.strip()
-        return None
-
-    def _extract_contact_info(self, soup):
-        contact_info = {}
-        phone_elements = soup.find_all(text=lambda text: text and any(
-            char.isdigit() for char in text
-        ))
-        if phone_elements:
-            contact_info['phone'] = phone_elements[0].strip()
-        
-        address_element = soup.find('address')
-        if address_element:
-            contact_info['address'] = address_element.text.strip()
-            
-        return contact_info
-
-    def _extract_email(self, soup):
-        email_elements = soup.select('a[href^="mailto:"]')
-        if email_elements:
-            return email_elements[0]['href'].replace('mailto:', '')
-        return None
-
-    def _determine_page_type(self, soup):
-        if soup.find('article'):
-            return 'Article'
-        elif soup.find(['form', 'input']):
-            return 'Form/Contact'
-        elif soup.find('table'):
-            return 'Data'
-        else:
-            return 'General'
+    def close(self):
+        self.http.close()
+        self.parse_pool.close()
+        self.driver_pool.close()
 
     def __del__(self):
-        if hasattr(self, 'driver'):
-            self.driver.quit()
+        if hasattr(self, 'driver_pool'):
+            self.close()
@@ -0,0 +1,53 @@
+import gzip
+import logging
+import os
+import tempfile
+
+logger = logging.getLogger(__name__)
+
+
+class SnapshotStore:
+    """Raw page HTML on local disk, gzip-compressed and content-addressed.
+
+    Snapshots are named by the sha256 of their HTML (the scraper's
+    ``content_hash``) and fanned out into two levels of directories, so an
+    unchanged page is stored once however many times it is scraped.
+    """
+
+    def __init__(self, root, compresslevel=6):
+        self.root = root
+        self.compresslevel = compresslevel
+
+    def _path(self, digest):
+        return os.path.join(self.root, digest[:2], digest[2:4], f'{digest}.html.gz')
+
+    def exists(self, digest):
+        return os.path.exists(self._path(digest))
+
+    def put(self, digest, html):
+        path = self._path(digest)
+        if os.path.exists(path):
+            return digest
+
+        directory = os.path.dirname(path)
+        os.makedirs(directory, exist_ok=True)
+        # Write then rename so readers never see a partial snapshot
+        fd, tmp_path = tempfile.mkstemp(dir=directory, suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as raw, gzip.GzipFile(
+                fileobj=raw, mode='wb', compresslevel=self.compresslevel, mtime=0
+            ) as compressed:
+                compressed.write(html.encode('utf-8', 'replace'))
+            os.replace(tmp_path, path)
+        except Exception:
+            os.unlink(tmp_path)
+            raise
+        return digest
+
+    def get(self, digest):
+        """Return the stored HTML, or None if there is no such snapshot."""
+        try:
+            with gzip.open(self._path(digest), 'rb') as compressed:
+                return compressed.read().decode('utf-8')
+        except FileNotFoundError:
+            return None
@@ -0,0 +1,170 @@
+from flask import current_app
+
+from ..models.models import db, ScrapedData, PromptLog
+from .bulk_analysis import BulkAnalyzer, scraped_data_query
+from .crawler import Crawler
+from .jobs import JobError, PermanentJobError, checkpoint
+from .registry import get_scraper, get_prompt_handler, get_scrape_cache, get_usage_meter
+from .usage import DailyBudgetExceeded
+
+
+def scrape_and_analyze(job):
+    """Scrape a URL, analyze it, and save both for the job's user.
+
+    Each step is checkpointed, so a retry after a failed analysis does not
+    fetch the page again.
+    """
+    url = job.payload['url']
+    user_id = job.created_by_user_id
+    steps = job.result or {}
+    scrape_cache = get_scrape_cache()
+
+    scraped = steps.get('scrape')
+    if scraped is None:
+        result = scrape_cache.fetch(url, get_scraper(), refresh=job.payload.get('refresh', False))
+        if result['status'] == 'error':
+            db.session.rollback()
+            if result.get('error_code'):
+                # Refused from its headers or size; it will be refused again
+                raise PermanentJobError(result['error'])
+            raise JobError(result['error'])
+
+        scraped = {
+            'content': result['content'],
+            'metadata': result['metadata'],
+            'content_hash': result.get('content_hash'),
+            'analysis': result.get('analysis'),
+            'cache': result.get('cache')
+        }
+        checkpoint(job, scrape=scraped)
+
+    analyzed = steps.get('analysis')
+    if analyzed is None:
+        if scraped['analysis'] is None:
+            try:
+                analysis, tokens, meta = get_prompt_handler().process_scraped_data(scraped, user_id=user_id)
+            except DailyBudgetExceeded as e:
+                # The scrape is checkpointed; retry the analysis once the budget resets
+                raise JobError(f'{e}; retrying after {e.resets_at.isoformat()}Z', retry_at=e.resets_at)
+            scrape_cache.store_analysis(url, analysis, tokens or meta['tokens_saved'])
+            analyzed = {'output': analysis, 'tokens': tokens, 'reused': False, 'meta': meta}
+        else:
+            # Same content as last time, so the stored analysis still holds
+            analyzed = {'output': scraped['analysis'], 'tokens': 0, 'reused': True, 'meta': {}}
+        checkpoint(job, analysis=analyzed)
+
+    # Save to database, updating this user's earlier scrape of the URL
+    scraped_data = ScrapedData.query.filter_by(url=url, created_by_user_id=user_id).first()
+    is_new = scraped_data is None
+    if is_new:
+        scraped_data = ScrapedData(url=url, created_by_user_id=user_id)
+        db.session.add(scraped_data)
+    scraped_data.content = scraped['content']
+    scraped_data.page_metadata = scraped['metadata']
+    scraped_data.snapshot_hash = scraped.get('content_hash')
+
+    prompt_log = None
+    if is_new or not analyzed['reused']:
+        prompt_log = PromptLog(
+            prompt_text=f"Analyze scraped data from: {url}",
+            generated_output=analyzed['output'],
+            tokens_used=analyzed['tokens'],
+            created_by_user_id=user_id,
+            **analyzed.get('meta', {})
+        )
+        db.session.add(prompt_log)
+    db.session.flush()
+
+    return {
+        'scraped_data_id': scraped_data.id,
+        'prompt_log_id': prompt_log.id if prompt_log else None,
+        'analysis': analyzed['output'],
+        'tokens_used': analyzed['tokens'],
+        'reused_analysis': analyzed['reused'],
+        'cache': scraped['cache']
+    }
+
+
+def crawl_site(job):
+    """Crawl a site from its seed URL and save one aggregated record."""
+    config = current_app.config
+    payload = job.payload
+    crawler = Crawler(
+        get_scraper(),
+        max_depth=min(payload.get('max_depth') or config['CRAWL_MAX_DEPTH'], config['CRAWL_MAX_DEPTH']),
+        max_pages=min(payload.get('max_pages') or config['CRAWL_MAX_PAGES'], config['CRAWL_MAX_PAGES']),
+        concurrency=config['CRAWL_CONCURRENCY'],
+        delay=config['CRAWL_POLITENESS_DELAY'],
+        bloom_capacity=config['CRAWL_BLOOM_CAPACITY']
+    )
+    result = crawler.crawl(payload['url'])
+    if result['status'] == 'error':
+        raise JobError(result['error'])
+
+    scraped_data = ScrapedData(
+        url=payload['url'],
+        content=result['content'],
+        page_metadata=result['metadata'],
+        created_by_user_id=job.created_by_user_id
+    )
+    db.session.add(scraped_data)
+    db.session.flush()
+
+    return {
+        'scraped_data_id': scraped_data.id,
+        'pages': result['pages'],
+        'errors': result['errors']
+    }
+
+
+def _capped(requested, cap):
+    """``requested``, but no more than ``cap``; None for either means no limit."""
+    if requested is None or cap is None:
+        return cap if requested is None else requested
+    return min(requested, cap)
+
+
+def bulk_analyze(job):
+    """Analyze a filtered set of the user's stored scraped data.
+
+    Rows whose logs were committed by an earlier attempt are skipped.
+    """
+    config = current_app.config
+    payload = job.payload
+    done = set((job.result or {}).get('done', []))
+
+    query = scraped_data_query(
+        job.created_by_user_id,
+        ids=payload.get('ids'),
+        url_contains=payload.get('url_contains'),
+        created_after=payload.get('created_after'),
+        created_before=payload.get('created_before')
+    )
+    limit = _capped(payload.get('limit'), config['ANALYSIS_MAX_ROWS'])
+    rows = [row for row in query.limit(limit).all() if row.id not in done]
+
+    def record_batch(row_ids):
+        done.update(row_ids)
+        checkpoint(job, done=sorted(done))
+
+    analyzer = BulkAnalyzer(
+        get_prompt_handler(),
+        concurrency=config['ANALYSIS_CONCURRENCY'],
+        rpm=config['ANALYSIS_RPM'],
+        # Logs are committed in batches, so the daily budget can't be
+        # re-checked per call; the run's budget is capped at what is left
+        token_budget=get_usage_meter().cap(
+            job.created_by_user_id, _capped(payload.get('token_budget'), config['ANALYSIS_TOKEN_BUDGET'])
+        ),
+        batch_size=config['ANALYSIS_BATCH_SIZE'],
+        refresh=payload.get('refresh', False)
+    )
+    summary = analyzer.analyze(rows, job.created_by_user_id, on_batch=record_batch)
+    summary['previously_done'] = len(done) - summary['analyzed']
+    return summary
+
+
+def register_tasks(queue):
+    queue.register('scrape_and_analyze', scrape_and_analyze)
+    queue.register('crawl', crawl_site)
+    queue.register('bulk_analyze', bulk_analyze)
@@ -0,0 +1,114 @@
+from datetime import datetime, timedelta
+
+from sqlalchemy import func
+
+from ..models.models import db, User, PromptLog
+
+
+class DailyBudgetExceeded(Exception):
+    """The user has spent their daily token budget."""
+
+    def __init__(self, used, limit):
+        super().__init__(f"Daily token budget exhausted: {used} of {limit} tokens used today")
+        self.used = used
+        self.limit = limit
+        self.resets_at = _today() + timedelta(days=1)
+
+
+def _today():
+    # Budgets reset at midnight UTC, matching PromptLog.created_at
+    return datetime.utcnow().replace(hour=0, minute=0, second=0, microsecond=0)
+
+
+class UsageMeter:
+    """Per-user token accounting over ``PromptLog``.
+
+    A user's daily budget is ``User.daily_token_budget`` when set, else
+    ``default_daily_budget``; None or 0 means unlimited. Usage counts what
+    was logged today, so calls still in flight are not included.
+    """
+
+    def __init__(self, default_daily_budget=None):
+        self.default_daily_budget = default_daily_budget
+
+    def limit_for(self, user_id):
+        user = db.session.get(User, user_id)
+        limit = user.daily_token_budget if user is not None else None
+        if limit is None:
+            limit = self.default_daily_budget
+        return limit or None
+
+    def used_today(self, user_id):
+        return db.session.query(func.coalesce(func.sum(PromptLog.tokens_used), 0)).filter(
+            PromptLog.created_by_user_id == user_id,
+            PromptLog.created_at >= _today()
+        ).scalar()
+
+    def remaining(self, user_id):
+        """Tokens left today, or None when the user has no budget."""
+        limit = self.limit_for(user_id)
+        if limit is None:
+            return None
+        return max(limit - self.used_today(user_id), 0)
+
+    def check(self, user_id, estimated_tokens=0):
+        """Raise ``DailyBudgetExceeded`` unless a call of about
+        ``estimated_tokens`` fits in what is left today.
+        """
+        limit = self.limit_for(user_id)
+        if limit is None:
+            return
+        used = self.used_today(user_id)
+        if used >= limit or used + estimated_tokens > limit:
+            raise DailyBudgetExceeded(used, limit)
+
+    def cap(self, user_id, budget):
+        """The smaller of ``budget`` and what the user has left today."""
+        remaining = self.remaining(user_id)
+        if remaining is None:
+            return budget
+        return remaining if budget is None else min(budget, remaining)
+
+    def summary(self, user_id, days=30):
+        """Per-day and total usage for the last ``days`` days, plus today's budget."""
+        since = _today() - timedelta(days=days - 1)
+        day = func.date(PromptLog.created_at)
+        rows = db.session.query(
+            day.label('day'),
+            func.count(PromptLog.id),
+            func.coalesce(func.sum(PromptLog.prompt_tokens), 0),
+            func.coalesce(func.sum(PromptLog.completion_tokens), 0),
+            func.coalesce(func.sum(PromptLog.tokens_used), 0),
+            func.coalesce(func.sum(PromptLog.tokens_saved), 0),
+            func.sum(db.case((PromptLog.cache_hit.is_(True), 1), else_=0)),
+            func.avg(PromptLog.latency_ms),
+            func.max(PromptLog.latency_ms)
+        ).filter(
+            PromptLog.created_by_user_id == user_id,
+            PromptLog.created_at >= since
+        ).group_by(day).order_by(day).all()
+
+        fields = ('requests', 'prompt_tokens', 'completion_tokens', 'tokens_used', 'tokens_saved', 'cache_hits')
+        daily = []
+        totals = dict.fromkeys(fields, 0)
+        for row in rows:
+            entry = {'date': str(row[0])}
+            for field, value in zip(fields, row[1:7]):
+                entry[field] = int(value or 0)
+                totals[field] += entry[field]
+            entry['avg_latency_ms'] = round(float(row[7])) if row[7] is not None else None
+            entry['max_latency_ms'] = row[8]
+            daily.append(entry)
+
+        limit = self.limit_for(user_id)
+        used = self.used_today(user_id)
+        return {
+            'days': days,
+            'totals': totals,
+            'daily': daily,
+            'budget': {
+                'daily_limit': limit,
+                'used_today': used,
+                'remaining_today': max(limit - used, 0) if limit is not None else None
+            }
+        }
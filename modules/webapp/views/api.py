@@ -1,27 +1,110 @@
-from flask import Blueprint, jsonify, request
+import json
+import logging
+from datetime import datetime
+from urllib.parse import urlparse
+
+from flask import Blueprint, Response, current_app, jsonify, request, stream_with_context, url_for
 from flask_login import current_user, login_required
-from ..models.models import db, ScrapedData, PromptLog
-from ..service.scraper import WebScraper
-from ..service.prompt_handler import PromptHandler
+from ..models.models import db, ScrapedData, PromptLog, Job
+from ..service.registry import (
+    get_scraper, get_prompt_handler, get_scrape_cache, get_job_queue, get_usage_meter, get_llm_router
+)
+from ..service.batch_scraper import BatchScraper
+from ..service.bulk_analysis import scraped_data_query
+from ..service.llm_client import LLMError, LLMUnavailable, LLMUpstreamError
+from ..service.pagination import InvalidPageRequest, keyset_page, parse_fields, parse_limit
+from ..service.usage import DailyBudgetExceeded
 
 api_bp = Blueprint('api', __name__, url_prefix='/api')
-scraper = WebScraper()
-prompt_handler = PromptHandler()
+logger = logging.getLogger(__name__)
+
+# Fields a list can be asked for with ``fields=``, and the attribute each reads
+SCRAPED_DATA_FIELDS = {
+    'id': 'id',
+    'url': 'url',
+    'content': 'content',
+    'metadata': 'page_metadata',
+    'snapshot_hash': 'snapshot_hash',
+    'created_at': 'created_at'
+}
+SCRAPED_DATA_DEFAULT_FIELDS = ('id', 'url', 'content', 'metadata', 'created_at')
+PROMPT_FIELDS = {name: name for name in (
+    'id', 'prompt_text', 'generated_output', 'tokens_used', 'model', 'template_version', 'prompt_tokens',
+    'completion_tokens', 'latency_ms', 'cache_hit', 'tokens_saved', 'latency_saved_ms', 'ttft_ms', 'created_at'
+)}
+PROMPT_DEFAULT_FIELDS = (
+    'id', 'prompt_text', 'generated_output', 'tokens_used', 'cache_hit', 'tokens_saved', 'created_at'
+)
+
+
+def _sse(event, data):
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+
+def _budget_exceeded(e):
+    return jsonify({'error': str(e), 'used': e.used, 'limit': e.limit}), 429
+
+
+def _llm_unavailable(e):
+    """503 with a Retry-After while the circuit is open or the upstream
+    keeps failing, 504 when the model timed out.
+    """
+    if isinstance(e, (LLMUnavailable, LLMUpstreamError)):
+        return jsonify({'error': str(e)}), 503, {'Retry-After': str(max(int(e.retry_after), 1))}
+    return jsonify({'error': str(e)}), 504
+
+
+def _is_http_url(value):
+    """Whether ``value`` is a string holding an absolute http(s) URL."""
+    if not isinstance(value, str):
+        return False
+    try:
+        parts = urlparse(value.strip())
+    except ValueError:
+        return False
+    return parts.scheme in ('http', 'https') and bool(parts.netloc)
+
+
+def _optional_positive_int(name):
+    """``request.json[name]``, which must be a positive integer if given."""
+    value = request.json.get(name)
+    if value is not None and (isinstance(value, bool) or not isinstance(value, int) or value < 1):
+        raise ValueError(f'{name} must be a positive integer')
+    return value
+
+
+def _list_page(query, model, field_map, default_fields):
+    """A page of ``query`` as a JSON list, following ``limit``, ``cursor``
+    and ``fields``; a ``Link: <...>; rel="next"`` header points to the next
+    page unless this is the last.
+    """
+    fields = parse_fields(request.args.get('fields'), field_map, default_fields)
+    limit = parse_limit(
+        request.args.get('limit'), current_app.config['LIST_PAGE_SIZE'], current_app.config['LIST_MAX_PAGE_SIZE']
+    )
+    rows, next_cursor = keyset_page(
+        query, model, limit, cursor=request.args.get('cursor'), columns=[field_map[field] for field in fields]
+    )
+
+    def value(row, field):
+        value = getattr(row, field_map[field])
+        return value.isoformat() if isinstance(value, datetime) else value
+
+    response = jsonify([{field: value(row, field) for field in fields} for row in rows])
+    if next_cursor:
+        args = dict(request.args, cursor=next_cursor)
+        response.headers['Link'] = f'<{url_for(request.endpoint, _external=True, **args)}>; rel="next"'
+    return response
 
 @api_bp.route('/scraped-data', methods=['GET'])
 @login_required
 def get_scraped_data():
-    data = ScrapedData.query.filter_by(created_by_user_id=current_user.id).all()
-    print("From api, get_scraped_data:", data)
-    for d in data:
-        print("From api, in loop:", d)
-    return jsonify([{
-        'id': item.id,
-        'url': item.url,
-        'content': item.content,
-        'metadata': item.page_metadata,
-        'created_at': item.created_at.isoformat()
-    } for item in data])
+    """The user's scraped data, newest first, ``limit`` at a time."""
+    query = ScrapedData.query.filter_by(created_by_user_id=current_user.id)
+    try:
+        return _list_page(query, ScrapedData, SCRAPED_DATA_FIELDS, SCRAPED_DATA_DEFAULT_FIELDS)
+    except InvalidPageRequest as e:
+        return jsonify({'error': str(e)}), 400
 
 @api_bp.route('/scraped-data', methods=['POST'])
 @login_required
@@ -33,16 +116,20 @@ def create_scraped_data():
     if not url:
         return jsonify({'error': 'URL is required'}), 400
         
-    result = scraper.scrape_url(url)
-    print("From api, result:", result)
+    refresh = bool(request.json.get('refresh'))
+    scrape_cache = get_scrape_cache()
+    result = scrape_cache.fetch(url, get_scraper(), refresh=refresh)
+    logger.debug(f"Scraped {url}: {result['status']} (cache {result.get('cache')})")
     
     if result['status'] == 'error':
-        return jsonify({'error': result['error']}), 400
+        db.session.rollback()
+        return jsonify({'error': result['error'], 'error_code': result.get('error_code')}), 400
         
     scraped_data = ScrapedData(
         url=url,
         content=result['content'],
         page_metadata=result['metadata'],
+        snapshot_hash=result.get('content_hash'),
         created_by_user_id=current_user.id
     )
     
@@ -53,10 +140,83 @@ def create_scraped_data():
         'id': scraped_data.id,
         'url': scraped_data.url,
         'content': scraped_data.content,
-        'metadata': scraped_data.metadata,
+        'metadata': scraped_data.page_metadata,
         'created_at': scraped_data.created_at.isoformat()
     }), 201
 
+@api_bp.route('/scraped-data/batch', methods=['POST'])
+@login_required
+def create_scraped_data_batch():
+    if not request.is_json:
+        return jsonify({'error': 'Content-Type must be application/json'}), 400
+
+    urls = request.json.get('urls')
+    if not urls or not isinstance(urls, list):
+        return jsonify({'error': 'A list of URLs is required'}), 400
+
+    max_urls = current_app.config['SCRAPER_BATCH_MAX_URLS']
+    if len(urls) > max_urls:
+        return jsonify({'error': f'At most {max_urls} URLs per batch'}), 400
+    invalid = [url for url in urls if not _is_http_url(url)]
+    if invalid:
+        return jsonify({'error': 'Each URL must be an absolute http(s) URL', 'invalid': invalid}), 400
+
+    batch = BatchScraper(
+        get_scraper(),
+        concurrency=current_app.config['SCRAPER_BATCH_CONCURRENCY'],
+        per_host=current_app.config['SCRAPER_BATCH_PER_HOST'],
+        render_workers=current_app.config['SCRAPER_DRIVER_POOL_SIZE'],
+        max_bytes=current_app.config['SCRAPER_MAX_BYTES']
+    )
+    results = batch.scrape_urls(urls)
+
+    rows = []
+    statuses = []
+    for result in results:
+        if result['status'] == 'error':
+            statuses.append({
+                'url': result['url'],
+                'status': 'error',
+                'error': result['error'],
+                'error_code': result.get('error_code')
+            })
+            continue
+        row = ScrapedData(
+            url=result['url'],
+            content=result['content'],
+            page_metadata=result['metadata'],
+            snapshot_hash=result.get('content_hash'),
+            created_by_user_id=current_user.id
+        )
+        rows.append(row)
+        statuses.append({'url': result['url'], 'status': 'success', 'row': row})
+
+    # One transaction for the whole batch
+    db.session.add_all(rows)
+    db.session.commit()
+
+    for status in statuses:
+        row = status.pop('row', None)
+        if row is not None:
+            status['id'] = row.id
+
+    return jsonify({
+        'total': len(statuses),
+        'succeeded': len(rows),
+        'failed': len(statuses) - len(rows),
+        'results': statuses
+    }), 201
+
+@api_bp.route('/scraper/stats', methods=['GET'])
+@login_required
+def get_scraper_stats():
+    return jsonify(get_scraper().stats())
+
+@api_bp.route('/llm/stats', methods=['GET'])
+@login_required
+def get_llm_stats():
+    return jsonify(dict(get_llm_router().stats(), templates=get_prompt_handler().templates.stats()))
+
 @api_bp.route('/scraped-data/<string:id>', methods=['GET'])
 @login_required
 def get_scraped_data_by_id(id):
@@ -64,15 +224,11 @@ def get_scraped_data_by_id(id):
     if data.created_by_user_id != current_user.id:
         return jsonify({'error': 'Unauthorized'}), 403
 
-    print("From api, get_scraped_data:", data)
-    for d in data:
-        print("From api, in loop:", d)
-        
     return jsonify({
         'id': data.id,
         'url': data.url,
         'content': data.content,
-        'metadata': data.metadata,
+        'metadata': data.page_metadata,
         'created_at': data.created_at.isoformat()
     })
 
@@ -91,14 +247,20 @@ def delete_scraped_data(id):
 @api_bp.route('/prompts', methods=['GET'])
 @login_required
 def get_prompts():
-    prompts = PromptLog.query.filter_by(created_by_user_id=current_user.id).all()
-    return jsonify([{
-        'id': prompt.id,
-        'prompt_text': prompt.prompt_text,
-        'generated_output': prompt.generated_output,
-        'tokens_used': prompt.tokens_used,
-        'created_at': prompt.created_at.isoformat()
-    } for prompt in prompts])
+    """The user's prompt logs, newest first, ``limit`` at a time."""
+    query = PromptLog.query.filter_by(created_by_user_id=current_user.id)
+    try:
+        return _list_page(query, PromptLog, PROMPT_FIELDS, PROMPT_DEFAULT_FIELDS)
+    except InvalidPageRequest as e:
+        return jsonify({'error': str(e)}), 400
+
+@api_bp.route('/prompts/<string:id>', methods=['GET'])
+@login_required
+def get_prompt(id):
+    prompt = PromptLog.query.get_or_404(id)
+    if prompt.created_by_user_id != current_user.id:
+        return jsonify({'error': 'Unauthorized'}), 403
+    return jsonify(prompt.to_dict())
 
 @api_bp.route('/prompts', methods=['POST'])
 @login_required
@@ -112,13 +274,21 @@ def create_prompt():
     if not prompt_text:
         return jsonify({'error': 'Prompt text is required'}), 400
         
-    response, tokens = prompt_handler.process_custom_prompt(prompt_text, context)
+    try:
+        response, tokens, meta = get_prompt_handler().process_custom_prompt(
+            prompt_text, context, refresh=bool(request.json.get('refresh')), user_id=current_user.id
+        )
+    except DailyBudgetExceeded as e:
+        return _budget_exceeded(e)
+    except LLMError as e:
+        return _llm_unavailable(e)
     
     prompt_log = PromptLog(
         prompt_text=prompt_text,
         generated_output=response,
         tokens_used=tokens,
-        created_by_user_id=current_user.id
+        created_by_user_id=current_user.id,
+        **meta
     )
     
     db.session.add(prompt_log)
@@ -129,9 +299,77 @@ def create_prompt():
         'prompt_text': prompt_log.prompt_text,
         'generated_output': prompt_log.generated_output,
         'tokens_used': prompt_log.tokens_used,
+        'cache_hit': prompt_log.cache_hit,
+        'tokens_saved': prompt_log.tokens_saved,
         'created_at': prompt_log.created_at.isoformat()
     }), 201
 
+@api_bp.route('/prompts/stream', methods=['POST'])
+@login_required
+def stream_prompt():
+    """Stream the model's output as server-sent events.
+
+    Sends ``token`` events (``{"text": ...}``) as output arrives, then one
+    ``done`` event with the saved prompt log, or an ``error`` event.
+    """
+    if not request.is_json:
+        return jsonify({'error': 'Content-Type must be application/json'}), 400
+
+    prompt_text = request.json.get('prompt')
+    context = request.json.get('context')
+
+    if not prompt_text:
+        return jsonify({'error': 'Prompt text is required'}), 400
+
+    user_id = current_user.id
+    try:
+        # Refuse up front rather than as an error event; the handler checks
+        # again, with the prompt's size, before the model call
+        get_usage_meter().check(user_id)
+        get_llm_router().check()
+    except DailyBudgetExceeded as e:
+        return _budget_exceeded(e)
+    except LLMUnavailable as e:
+        return _llm_unavailable(e)
+
+    events = get_prompt_handler().stream_custom_prompt(
+        prompt_text, context, refresh=bool(request.json.get('refresh')), user_id=user_id
+    )
+
+    def generate():
+        try:
+            for event, data in events:
+                if event == 'token':
+                    yield _sse('token', {'text': data})
+                    continue
+
+                prompt_log = PromptLog(
+                    prompt_text=prompt_text,
+                    generated_output=data['response'],
+                    tokens_used=data['tokens_used'],
+                    ttft_ms=data['ttft_ms'],
+                    created_by_user_id=user_id,
+                    **data['meta']
+                )
+                db.session.add(prompt_log)
+                db.session.commit()
+                logger.info(f"Streamed prompt {prompt_log.id}: first token after {data['ttft_ms']} ms")
+                yield _sse('done', prompt_log.to_dict())
+        except Exception as e:
+            db.session.rollback()
+            logger.error(f"Error streaming prompt: {str(e)}")
+            yield _sse('error', {'error': str(e)})
+
+    return Response(
+        stream_with_context(generate()),
+        mimetype='text/event-stream',
+        headers={
+            'Cache-Control': 'no-cache',
+            # Stop nginx-style proxies from buffering the stream
+            'X-Accel-Buffering': 'no'
+        }
+    )
+
 @api_bp.route('/prompts/<string:id>', methods=['DELETE'])
 @login_required
 def delete_prompt(id):
@@ -143,3 +381,104 @@ def delete_prompt(id):
     db.session.commit()
     
     return jsonify({'message': 'Prompt deleted successfully'})
+
+@api_bp.route('/usage', methods=['GET'])
+@login_required
+def get_usage():
+    """Token usage, latency and cache savings per day, with today's budget."""
+    days = request.args.get('days', 30, type=int)
+    if not 1 <= days <= 366:
+        return jsonify({'error': 'days must be between 1 and 366'}), 400
+    return jsonify(get_usage_meter().summary(current_user.id, days=days))
+
+@api_bp.route('/jobs', methods=['POST'])
+@login_required
+def create_job():
+    if not request.is_json:
+        return jsonify({'error': 'Content-Type must be application/json'}), 400
+
+    url = request.json.get('url')
+    if not url:
+        return jsonify({'error': 'URL is required'}), 400
+
+    job = get_job_queue().enqueue(
+        'scrape_and_analyze',
+        {'url': url, 'refresh': bool(request.json.get('refresh'))},
+        current_user.id
+    )
+    return jsonify(job.to_dict()), 202
+
+@api_bp.route('/scraped-data/analyze', methods=['POST'])
+@login_required
+def create_bulk_analysis():
+    """Queue analysis of stored scraped data picked by ids and/or filters."""
+    if not request.is_json:
+        return jsonify({'error': 'Content-Type must be application/json'}), 400
+
+    ids = request.json.get('ids')
+    if ids is not None and not isinstance(ids, list):
+        return jsonify({'error': 'ids must be a list'}), 400
+    try:
+        # Both are capped by the configured maximums when the job runs
+        limit = _optional_positive_int('limit')
+        token_budget = _optional_positive_int('token_budget')
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+
+    payload = {
+        'ids': ids,
+        'url_contains': request.json.get('url_contains'),
+        'created_after': request.json.get('created_after'),
+        'created_before': request.json.get('created_before'),
+        'limit': limit,
+        'token_budget': token_budget,
+        'refresh': bool(request.json.get('refresh'))
+    }
+    try:
+        matched = scraped_data_query(
+            current_user.id,
+            ids=payload['ids'],
+            url_contains=payload['url_contains'],
+            created_after=payload['created_after'],
+            created_before=payload['created_before']
+        ).count()
+    except (TypeError, ValueError) as e:
+        return jsonify({'error': f'Invalid filter: {str(e)}'}), 400
+    if not matched:
+        return jsonify({'error': 'No scraped data matches'}), 404
+
+    job = get_job_queue().enqueue('bulk_analyze', payload, current_user.id)
+    response = job.to_dict()
+    response['matched'] = min(matched, current_app.config['ANALYSIS_MAX_ROWS'])
+    return jsonify(response), 202
+
+@api_bp.route('/scraped-data/crawl', methods=['POST'])
+@login_required
+def create_crawl():
+    if not request.is_json:
+        return jsonify({'error': 'Content-Type must be application/json'}), 400
+
+    url = request.json.get('url')
+    if not url:
+        return jsonify({'error': 'URL is required'}), 400
+
+    try:
+        max_depth = _optional_positive_int('max_depth')
+        max_pages = _optional_positive_int('max_pages')
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+
+    job = get_job_queue().enqueue(
+        'crawl',
+        {'url': url, 'max_depth': max_depth, 'max_pages': max_pages},
+        current_user.id
+    )
+    return jsonify(job.to_dict()), 202
+
+@api_bp.route('/jobs/<string:id>', methods=['GET'])
+@login_required
+def get_job(id):
+    job = Job.query.get_or_404(id)
+    if job.created_by_user_id != current_user.id:
+        return jsonify({'error': 'Unauthorized'}), 403
+    return jsonify(job.to_dict())
@@ -1,9 +1,10 @@
 from datetime import datetime
-from flask import Blueprint, render_template, request, flash, redirect, url_for, session
-from flask.json import dumps
-from ..models.models import db, ScrapedData, PromptLog
-from ..service.scraper import WebScraper
-from ..service.prompt_handler import PromptHandler
+from flask import Blueprint, render_template, request, flash, redirect, url_for, session, jsonify, current_app
+from ..models.models import db, ScrapedData, PromptLog, Job
+from ..service.registry import get_prompt_handler, get_job_queue
+from ..service.llm_client import LLMError
+from ..service.pagination import InvalidPageRequest, keyset_page
+from ..service.usage import DailyBudgetExceeded
 from ..views.auth import login_required
 import logging
 from sqlalchemy.exc import SQLAlchemyError
@@ -11,9 +12,6 @@ logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 dashboard_bp = Blueprint('dashboard', __name__)
-scraper = WebScraper()
-prompt_handler = PromptHandler()
-
 
 
 def get_current_user():
@@ -35,24 +33,27 @@ def index():
         if not user:
             return redirect(url_for('auth.login'))
         user_id = user["id"]
-        
-        scraped_data = ScrapedData.query.filter_by(created_by_user_id=user_id).all()
-        prompt_logs = PromptLog.query.filter_by(created_by_user_id=user_id).all()
-                
-        serialized_scrape = []
-        for d in scraped_data:
-            print("Scrape meta ", d.page_metadata)
-            serialized_scrape.append({
-                "id": d.id,
-                "url": d.url,
-                "content": d.content,
-                "metadata": dumps(d.page_metadata),
-                "created_at": d.created_at
-                })
-        
+        page_size = current_app.config['LIST_PAGE_SIZE']
+
+        # Each list pages on its own; the modals fetch a row's full content when opened
+        try:
+            scraped_data, scraped_cursor = keyset_page(
+                ScrapedData.query.filter_by(created_by_user_id=user_id), ScrapedData, page_size,
+                cursor=request.args.get('scraped_cursor'), columns=['url', 'page_metadata']
+            )
+            prompt_logs, prompts_cursor = keyset_page(
+                PromptLog.query.filter_by(created_by_user_id=user_id), PromptLog, page_size,
+                cursor=request.args.get('prompts_cursor'), columns=['prompt_text', 'tokens_used']
+            )
+        except InvalidPageRequest as e:
+            flash(str(e), 'error')
+            return redirect(url_for('dashboard.index'))
+
         return render_template('dashboard/index.html',
-                             scraped_data=serialized_scrape, 
-                             prompt_logs=prompt_logs) 
+                             scraped_data=scraped_data,
+                             scraped_cursor=scraped_cursor,
+                             prompt_logs=prompt_logs,
+                             prompts_cursor=prompts_cursor)
     
     except SQLAlchemyError as e:
         logger.error(f"Database error in dashboard: {str(e)}")
@@ -80,40 +81,23 @@ def scrape_url():
                 flash('Please provide a URL', 'error')
                 return redirect(url_for('dashboard.index'))
 
-            result = scraper.scrape_url(url)
-            print("Result from scraper at dashboard:", result['metadata'])
-            
-            if result['status'] == 'success':
-                try:
-                    analysis, tokens = prompt_handler.process_scraped_data(result)
-                    
-                    # Save to database
-                    scraped_data = ScrapedData(
-                        url=url,
-                        content=result['content'],
-                        page_metadata=result['metadata'],
-                        created_by_user_id=user_id
-                    )
-                    db.session.add(scraped_data)
-                    
-                    prompt_log = PromptLog(
-                        prompt_text=f"Analyze scraped data from: {url}",
-                        generated_output=analysis,
-                        tokens_used=tokens,
-                        created_by_user_id=user_id
+            refresh = request.form.get('refresh') == 'on'
+            crawl = request.form.get('crawl') == 'on'
+            try:
+                if crawl:
+                    job = get_job_queue().enqueue('crawl', {'url': url}, user_id)
+                    flash(f'Crawl queued (job {job.id}). Results will appear here when it finishes.', 'success')
+                else:
+                    job = get_job_queue().enqueue(
+                        'scrape_and_analyze',
+                        {'url': url, 'refresh': refresh},
+                        user_id
                     )
-                    db.session.add(prompt_log)
-                    
-                    db.session.commit()
-                    flash('URL successfully scraped and analyzed!', 'success')
-                
-                except SQLAlchemyError as e:
-                    db.session.rollback()
-                    logger.error(f"Database error while saving scraped data: {str(e)}")
-                    flash('Error saving scraped data', 'error')
-                
-            else:
-                flash(f'Error scraping URL: {result["error"]}', 'error')
+                    flash(f'Scrape queued (job {job.id}). Results will appear here when it finishes.', 'success')
+            except SQLAlchemyError as e:
+                db.session.rollback()
+                logger.error(f"Database error while queueing scrape: {str(e)}")
+                flash('Error queueing scrape', 'error')
             
             return redirect(url_for('dashboard.index'))
             
@@ -145,14 +129,17 @@ def create_prompt():
                 return redirect(url_for('dashboard.create_prompt'))
                 
             try:
-                response, tokens = prompt_handler.process_custom_prompt(prompt_text, context)
+                response, tokens, meta = get_prompt_handler().process_custom_prompt(
+                    prompt_text, context, user_id=user_id
+                )
                 
                 prompt_log = PromptLog(
                     prompt_text=prompt_text,
                     generated_output=response,
                     tokens_used=tokens,
                     created_by_user_id=user_id,
-                    created_at=datetime.utcnow()  # Explicitly set the datetime
+                    created_at=datetime.utcnow(),  # Explicitly set the datetime
+                    **meta
                 )
                 db.session.add(prompt_log)
                 db.session.commit()
@@ -160,14 +147,25 @@ def create_prompt():
                 flash('Prompt processed successfully!', 'success')
                 return redirect(url_for('dashboard.index'))
                 
+            except (DailyBudgetExceeded, LLMError) as e:
+                flash(str(e), 'error')
+                return redirect(url_for('dashboard.create_prompt'))
             except SQLAlchemyError as e:
                 db.session.rollback()
                 logger.error(f"Database error in create_prompt: {str(e)}")
                 flash('Error saving prompt', 'error')
                 return redirect(url_for('dashboard.index'))
                 
-        prompt_logs = PromptLog.query.filter_by(created_by_user_id=user_id).all()
-        return render_template('dashboard/prompt.html', prompt_logs=prompt_logs)
+        try:
+            prompt_logs, next_cursor = keyset_page(
+                PromptLog.query.filter_by(created_by_user_id=user_id), PromptLog,
+                current_app.config['LIST_PAGE_SIZE'], cursor=request.args.get('cursor'),
+                columns=['prompt_text', 'output_preview']
+            )
+        except InvalidPageRequest as e:
+            flash(str(e), 'error')
+            return redirect(url_for('dashboard.create_prompt'))
+        return render_template('dashboard/prompt.html', prompt_logs=prompt_logs, next_cursor=next_cursor)
         
     except Exception as e:
         logger.error(f"Unexpected error in create_prompt: {str(e)}")
@@ -213,3 +211,14 @@ def delete_prompt(id):
     flash('Prompt deleted successfully', 'success')
     return redirect(url_for('dashboard.index'))
 
+@dashboard_bp.route('/jobs/<string:id>')
+@login_required
+def job_status(id):
+    user = get_current_user()
+    if not user:
+        return jsonify({'error': 'Unauthorized'}), 401
+
+    job = Job.query.get_or_404(id)
+    if job.created_by_user_id != user["id"]:
+        return jsonify({'error': 'Unauthorized'}), 403
+    return jsonify(job.to_dict())
@@ -0,0 +1,89 @@
+import os
+import tempfile
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+# Config reads the environment when it is imported, so set it up first
+_db_fd, _db_path = tempfile.mkstemp(suffix='.db')
+os.close(_db_fd)
+os.environ.update({
+    'DATABASE_URL': f'sqlite:///{_db_path}',
+    'LLM_BACKEND': 'fake',
+    'LLM_FAKE_LATENCY': '0',
+    'SCRAPER_PARSE_WORKERS': '0',
+    'SNAPSHOTS_ENABLED': 'false',
+    # Tests run jobs themselves; background workers would race them
+    'JOBS_WORKERS': '0',
+})
+
+from app import create_app  # noqa: E402
+from modules.webapp.models.models import db, User  # noqa: E402
+
+
+@pytest.fixture(scope='session')
+def app():
+    app = create_app()
+    app.config['TESTING'] = True
+    yield app
+    os.unlink(_db_path)
+
+
+@pytest.fixture(autouse=True)
+def database(app):
+    """A fresh schema per test, inside an app context."""
+    with app.app_context():
+        db.create_all()
+        yield db
+        db.session.remove()
+        db.drop_all()
+
+
+@pytest.fixture
+def user(database):
+    user = User(id='user-1', name='Test User', email='user@example.com', social_login_provider='google')
+    database.session.add(user)
+    database.session.commit()
+    return user
+
+
+@pytest.fixture
+def client(app, user):
+    """A test client logged in as ``user``."""
+    client = app.test_client()
+    with client.session_transaction() as session:
+        session['user_id'] = user.id
+    return client
+
+
+class _SiteHandler(BaseHTTPRequestHandler):
+    # path -> (status, content type, body)
+    pages = {}
+
+    def do_GET(self):
+        status, content_type, body = self.pages.get(self.path, (404, 'text/html', '<h1>Not found</h1>'))
+        body = body.encode()
+        self.send_response(status)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+@pytest.fixture
+def site():
+    """A local web server; ``site.pages`` maps paths to
+    ``(status, content_type, body)`` and ``site.url(path)`` is absolute.
+    """
+    server = ThreadingHTTPServer(('127.0.0.1', 0), _SiteHandler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    server.pages = _SiteHandler.pages = {}
+    server.url = lambda path: f'http://127.0.0.1:{server.server_port}{path}'
+    yield server
+    server.shutdown()
+    server.server_close()
@@ -0,0 +1,64 @@
+from modules.webapp.models.models import ScrapedData
+
+COMPANY_PAGE = """<html><head><title>Acme Corp</title></head>
+<body><h1>Acme Corp</h1><p>Acme makes anvils and sells them to coyotes worldwide.</p></body></html>"""
+
+
+def _post_batch(client, urls):
+    return client.post('/api/scraped-data/batch', json={'urls': urls})
+
+
+def test_each_url_gets_its_own_status(client, site):
+    site.pages['/acme'] = (200, 'text/html; charset=utf-8', COMPANY_PAGE)
+    site.pages['/gone'] = (404, 'text/html', '<html><title>Error response</title></html>')
+    site.pages['/report.pdf'] = (200, 'application/pdf', '%PDF-1.4')
+    urls = [site.url('/acme'), site.url('/gone'), site.url('/report.pdf')]
+
+    response = _post_batch(client, urls)
+
+    assert response.status_code == 201
+    body = response.get_json()
+    assert (body['total'], body['succeeded'], body['failed']) == (3, 1, 2)
+    results = {result['url']: result for result in body['results']}
+    assert [result['url'] for result in body['results']] == urls
+    assert results[urls[0]]['status'] == 'success'
+    assert results[urls[1]]['error_code'] == 'http_status'
+    assert results[urls[2]]['error_code'] == 'unsupported_content_type'
+
+
+def test_only_successful_urls_are_saved(client, site, database):
+    site.pages['/acme'] = (200, 'text/html', COMPANY_PAGE)
+
+    response = _post_batch(client, [site.url('/acme'), site.url('/missing')])
+
+    saved = database.session.query(ScrapedData).all()
+    assert [row.url for row in saved] == [site.url('/acme')]
+    assert response.get_json()['results'][0]['id'] == saved[0].id
+
+
+def test_unreachable_host_is_a_per_url_error(client, site):
+    site.pages['/acme'] = (200, 'text/html', COMPANY_PAGE)
+
+    response = _post_batch(client, [site.url('/acme'), 'http://127.0.0.1:9/closed'])
+
+    assert response.status_code == 201
+    statuses = [result['status'] for result in response.get_json()['results']]
+    assert statuses == ['success', 'error']
+
+
+def test_entries_that_are_not_http_urls_are_rejected(client):
+    response = _post_batch(client, ['https://example.com/', 123, '', 'ftp://example.com/file'])
+
+    assert response.status_code == 400
+    assert response.get_json()['invalid'] == [123, '', 'ftp://example.com/file']
+
+
+def test_urls_must_be_a_non_empty_list(client):
+    assert _post_batch(client, 'https://example.com/').status_code == 400
+    assert _post_batch(client, []).status_code == 400
+
+
+def test_batch_needs_a_login(app):
+    response = app.test_client().post('/api/scraped-data/batch', json={'urls': ['https://example.com/']})
+
+    assert response.status_code == 401
@@ -0,0 +1,102 @@
+from modules.webapp.service.crawler import Crawler
+
+
+class FakeScraper:
+    """Serves ``site`` (url -> list of ``(href, anchor_text)``) and
+    records every URL it is asked for.
+    """
+
+    def __init__(self, site, redirects=None):
+        self.site = site
+        self.redirects = redirects or {}
+        self.fetched = []
+
+    def scrape_url(self, url, collect_links=False):
+        self.fetched.append(url)
+        final_url = self.redirects.get(url, url)
+        if final_url not in self.site:
+            return {'status': 'error', 'error': f'404 {url}'}
+        return {
+            'status': 'success',
+            'content': {'title': final_url},
+            'metadata': {},
+            'links': self.site[final_url],
+            'final_url': final_url
+        }
+
+
+def _crawl(scraper, seed, **options):
+    return Crawler(scraper, delay=0, concurrency=1, **options).crawl(seed)
+
+
+def test_each_page_is_fetched_once_however_it_is_linked():
+    scraper = FakeScraper({
+        'https://example.com/': [
+            ('/about', 'About'),
+            ('/about/', 'About us'),
+            ('https://EXAMPLE.com/about#team', 'Team'),
+            ('/', 'Home')
+        ],
+        'https://example.com/about': [('/', 'Home'), ('/about?', 'About')]
+    })
+
+    result = _crawl(scraper, 'https://example.com/')
+
+    assert scraper.fetched == ['https://example.com/', 'https://example.com/about']
+    assert result['pages'] == scraper.fetched
+
+
+def test_links_to_other_sites_are_not_followed():
+    scraper = FakeScraper({
+        'https://example.com/': [('https://other.org/about', ''), ('https://www.example.com/team', '')],
+        'https://www.example.com/team': []
+    })
+
+    _crawl(scraper, 'https://example.com/')
+
+    assert scraper.fetched == ['https://example.com/', 'https://www.example.com/team']
+
+
+def test_links_stop_at_max_depth():
+    chain = ['https://example.com/', 'https://example.com/a', 'https://example.com/b', 'https://example.com/c']
+    scraper = FakeScraper({url: [(next_url, '')] for url, next_url in zip(chain, chain[1:] + [chain[0]])})
+
+    result = _crawl(scraper, chain[0], max_depth=2)
+
+    assert result['pages'] == chain[:3]
+
+
+def test_fetches_stop_at_max_pages():
+    scraper = FakeScraper({
+        'https://example.com/': [(f'/page-{number}', '') for number in range(10)],
+        **{f'https://example.com/page-{number}': [] for number in range(10)}
+    })
+
+    result = _crawl(scraper, 'https://example.com/', max_pages=4)
+
+    assert len(scraper.fetched) == 4
+    assert len(result['pages']) == 4
+
+
+def test_relative_links_resolve_against_the_redirected_url():
+    scraper = FakeScraper(
+        {'https://example.com/company/': [('team', '')], 'https://example.com/company/team': []},
+        redirects={'https://example.com/': 'https://example.com/company/'}
+    )
+
+    result = _crawl(scraper, 'https://example.com/')
+
+    assert result['pages'] == ['https://example.com/', 'https://example.com/company/team']
+
+
+def test_a_page_redirecting_off_site_is_dropped():
+    scraper = FakeScraper(
+        {'https://example.com/': [('/jobs', '')], 'https://jobs.example.net/': [('/secret', '')]},
+        redirects={'https://example.com/jobs': 'https://jobs.example.net/'}
+    )
+
+    result = _crawl(scraper, 'https://example.com/')
+
+    assert result['pages'] == ['https://example.com/']
+    assert result['errors'][0]['url'] == 'https://example.com/jobs'
+    assert 'https://jobs.example.net/secret' not in scraper.fetched
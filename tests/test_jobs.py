@@ -0,0 +1,176 @@
+from datetime import datetime, timedelta
+
+import pytest
+
+from modules.webapp.models.models import Job
+from modules.webapp.service.jobs import JobError, JobQueue, LeaseLost, PermanentJobError, checkpoint
+
+
+@pytest.fixture
+def queue(app):
+    # Never started: tests claim and run jobs on the test thread
+    return JobQueue(app, workers=1, max_attempts=3, retry_delay=10, lease_timeout=600)
+
+
+@pytest.fixture
+def make_job(database, user):
+    def make_job(kind='test', **columns):
+        columns.setdefault('run_after', datetime.utcnow())
+        job = Job(kind=kind, payload={}, created_by_user_id=user.id, **columns)
+        database.session.add(job)
+        database.session.commit()
+        return job
+    return make_job
+
+
+def _reload(database, job):
+    return database.session.get(Job, job.id, populate_existing=True)
+
+
+def test_claim_takes_a_due_queued_job(queue, make_job):
+    job = make_job()
+
+    claimed = queue._claim()
+
+    assert claimed.id == job.id
+    assert claimed.status == 'running'
+    assert claimed.attempts == 1
+    assert claimed.lease == 1
+    assert claimed.heartbeat_at is not None
+
+
+def test_claim_skips_a_job_waiting_for_its_retry(queue, make_job):
+    make_job(run_after=datetime.utcnow() + timedelta(minutes=5))
+
+    assert queue._claim() is None
+
+
+def test_claim_leaves_a_running_job_with_a_fresh_heartbeat(queue, make_job):
+    now = datetime.utcnow()
+    make_job(status='running', attempts=1, started_at=now - timedelta(hours=1), heartbeat_at=now)
+
+    assert queue._claim() is None
+
+
+def test_claim_reclaims_a_running_job_with_a_stale_heartbeat(queue, make_job):
+    stale = datetime.utcnow() - timedelta(seconds=queue.lease_timeout + 1)
+    job = make_job(status='running', attempts=1, started_at=stale, heartbeat_at=stale)
+
+    claimed = queue._claim()
+
+    assert claimed.id == job.id
+    assert claimed.attempts == 2
+    assert claimed.heartbeat_at > stale
+
+
+def test_failed_run_is_requeued_with_backoff(database, queue, make_job):
+    def handler(job):
+        raise JobError('upstream hiccup')
+    queue.register('test', handler)
+    job = make_job()
+
+    before = datetime.utcnow()
+    queue._run(queue._claim())
+
+    job = _reload(database, job)
+    assert job.status == 'queued'
+    assert job.error == 'upstream hiccup'
+    assert job.run_after >= before + timedelta(seconds=queue.retry_delay)
+
+
+def test_retry_at_replaces_the_backoff(database, queue, make_job):
+    retry_at = datetime.utcnow() + timedelta(hours=3)
+
+    def handler(job):
+        raise JobError('come back later', retry_at=retry_at)
+    queue.register('test', handler)
+    job = make_job()
+
+    queue._run(queue._claim())
+
+    assert _reload(database, job).run_after == retry_at
+
+
+def test_run_fails_once_attempts_are_used_up(database, queue, make_job):
+    def handler(job):
+        raise JobError('still broken')
+    queue.register('test', handler)
+    job = make_job(attempts=2)
+
+    queue._run(queue._claim())
+
+    job = _reload(database, job)
+    assert job.status == 'failed'
+    assert job.attempts == 3
+    assert job.finished_at is not None
+
+
+def test_permanent_error_is_not_retried(database, queue, make_job):
+    def handler(job):
+        raise PermanentJobError('bad input')
+    queue.register('test', handler)
+    job = make_job()
+
+    queue._run(queue._claim())
+
+    job = _reload(database, job)
+    assert job.status == 'failed'
+    assert job.attempts == 1
+
+
+def test_checkpoint_is_kept_for_the_next_attempt(database, queue, make_job):
+    def handler(job):
+        checkpoint(job, first=1)
+        raise JobError('second step failed')
+    queue.register('test', handler)
+    job = make_job()
+
+    queue._run(queue._claim())
+
+    assert _reload(database, job).result == {'first': 1}
+
+
+def test_run_stops_once_another_worker_reclaims_its_job(database, queue, make_job):
+    seen = []
+
+    def handler(job):
+        checkpoint(job, first=1)
+        # Another worker takes the job over behind this run's back
+        with database.engine.begin() as connection:
+            connection.execute(
+                Job.__table__.update().where(Job.id == job.id).values(attempts=Job.attempts + 1)
+            )
+        try:
+            checkpoint(job, second=2)
+        except LeaseLost:
+            seen.append('lease lost')
+            raise
+        return {'done': True}
+    queue.register('test', handler)
+    job = make_job()
+
+    queue._run(queue._claim())
+
+    job = _reload(database, job)
+    assert seen == ['lease lost']
+    # Left to the worker that holds it now
+    assert job.status == 'running'
+    assert job.attempts == 2
+    assert job.result == {'first': 1}
+
+
+def test_outcome_of_a_superseded_run_is_dropped(database, queue, make_job):
+    def handler(job):
+        with database.engine.begin() as connection:
+            connection.execute(
+                Job.__table__.update().where(Job.id == job.id).values(attempts=Job.attempts + 1)
+            )
+        return {'done': True}
+    queue.register('test', handler)
+    job = make_job()
+
+    queue._run(queue._claim())
+
+    job = _reload(database, job)
+    assert job.status == 'running'
+    assert job.result is None
@@ -0,0 +1,86 @@
+from datetime import datetime, timedelta
+
+import pytest
+
+from modules.webapp.models.models import PromptLog
+from modules.webapp.service.usage import DailyBudgetExceeded, UsageMeter
+
+
+@pytest.fixture
+def log_usage(database, user):
+    def log_usage(tokens, created_at=None):
+        database.session.add(PromptLog(
+            prompt_text='earlier prompt',
+            generated_output='earlier answer',
+            tokens_used=tokens,
+            created_by_user_id=user.id,
+            created_at=created_at or datetime.utcnow()
+        ))
+        database.session.commit()
+    return log_usage
+
+
+def test_call_that_fits_the_budget_is_allowed(user, log_usage):
+    log_usage(60)
+
+    UsageMeter(default_daily_budget=100).check(user.id, estimated_tokens=40)
+
+
+def test_call_that_would_overrun_the_budget_is_blocked(user, log_usage):
+    log_usage(60)
+
+    with pytest.raises(DailyBudgetExceeded) as raised:
+        UsageMeter(default_daily_budget=100).check(user.id, estimated_tokens=41)
+
+    assert (raised.value.used, raised.value.limit) == (60, 100)
+
+
+def test_spent_budget_blocks_every_call(user, log_usage):
+    log_usage(100)
+
+    with pytest.raises(DailyBudgetExceeded):
+        UsageMeter(default_daily_budget=100).check(user.id)
+
+
+def test_usage_from_earlier_days_does_not_count(user, log_usage):
+    log_usage(500, created_at=datetime.utcnow() - timedelta(days=1, hours=1))
+
+    UsageMeter(default_daily_budget=100).check(user.id, estimated_tokens=100)
+
+
+def test_user_budget_overrides_the_default(database, user, log_usage):
+    user.daily_token_budget = 1000
+    database.session.commit()
+    log_usage(500)
+
+    meter = UsageMeter(default_daily_budget=100)
+    meter.check(user.id, estimated_tokens=400)
+    assert meter.remaining(user.id) == 500
+
+
+def test_no_budget_means_unlimited(user, log_usage):
+    log_usage(10 ** 9)
+
+    meter = UsageMeter(default_daily_budget=None)
+    meter.check(user.id, estimated_tokens=10 ** 6)
+    assert meter.cap(user.id, 50) == 50
+
+
+def test_cap_is_what_is_left_today(user, log_usage):
+    log_usage(70)
+
+    meter = UsageMeter(default_daily_budget=100)
+    assert meter.cap(user.id, None) == 30
+    assert meter.cap(user.id, 20) == 20
+
+
+def test_prompt_api_refuses_calls_over_budget(client, database, user, log_usage):
+    user.daily_token_budget = 50
+    database.session.commit()
+    log_usage(50)
+
+    response = client.post('/api/prompts', json={'prompt': 'Summarize our market'})
+
+    assert response.status_code == 429
+    assert response.get_json()['limit'] == 50
+    assert database.session.query(PromptLog).count() == 1